@@ -15,11 +15,12 @@
 import asyncio
 import collections.abc
 import contextvars
-import datetime
-import inspect
+import os
 import sys
+import time
 import traceback
 from pathlib import Path
+from types import CodeType, FrameType
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -28,6 +29,7 @@ from typing import (
     List,
     Mapping,
     Optional,
+    Tuple,
     TypedDict,
     Union,
     cast,
@@ -41,6 +43,11 @@ import playwright._impl._impl_to_api_mapping
 from playwright._impl._errors import TargetClosedError, rewrite_error
 from playwright._impl._greenlets import EventGreenlet
 from playwright._impl._helper import Error, ParsedMessagePayload, parse_error
+from playwright._impl._protocol_schema import (
+    COMMAND_CHANNEL_PATHS,
+    EVENT_CHANNEL_PATHS,
+    INITIALIZER_CHANNEL_PATHS,
+)
 from playwright._impl._transport import Transport
 
 if TYPE_CHECKING:
@@ -48,6 +55,11 @@ if TYPE_CHECKING:
     from playwright._impl._playwright import Playwright
 
 
+# Channel paths for payloads the protocol schema does not describe: the whole
+# payload is searched for channel references.
+ALL_PATHS = object()
+
+
 class Channel(AsyncIOEventEmitter):
     def __init__(self, connection: "Connection", object: "ChannelOwner") -> None:
         super().__init__()
@@ -189,8 +201,9 @@ class ChannelOwner(AsyncIOEventEmitter):
 
 class ProtocolCallback:
     def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
-        self.stack_trace: traceback.StackSummary
+        self.stack_trace: Optional[CallStack]
         self.no_reply: bool
+        self.result_channel_paths: Any = ALL_PATHS
         self.future = loop.create_future()
         # The outer task can get cancelled by the user, this forwards the cancellation to the inner task.
         current_task = asyncio.current_task()
@@ -330,12 +343,19 @@ class Connection(EventEmitter):
         self._last_id += 1
         id = self._last_id
         callback = ProtocolCallback(self._loop)
-        task = asyncio.current_task(self._loop)
-        callback.stack_trace = cast(
-            traceback.StackSummary,
-            getattr(task, "__pw_stack_trace__", traceback.extract_stack(limit=10)),
-        )
+        if stack_capture_mode == "off":
+            callback.stack_trace = None
+        else:
+            task = asyncio.current_task(self._loop)
+            callback.stack_trace = getattr(
+                task, "__pw_stack__", None
+            ) or capture_call_stack(limit=10)
         callback.no_reply = no_reply
+        channel_paths = COMMAND_CHANNEL_PATHS.get(object._type, {}).get(method)
+        if channel_paths:
+            params_channel_paths, callback.result_channel_paths = channel_paths
+        else:
+            params_channel_paths = ALL_PATHS
         self._callbacks[id] = callback
         stack_trace_information = cast(ParsedStackTrace, self._api_zone.get())
         frames = stack_trace_information.get("frames", [])
@@ -349,7 +369,7 @@ class Connection(EventEmitter):
             else None
         )
         metadata = {
-            "wallTime": int(datetime.datetime.now().timestamp() * 1000),
+            "wallTime": int(time.time() * 1000),
             "apiName": stack_trace_information["apiName"],
             "internal": not stack_trace_information["apiName"],
         }
@@ -359,7 +379,7 @@ class Connection(EventEmitter):
             "id": id,
             "guid": object._guid,
             "method": method,
-            "params": self._replace_channels_with_guids(params),
+            "params": self._replace_channels_with_guids(params, params_channel_paths),
             "metadata": metadata,
         }
         if self._tracing_count > 0 and frames and object._guid != "localUtils":
@@ -387,10 +407,13 @@ class Connection(EventEmitter):
                 parsed_error = parse_error(
                     error["error"], format_call_log(msg.get("log"))  # type: ignore
                 )
-                parsed_error._stack = "".join(callback.stack_trace.format())
+                if callback.stack_trace:
+                    parsed_error._stack = callback.stack_trace.format()
                 callback.future.set_exception(parsed_error)
             else:
-                result = self._replace_guids_with_channels(msg.get("result"))
+                result = self._replace_guids_with_channels(
+                    msg.get("result"), callback.result_channel_paths
+                )
                 callback.future.set_result(result)
             return
 
@@ -424,6 +447,11 @@ class Connection(EventEmitter):
         object = self._objects[guid]
         should_replace_guids_with_channels = "jsonPipe@" not in guid
         try:
+            if should_replace_guids_with_channels:
+                params = self._replace_guids_with_channels(
+                    params,
+                    EVENT_CHANNEL_PATHS.get(object._type, {}).get(method, ALL_PATHS),
+                )
             if self._is_sync:
                 for listener in object._channel.listeners(method):
                     # Event handlers like route/locatorHandlerTriggered require us to perform async work.
@@ -442,17 +470,9 @@ class Connection(EventEmitter):
                     # and switch to them in order, until they block inside and pass control to each
                     # other and then eventually back to dispatcher as listener functions return.
                     g = EventGreenlet(_listener_with_error_handler_attached)
-                    if should_replace_guids_with_channels:
-                        g.switch(self._replace_guids_with_channels(params))
-                    else:
-                        g.switch(params)
+                    g.switch(params)
             else:
-                if should_replace_guids_with_channels:
-                    object._channel.emit(
-                        method, self._replace_guids_with_channels(params)
-                    )
-                else:
-                    object._channel.emit(method, params)
+                object._channel.emit(method, params)
         except BaseException as exc:
             self._on_event_listener_error(exc)
 
@@ -465,7 +485,9 @@ class Connection(EventEmitter):
     def _create_remote_object(
         self, parent: ChannelOwner, type: str, guid: str, initializer: Dict
     ) -> ChannelOwner:
-        initializer = self._replace_guids_with_channels(initializer)
+        initializer = self._replace_guids_with_channels(
+            initializer, INITIALIZER_CHANNEL_PATHS.get(type, ALL_PATHS)
+        )
         result = self._object_factory(parent, type, guid, initializer)
         if guid in self._waiting_for_object:
             self._waiting_for_object.pop(guid)(result)
@@ -474,7 +496,10 @@ class Connection(EventEmitter):
     def _replace_channels_with_guids(
         self,
         payload: Any,
+        channel_paths: Any = ALL_PATHS,
     ) -> Any:
+        if channel_paths is not ALL_PATHS:
+            return self._replace_channels_with_guids_at(payload, channel_paths)
         if payload is None:
             return payload
         if isinstance(payload, Path):
@@ -492,7 +517,33 @@ class Connection(EventEmitter):
             return result
         return payload
 
-    def _replace_guids_with_channels(self, payload: Any) -> Any:
+    def _replace_channels_with_guids_at(self, payload: Any, channel_paths: Any) -> Any:
+        # Only the containers on the way to a channel are copied, everything else
+        # is passed through as is.
+        if channel_paths is None or payload is None:
+            return payload
+        if isinstance(payload, Channel):
+            return dict(guid=payload._guid)
+        if isinstance(payload, (list, tuple)):
+            return [
+                self._replace_channels_with_guids_at(item, channel_paths)
+                for item in payload
+            ]
+        if isinstance(payload, dict) and channel_paths is not True:
+            result = dict(payload)
+            for key, item_paths in channel_paths.items():
+                if key in result:
+                    result[key] = self._replace_channels_with_guids_at(
+                        result[key], item_paths
+                    )
+            return result
+        return payload
+
+    def _replace_guids_with_channels(
+        self, payload: Any, channel_paths: Any = ALL_PATHS
+    ) -> Any:
+        if channel_paths is not ALL_PATHS:
+            return self._replace_guids_with_channels_at(payload, channel_paths)
         if payload is None:
             return payload
         if isinstance(payload, list):
@@ -506,17 +557,45 @@ class Connection(EventEmitter):
             return result
         return payload
 
+    def _replace_guids_with_channels_at(self, payload: Any, channel_paths: Any) -> Any:
+        if channel_paths is None or payload is None:
+            return payload
+        if isinstance(payload, list):
+            return [
+                self._replace_guids_with_channels_at(item, channel_paths)
+                for item in payload
+            ]
+        if not isinstance(payload, dict):
+            return payload
+        if channel_paths is True:
+            object = self._objects.get(payload.get("guid"))  # type: ignore
+            return object._channel if object else payload
+        result = dict(payload)
+        for key, item_paths in channel_paths.items():
+            if key in result:
+                result[key] = self._replace_guids_with_channels_at(
+                    result[key], item_paths
+                )
+        return result
+
+    def _parse_call_stack(
+        self, st: "CallStack", is_internal: bool
+    ) -> "ParsedStackTrace":
+        # Without tracing only the first user frame is needed, for the location.
+        if stack_capture_mode == "full" or self._tracing_count > 0:
+            frame_limit: Optional[int] = None
+        else:
+            frame_limit = 1 if stack_capture_mode == "lazy" else 0
+        return _extract_stack_trace_information_from_stack(st, is_internal, frame_limit)
+
     async def wrap_api_call(
         self, cb: Callable[[], Any], is_internal: bool = False
     ) -> Any:
         if self._api_zone.get():
             return await cb()
         task = asyncio.current_task(self._loop)
-        st: List[inspect.FrameInfo] = getattr(
-            task, "__pw_stack__", None
-        ) or inspect.stack(0)
-
-        parsed_st = _extract_stack_trace_information_from_stack(st, is_internal)
+        st: CallStack = getattr(task, "__pw_stack__", None) or capture_call_stack()
+        parsed_st = self._parse_call_stack(st, is_internal)
         self._api_zone.set(parsed_st)
         try:
             return await cb()
@@ -531,10 +610,8 @@ class Connection(EventEmitter):
         if self._api_zone.get():
             return cb()
         task = asyncio.current_task(self._loop)
-        st: List[inspect.FrameInfo] = getattr(
-            task, "__pw_stack__", None
-        ) or inspect.stack(0)
-        parsed_st = _extract_stack_trace_information_from_stack(st, is_internal)
+        st: CallStack = getattr(task, "__pw_stack__", None) or capture_call_stack()
+        parsed_st = self._parse_call_stack(st, is_internal)
         self._api_zone.set(parsed_st)
         try:
             return cb()
@@ -564,47 +641,124 @@ class ParsedStackTrace(TypedDict):
     apiName: Optional[str]
 
 
-def _extract_stack_trace_information_from_stack(
-    st: List[inspect.FrameInfo], is_internal: bool
-) -> ParsedStackTrace:
-    playwright_module_path = str(Path(playwright.__file__).parents[0])
-    last_internal_api_name = ""
-    api_name = ""
-    parsed_frames: List[StackFrame] = []
-    for frame in st:
+# How API calls record their call site, from PLAYWRIGHT_STACK_CAPTURE:
+# - "lazy" (default) walks the frames and only formats them when a call fails
+#   or tracing needs them,
+# - "full" formats the error stack and the traced frames for every call,
+# - "off" walks only as far as needed to resolve the API name.
+stack_capture_mode = os.environ.get("PLAYWRIGHT_STACK_CAPTURE", "lazy")
+if stack_capture_mode not in ("full", "lazy", "off"):
+    stack_capture_mode = "lazy"
+
+_USER_FRAME, _INTERNAL_FRAME, _IGNORED_FRAME = 0, 1, 2
+_playwright_module_path = str(Path(playwright.__file__).parents[0])
+_frame_kinds: Dict[CodeType, Tuple[int, bool]] = {}
+
+
+def _frame_kind(code: CodeType) -> Tuple[int, bool]:
+    # Returns the kind of frames running this code and whether they can have
+    # a "self" local, computed once per code object.
+    info = _frame_kinds.get(code)
+    if info is None:
         # Sync and Async implementations can have event handlers. When these are sync, they
         # get evaluated in the context of the event loop, so they contain the stack trace of when
         # the message was received. _impl_to_api_mapping is glue between the user-code and internal
         # code to translate impl classes to api classes. We want to ignore these frames.
-        if playwright._impl._impl_to_api_mapping.__file__ == frame.filename:
-            continue
-        is_playwright_internal = frame.filename.startswith(playwright_module_path)
+        if code.co_filename == playwright._impl._impl_to_api_mapping.__file__:
+            kind = _IGNORED_FRAME
+        elif code.co_filename.startswith(_playwright_module_path):
+            kind = _INTERNAL_FRAME
+        else:
+            kind = _USER_FRAME
+        has_self = "self" in code.co_varnames + code.co_cellvars + code.co_freevars
+        if len(_frame_kinds) > 10000:
+            # Code compiled at runtime, e.g. with exec(), can create new code objects indefinitely.
+            _frame_kinds.clear()
+        info = _frame_kinds[code] = (kind, has_self)
+    return info
+
+
+def _method_name(frame: FrameType) -> str:
+    if _frame_kind(frame.f_code)[1]:
+        locals = frame.f_locals
+        if "self" in locals:
+            return locals["self"].__class__.__name__ + "." + frame.f_code.co_name
+    return frame.f_code.co_name
+
+
+class CallStack:
+    """Frames of an API call site, innermost first, with the line each one was
+    executing. Source lines are only looked up when the stack is formatted."""
+
+    def __init__(self, frames: List[Tuple[FrameType, int]]) -> None:
+        self.frames = frames
+        self._formatted: Optional[str] = None
+
+    def format(self) -> str:
+        if self._formatted is None:
+            summary = traceback.StackSummary.extract(iter(self.frames), limit=10)
+            summary.reverse()
+            self._formatted = "".join(summary.format())
+        return self._formatted
+
+
+def capture_call_stack(limit: Optional[int] = None) -> CallStack:
+    frames: List[Tuple[FrameType, int]] = []
+    frame: Optional[FrameType] = sys._getframe(1)
+    if stack_capture_mode == "off":
+        in_playwright = False
+        while frame is not None:
+            frames.append((frame, frame.f_lineno))
+            kind = _frame_kind(frame.f_code)[0]
+            if kind == _INTERNAL_FRAME:
+                in_playwright = True
+            elif kind == _USER_FRAME and in_playwright:
+                break
+            frame = frame.f_back
+        return CallStack(frames)
+    while frame is not None and len(frames) != limit:
+        frames.append((frame, frame.f_lineno))
+        frame = frame.f_back
+    st = CallStack(frames)
+    if stack_capture_mode == "full":
+        st.format()
+    return st
 
-        method_name = ""
-        if "self" in frame[0].f_locals:
-            method_name = frame[0].f_locals["self"].__class__.__name__ + "."
-        method_name += frame[0].f_code.co_name
 
-        if not is_playwright_internal:
+def _extract_stack_trace_information_from_stack(
+    st: CallStack, is_internal: bool, frame_limit: Optional[int] = None
+) -> ParsedStackTrace:
+    api_name_frame: Optional[FrameType] = None
+    last_internal_frame: Optional[FrameType] = None
+    parsed_frames: List[StackFrame] = []
+    for frame, lineno in st.frames:
+        code = frame.f_code
+        kind = (_frame_kinds.get(code) or _frame_kind(code))[0]
+        if kind == _IGNORED_FRAME:
+            continue
+        if kind == _INTERNAL_FRAME:
+            last_internal_frame = frame
+            continue
+        if len(parsed_frames) != frame_limit:
             parsed_frames.append(
                 {
-                    "file": frame.filename,
-                    "line": frame.lineno,
+                    "file": frame.f_code.co_filename,
+                    "line": lineno,
                     "column": 0,
-                    "function": method_name,
+                    "function": _method_name(frame),
                 }
             )
-        if is_playwright_internal:
-            last_internal_api_name = method_name
-        elif last_internal_api_name:
-            api_name = last_internal_api_name
-            last_internal_api_name = ""
-    if not api_name:
-        api_name = last_internal_api_name
+        if last_internal_frame:
+            api_name_frame = last_internal_frame
+            last_internal_frame = None
+    if not api_name_frame:
+        api_name_frame = last_internal_frame
 
     return {
         "frames": parsed_frames,
-        "apiName": "" if is_internal else api_name,
+        "apiName": (
+            "" if is_internal or not api_name_frame else _method_name(api_name_frame)
+        ),
     }
 
 
@@ -0,0 +1,80 @@
+# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections.abc
+import json
+import os
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def encode_default(obj: Any) -> Any:
+    """Serializes values API methods accept in protocol params besides JSON types."""
+    if isinstance(obj, os.PathLike):
+        return os.fspath(obj)
+    if isinstance(obj, collections.abc.Sequence) and not isinstance(
+        obj, (str, bytes, bytearray)
+    ):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonCodec:
+    """Encodes and decodes driver protocol messages using the standard library."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=encode_default).encode()
+
+    def loads(self, data: Union[str, bytes, bytearray]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """Encodes and decodes with orjson.
+
+    Messages orjson rejects, such as integers wider than 64 bits or strings with
+    lone surrogates, fall back to the standard library so the output never
+    differs in what can be sent or received.
+    """
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=encode_default)
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, data: Union[str, bytes, bytearray]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().loads(data)
+
+
+def create_json_codec(name: Optional[str] = None) -> JsonCodec:
+    """Returns the fastest available codec.
+
+    PLAYWRIGHT_JSON_CODEC=json forces the standard library implementation.
+    """
+    name = name or os.environ.get("PLAYWRIGHT_JSON_CODEC")
+    if name == "json" or orjson is None:
+        return JsonCodec()
+    return OrjsonCodec()
@@ -14,7 +14,6 @@
 
 import asyncio
 import base64
-import inspect
 import json
 import json as json_utils
 import mimetypes
@@ -47,6 +46,7 @@ from playwright._impl._api_structures import (
 )
 from playwright._impl._connection import (
     ChannelOwner,
+    capture_call_stack,
     from_channel,
     from_nullable_channel,
 )
@@ -530,7 +530,8 @@ class Route(ChannelOwner):
         setattr(
             fut,
             "__pw_stack__",
-            getattr(asyncio.current_task(self._loop), "__pw_stack__", inspect.stack(0)),
+            getattr(asyncio.current_task(self._loop), "__pw_stack__", None)
+            or capture_call_stack(),
         )
         target_closed_future = self.request._target_closed_future()
         await asyncio.wait(
@@ -0,0 +1,494 @@
+# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# This file is generated by scripts/generate_protocol_schema.py, do not edit manually.
+
+# Channel paths: None when a value cannot contain channel references, True when
+# the value itself is a channel reference, otherwise a dict mapping property
+# names to channel paths. Arrays apply the path to each of their items.
+
+from typing import Any, Dict, Tuple
+
+COMMAND_CHANNEL_PATHS: Dict[str, Dict[str, Tuple[Any, Any]]] = {
+    "APIRequestContext": {
+        "dispose": (None, None),
+        "disposeAPIResponse": (None, None),
+        "fetch": (None, None),
+        "fetchLog": (None, None),
+        "fetchResponseBody": (None, None),
+        "storageState": (None, None),
+    },
+    "Android": {
+        "devices": (None, {"devices": True}),
+        "setDefaultTimeoutNoReply": (None, None),
+    },
+    "AndroidDevice": {
+        "close": (None, None),
+        "connectToWebView": (None, {"context": True}),
+        "drag": (None, None),
+        "fill": (None, None),
+        "fling": (None, None),
+        "info": (None, None),
+        "inputDrag": (None, None),
+        "inputPress": (None, None),
+        "inputSwipe": (None, None),
+        "inputTap": (None, None),
+        "inputType": (None, None),
+        "installApk": (None, None),
+        "launchBrowser": (None, {"context": True}),
+        "longTap": (None, None),
+        "open": (None, {"socket": True}),
+        "pinchClose": (None, None),
+        "pinchOpen": (None, None),
+        "push": (None, None),
+        "screenshot": (None, None),
+        "scroll": (None, None),
+        "setDefaultTimeoutNoReply": (None, None),
+        "shell": (None, None),
+        "swipe": (None, None),
+        "tap": (None, None),
+        "wait": (None, None),
+        "waitForEventInfo": (None, None),
+    },
+    "AndroidSocket": {"close": (None, None), "write": (None, None)},
+    "Artifact": {
+        "cancel": (None, None),
+        "delete": (None, None),
+        "failure": (None, None),
+        "pathAfterFinished": (None, None),
+        "saveAs": (None, None),
+        "saveAsStream": (None, {"stream": True}),
+        "stream": (None, {"stream": True}),
+    },
+    "BindingCall": {
+        "reject": (None, None),
+        "resolve": ({"result": {"handles": True}}, None),
+    },
+    "Browser": {
+        "close": (None, None),
+        "defaultUserAgentForTest": (None, None),
+        "killForTests": (None, None),
+        "newBrowserCDPSession": (None, {"session": True}),
+        "newContext": (None, {"context": True}),
+        "newContextForReuse": (None, {"context": True}),
+        "startTracing": ({"page": True}, None),
+        "stopPendingOperations": (None, None),
+        "stopTracing": (None, {"artifact": True}),
+    },
+    "BrowserContext": {
+        "addCookies": (None, None),
+        "addInitScript": (None, None),
+        "clearCookies": (None, None),
+        "clearPermissions": (None, None),
+        "clockFastForward": (None, None),
+        "clockInstall": (None, None),
+        "clockPauseAt": (None, None),
+        "clockResume": (None, None),
+        "clockRunFor": (None, None),
+        "clockSetFixedTime": (None, None),
+        "clockSetSystemTime": (None, None),
+        "close": (None, None),
+        "cookies": (None, None),
+        "createTempFiles": (None, {"rootDir": True, "writableStreams": True}),
+        "enableRecorder": (None, None),
+        "exposeBinding": (None, None),
+        "grantPermissions": (None, None),
+        "harExport": (None, {"artifact": True}),
+        "harStart": ({"page": True}, None),
+        "newCDPSession": ({"page": True, "frame": True}, {"session": True}),
+        "newPage": (None, {"page": True}),
+        "pause": (None, None),
+        "setDefaultNavigationTimeoutNoReply": (None, None),
+        "setDefaultTimeoutNoReply": (None, None),
+        "setExtraHTTPHeaders": (None, None),
+        "setGeolocation": (None, None),
+        "setHTTPCredentials": (None, None),
+        "setNetworkInterceptionPatterns": (None, None),
+        "setOffline": (None, None),
+        "setWebSocketInterceptionPatterns": (None, None),
+        "storageState": (None, None),
+        "updateSubscription": (None, None),
+        "waitForEventInfo": (None, None),
+    },
+    "BrowserType": {
+        "connectOverCDP": (None, {"browser": True, "defaultContext": True}),
+        "launch": (None, {"browser": True}),
+        "launchPersistentContext": (None, {"context": True}),
+    },
+    "CDPSession": {"detach": (None, None), "send": (None, None)},
+    "DebugController": {
+        "closeAllBrowsers": (None, None),
+        "hideHighlight": (None, None),
+        "highlight": (None, None),
+        "initialize": (None, None),
+        "kill": (None, None),
+        "navigate": (None, None),
+        "resetForReuse": (None, None),
+        "resume": (None, None),
+        "setRecorderMode": (None, None),
+        "setReportStateChanged": (None, None),
+    },
+    "Dialog": {"accept": (None, None), "dismiss": (None, None)},
+    "Electron": {"launch": (None, {"electronApplication": True})},
+    "ElectronApplication": {
+        "browserWindow": ({"page": True}, {"handle": True}),
+        "evaluateExpression": ({"arg": {"handles": True}}, None),
+        "evaluateExpressionHandle": ({"arg": {"handles": True}}, {"handle": True}),
+        "updateSubscription": (None, None),
+        "waitForEventInfo": (None, None),
+    },
+    "ElementHandle": {
+        "boundingBox": (None, None),
+        "check": (None, None),
+        "click": (None, None),
+        "contentFrame": (None, {"frame": True}),
+        "dblclick": (None, None),
+        "dispatchEvent": ({"eventInit": {"handles": True}}, None),
+        "dispose": (None, None),
+        "evalOnSelector": ({"arg": {"handles": True}}, None),
+        "evalOnSelectorAll": ({"arg": {"handles": True}}, None),
+        "evaluateExpression": ({"arg": {"handles": True}}, None),
+        "evaluateExpressionHandle": ({"arg": {"handles": True}}, {"handle": True}),
+        "fill": (None, None),
+        "focus": (None, None),
+        "generateLocatorString": (None, None),
+        "getAttribute": (None, None),
+        "getProperty": (None, {"handle": True}),
+        "getPropertyList": (None, {"properties": {"value": True}}),
+        "hover": (None, None),
+        "innerHTML": (None, None),
+        "innerText": (None, None),
+        "inputValue": (None, None),
+        "isChecked": (None, None),
+        "isDisabled": (None, None),
+        "isEditable": (None, None),
+        "isEnabled": (None, None),
+        "isHidden": (None, None),
+        "isVisible": (None, None),
+        "jsonValue": (None, None),
+        "ownerFrame": (None, {"frame": True}),
+        "press": (None, None),
+        "querySelector": (None, {"element": True}),
+        "querySelectorAll": (None, {"elements": True}),
+        "screenshot": ({"mask": {"frame": True}}, None),
+        "scrollIntoViewIfNeeded": (None, None),
+        "selectOption": ({"elements": True}, None),
+        "selectText": (None, None),
+        "setInputFiles": ({"directoryStream": True, "streams": True}, None),
+        "tap": (None, None),
+        "textContent": (None, None),
+        "type": (None, None),
+        "uncheck": (None, None),
+        "waitForElementState": (None, None),
+        "waitForSelector": (None, {"element": True}),
+    },
+    "EventTarget": {"waitForEventInfo": (None, None)},
+    "Frame": {
+        "addScriptTag": (None, {"element": True}),
+        "addStyleTag": (None, {"element": True}),
+        "ariaSnapshot": (None, None),
+        "blur": (None, None),
+        "check": (None, None),
+        "click": (None, None),
+        "content": (None, None),
+        "dblclick": (None, None),
+        "dispatchEvent": ({"eventInit": {"handles": True}}, None),
+        "dragAndDrop": (None, None),
+        "evalOnSelector": ({"arg": {"handles": True}}, None),
+        "evalOnSelectorAll": ({"arg": {"handles": True}}, None),
+        "evaluateExpression": ({"arg": {"handles": True}}, None),
+        "evaluateExpressionHandle": ({"arg": {"handles": True}}, {"handle": True}),
+        "expect": ({"expectedValue": {"handles": True}}, None),
+        "fill": (None, None),
+        "focus": (None, None),
+        "frameElement": (None, {"element": True}),
+        "getAttribute": (None, None),
+        "goto": (None, {"response": True}),
+        "highlight": (None, None),
+        "hover": (None, None),
+        "innerHTML": (None, None),
+        "innerText": (None, None),
+        "inputValue": (None, None),
+        "isChecked": (None, None),
+        "isDisabled": (None, None),
+        "isEditable": (None, None),
+        "isEnabled": (None, None),
+        "isHidden": (None, None),
+        "isVisible": (None, None),
+        "press": (None, None),
+        "queryCount": (None, None),
+        "querySelector": (None, {"element": True}),
+        "querySelectorAll": (None, {"elements": True}),
+        "selectOption": ({"elements": True}, None),
+        "setContent": (None, None),
+        "setInputFiles": ({"directoryStream": True, "streams": True}, None),
+        "tap": (None, None),
+        "textContent": (None, None),
+        "title": (None, None),
+        "type": (None, None),
+        "uncheck": (None, None),
+        "waitForFunction": ({"arg": {"handles": True}}, {"handle": True}),
+        "waitForSelector": (None, {"element": True}),
+        "waitForTimeout": (None, None),
+    },
+    "JSHandle": {
+        "dispose": (None, None),
+        "evaluateExpression": ({"arg": {"handles": True}}, None),
+        "evaluateExpressionHandle": ({"arg": {"handles": True}}, {"handle": True}),
+        "getProperty": (None, {"handle": True}),
+        "getPropertyList": (None, {"properties": {"value": True}}),
+        "jsonValue": (None, None),
+    },
+    "JsonPipe": {"close": (None, None), "send": (None, None)},
+    "LocalUtils": {
+        "addStackToTracingNoReply": (None, None),
+        "connect": (None, {"pipe": True}),
+        "globToRegex": (None, None),
+        "harClose": (None, None),
+        "harLookup": (None, None),
+        "harOpen": (None, None),
+        "harUnzip": (None, None),
+        "traceDiscarded": (None, None),
+        "tracingStarted": (None, None),
+        "zip": (None, None),
+    },
+    "Page": {
+        "accessibilitySnapshot": ({"root": True}, None),
+        "addInitScript": (None, None),
+        "bringToFront": (None, None),
+        "close": (None, None),
+        "emulateMedia": (None, None),
+        "expectScreenshot": (
+            {"locator": {"frame": True}, "mask": {"frame": True}},
+            None,
+        ),
+        "exposeBinding": (None, None),
+        "goBack": (None, {"response": True}),
+        "goForward": (None, {"response": True}),
+        "keyboardDown": (None, None),
+        "keyboardInsertText": (None, None),
+        "keyboardPress": (None, None),
+        "keyboardType": (None, None),
+        "keyboardUp": (None, None),
+        "mouseClick": (None, None),
+        "mouseDown": (None, None),
+        "mouseMove": (None, None),
+        "mouseUp": (None, None),
+        "mouseWheel": (None, None),
+        "pdf": (None, None),
+        "registerLocatorHandler": (None, None),
+        "reload": (None, {"response": True}),
+        "requestGC": (None, None),
+        "resolveLocatorHandlerNoReply": (None, None),
+        "screenshot": ({"mask": {"frame": True}}, None),
+        "setDefaultNavigationTimeoutNoReply": (None, None),
+        "setDefaultTimeoutNoReply": (None, None),
+        "setExtraHTTPHeaders": (None, None),
+        "setNetworkInterceptionPatterns": (None, None),
+        "setViewportSize": (None, None),
+        "setWebSocketInterceptionPatterns": (None, None),
+        "startCSSCoverage": (None, None),
+        "startJSCoverage": (None, None),
+        "stopCSSCoverage": (None, None),
+        "stopJSCoverage": (None, None),
+        "touchscreenTap": (None, None),
+        "unregisterLocatorHandler": (None, None),
+        "updateSubscription": (None, None),
+        "waitForEventInfo": (None, None),
+    },
+    "Playwright": {"newRequest": (None, {"request": True})},
+    "Request": {
+        "rawRequestHeaders": (None, None),
+        "response": (None, {"response": True}),
+    },
+    "Response": {
+        "body": (None, None),
+        "rawResponseHeaders": (None, None),
+        "securityDetails": (None, None),
+        "serverAddr": (None, None),
+        "sizes": (None, None),
+    },
+    "Root": {"initialize": (None, {"playwright": True})},
+    "Route": {
+        "abort": (None, None),
+        "continue": (None, None),
+        "fulfill": (None, None),
+        "redirectNavigationRequest": (None, None),
+    },
+    "Selectors": {"register": (None, None), "setTestIdAttributeName": (None, None)},
+    "SocksSupport": {
+        "socksConnected": (None, None),
+        "socksData": (None, None),
+        "socksEnd": (None, None),
+        "socksError": (None, None),
+        "socksFailed": (None, None),
+    },
+    "Stream": {"close": (None, None), "read": (None, None)},
+    "Tracing": {
+        "tracingGroup": (None, None),
+        "tracingGroupEnd": (None, None),
+        "tracingStart": (None, None),
+        "tracingStartChunk": (None, None),
+        "tracingStop": (None, None),
+        "tracingStopChunk": (None, {"artifact": True}),
+    },
+    "WebSocket": {"waitForEventInfo": (None, None)},
+    "WebSocketRoute": {
+        "closePage": (None, None),
+        "closeServer": (None, None),
+        "connect": (None, None),
+        "ensureOpened": (None, None),
+        "sendToPage": (None, None),
+        "sendToServer": (None, None),
+    },
+    "Worker": {
+        "evaluateExpression": ({"arg": {"handles": True}}, None),
+        "evaluateExpressionHandle": ({"arg": {"handles": True}}, {"handle": True}),
+    },
+    "WritableStream": {"close": (None, None), "write": (None, None)},
+}
+
+EVENT_CHANNEL_PATHS: Dict[str, Dict[str, Any]] = {
+    "APIRequestContext": {},
+    "Android": {},
+    "AndroidDevice": {"close": None, "webViewAdded": None, "webViewRemoved": None},
+    "AndroidSocket": {"close": None, "data": None},
+    "Artifact": {},
+    "BindingCall": {},
+    "Browser": {"close": None},
+    "BrowserContext": {
+        "backgroundPage": {"page": True},
+        "bindingCall": {"binding": True},
+        "close": None,
+        "console": {"args": True, "page": True},
+        "dialog": {"dialog": True},
+        "page": {"page": True},
+        "pageError": {"page": True},
+        "request": {"request": True, "page": True},
+        "requestFailed": {"request": True, "page": True},
+        "requestFinished": {"request": True, "response": True, "page": True},
+        "response": {"response": True, "page": True},
+        "route": {"route": True},
+        "serviceWorker": {"worker": True},
+        "video": {"artifact": True},
+        "webSocketRoute": {"webSocketRoute": True},
+    },
+    "BrowserType": {},
+    "CDPSession": {"event": None},
+    "DebugController": {
+        "inspectRequested": None,
+        "paused": None,
+        "setModeRequested": None,
+        "sourceChanged": None,
+        "stateChanged": None,
+    },
+    "Dialog": {},
+    "Electron": {},
+    "ElectronApplication": {"close": None, "console": {"args": True}},
+    "ElementHandle": {"previewUpdated": None},
+    "EventTarget": {},
+    "Frame": {"loadstate": None, "navigated": {"newDocument": {"request": True}}},
+    "JSHandle": {"previewUpdated": None},
+    "JsonPipe": {"closed": None, "message": None},
+    "LocalUtils": {},
+    "Page": {
+        "bindingCall": {"binding": True},
+        "close": None,
+        "crash": None,
+        "download": {"artifact": True},
+        "fileChooser": {"element": True},
+        "frameAttached": {"frame": True},
+        "frameDetached": {"frame": True},
+        "locatorHandlerTriggered": None,
+        "route": {"route": True},
+        "video": {"artifact": True},
+        "webSocket": {"webSocket": True},
+        "webSocketRoute": {"webSocketRoute": True},
+        "worker": {"worker": True},
+    },
+    "Playwright": {},
+    "Request": {},
+    "Response": {},
+    "Root": {},
+    "Route": {},
+    "Selectors": {},
+    "SocksSupport": {"socksClosed": None, "socksData": None, "socksRequested": None},
+    "Stream": {},
+    "Tracing": {},
+    "WebSocket": {
+        "close": None,
+        "frameReceived": None,
+        "frameSent": None,
+        "open": None,
+        "socketError": None,
+    },
+    "WebSocketRoute": {
+        "closePage": None,
+        "closeServer": None,
+        "messageFromPage": None,
+        "messageFromServer": None,
+    },
+    "Worker": {"close": None},
+    "WritableStream": {},
+}
+
+INITIALIZER_CHANNEL_PATHS: Dict[str, Any] = {
+    "APIRequestContext": {"tracing": True},
+    "Android": None,
+    "AndroidDevice": None,
+    "AndroidSocket": None,
+    "Artifact": None,
+    "BindingCall": {"frame": True, "handle": True},
+    "Browser": None,
+    "BrowserContext": {"requestContext": True, "tracing": True},
+    "BrowserType": None,
+    "CDPSession": None,
+    "DebugController": None,
+    "Dialog": {"page": True},
+    "Electron": None,
+    "ElectronApplication": {"context": True},
+    "ElementHandle": None,
+    "EventTarget": None,
+    "Frame": {"parentFrame": True},
+    "JSHandle": None,
+    "JsonPipe": None,
+    "LocalUtils": None,
+    "Page": {"mainFrame": True, "opener": True},
+    "Playwright": {
+        "chromium": True,
+        "firefox": True,
+        "webkit": True,
+        "bidiChromium": True,
+        "bidiFirefox": True,
+        "android": True,
+        "electron": True,
+        "utils": True,
+        "selectors": True,
+        "preLaunchedBrowser": True,
+        "preConnectedAndroidDevice": True,
+        "socksSupport": True,
+    },
+    "Request": {"frame": True, "serviceWorker": True, "redirectedFrom": True},
+    "Response": {"request": True},
+    "Root": None,
+    "Route": {"request": True},
+    "Selectors": None,
+    "SocksSupport": None,
+    "Stream": None,
+    "Tracing": None,
+    "WebSocket": None,
+    "WebSocketRoute": None,
+    "Worker": None,
+    "WritableStream": None,
+}
@@ -13,8 +13,6 @@
 # limitations under the License.
 
 import asyncio
-import inspect
-import traceback
 from contextlib import AbstractContextManager
 from types import TracebackType
 from typing import (
@@ -32,6 +30,7 @@ from typing import (
 
 import greenlet
 
+from playwright._impl._connection import capture_call_stack
 from playwright._impl._helper import Error
 from playwright._impl._impl_to_api_mapping import ImplToApiMapping, ImplWrapper
 
@@ -105,8 +104,7 @@ class SyncBase(ImplWrapper):
 
         g_self = greenlet.getcurrent()
         task: asyncio.tasks.Task[Any] = self._loop.create_task(coro)
-        setattr(task, "__pw_stack__", inspect.stack(0))
-        setattr(task, "__pw_stack_trace__", traceback.extract_stack(limit=10))
+        setattr(task, "__pw_stack__", capture_call_stack())
 
         task.add_done_callback(lambda _: g_self.switch())
         while not task.done():
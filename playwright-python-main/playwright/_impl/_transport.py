@@ -19,10 +19,11 @@ import os
 import subprocess
 import sys
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 
 from playwright._impl._driver import compute_driver_executable, get_driver_env
 from playwright._impl._helper import ParsedMessagePayload
+from playwright._impl._json_codec import JsonCodec, create_json_codec, encode_default
 
 
 # Sourced from: https://github.com/pytest-dev/pytest/blob/da01ee0a4bb0af780167ecd228ab3ad249511302/src/_pytest/faulthandler.py#L69-L77
@@ -46,8 +47,12 @@ def _get_stderr_fileno() -> Optional[int]:
 
 
 class Transport(ABC):
-    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, codec: Optional[JsonCodec] = None
+    ) -> None:
         self._loop = loop
+        self._codec = codec or create_json_codec()
+        self._debug = "DEBUGP" in os.environ
         self.on_message: Callable[[ParsedMessagePayload], None] = lambda _: None
         self.on_error_future: asyncio.Future = loop.create_future()
 
@@ -75,27 +80,111 @@ class Transport(ABC):
         pass
 
     def serialize_message(self, message: Dict) -> bytes:
-        msg = json.dumps(message)
-        if "DEBUGP" in os.environ:  # pragma: no cover
-            print("\x1b[32mSEND>\x1b[0m", json.dumps(message, indent=2))
-        return msg.encode()
+        msg = self._codec.dumps(message)
+        if self._debug:  # pragma: no cover
+            print(
+                "\x1b[32mSEND>\x1b[0m",
+                json.dumps(message, indent=2, default=encode_default),
+            )
+        return msg
 
-    def deserialize_message(self, data: Union[str, bytes]) -> ParsedMessagePayload:
-        obj = json.loads(data)
+    def deserialize_message(
+        self, data: Union[str, bytes, bytearray]
+    ) -> ParsedMessagePayload:
+        obj = self._codec.loads(data)
 
-        if "DEBUGP" in os.environ:  # pragma: no cover
+        if self._debug:  # pragma: no cover
             print("\x1b[33mRECV>\x1b[0m", json.dumps(obj, indent=2))
         return obj
 
 
+# Upper bound for a single read from the driver pipe. StreamReader.read returns
+# whatever is already buffered, so this only caps how much is copied at once.
+_READ_CHUNK_SIZE = 1024 * 1024
+
+# Outgoing frames are queued and written together once per loop iteration, or
+# as soon as this many bytes are pending.
+_WRITE_FLUSH_THRESHOLD = 256 * 1024
+
+
+class FrameDecoder:
+    """Reassembles length-prefixed frames (4-byte little-endian length) from the
+    driver pipe.
+
+    Frames that are complete within a chunk are sliced out of it directly. A frame
+    that spans chunks gets a buffer preallocated to its full length, and the
+    following chunks are copied into it, so every byte is copied a bounded number
+    of times regardless of the frame size.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._frame: Optional[bytearray] = None
+        self._frame_view: Optional[memoryview] = None
+        self._frame_filled = 0
+
+    def feed(self, data: bytes) -> List[bytearray]:
+        """Consumes a chunk and returns every frame it completes, in order."""
+        frames: List[bytearray] = []
+        view = memoryview(data)
+
+        if self._frame is not None:
+            assert self._frame_view is not None
+            filled = self._frame_filled
+            needed = len(self._frame) - filled
+            taken = min(needed, len(view))
+            end = filled + taken
+            self._frame_view[filled:end] = view[:taken]
+            self._frame_filled = end
+            if taken < needed:
+                return frames
+            frames.append(self._frame)
+            self._frame_view.release()
+            self._frame = None
+            self._frame_view = None
+            view = view[taken:]
+
+        buffer = self._buffer
+        buffer += view
+        offset = 0
+        while len(buffer) - offset >= 4:
+            start = offset + 4
+            length = int.from_bytes(
+                buffer[offset:start], byteorder="little", signed=False
+            )
+            end = start + length
+            if end <= len(buffer):
+                frames.append(buffer[start:end])
+                offset = end
+                continue
+            frame = bytearray(length)
+            available = len(buffer) - start
+            frame[:available] = buffer[start:]
+            self._frame = frame
+            self._frame_view = memoryview(frame)
+            self._frame_filled = available
+            offset = len(buffer)
+            break
+        del buffer[:offset]
+        return frames
+
+
 class PipeTransport(Transport):
     def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
         super().__init__(loop)
         self._stopped = False
+        self._pending_writes: List[bytes] = []
+        self._pending_bytes = 0
+        self._flush_scheduled = False
+        # Diagnostics: number of writes to the driver and bytes written.
+        self.flush_count = 0
+        self.flushed_bytes = 0
+        self.sent_messages = 0
 
     def request_stop(self) -> None:
         assert self._output
         self._stopped = True
+        self.flush()
         self._output.close()
 
     async def wait_until_stopped(self) -> None:
@@ -137,34 +226,22 @@ class PipeTransport(Transport):
     async def run(self) -> None:
         assert self._proc.stdout
         assert self._proc.stdin
+        decoder = FrameDecoder()
         while not self._stopped:
-            try:
-                buffer = await self._proc.stdout.readexactly(4)
-                if self._stopped:
-                    break
-                length = int.from_bytes(buffer, byteorder="little", signed=False)
-                buffer = bytes(0)
-                while length:
-                    to_read = min(length, 32768)
-                    data = await self._proc.stdout.readexactly(to_read)
-                    if self._stopped:
-                        break
-                    length -= to_read
-                    if len(buffer):
-                        buffer = buffer + data
-                    else:
-                        buffer = data
+            data = await self._proc.stdout.read(_READ_CHUNK_SIZE)
+            if self._stopped:
+                break
+            if not data:
+                self.on_error_future.set_exception(
+                    Exception("Connection closed while reading from the driver")
+                )
+                break
+            # Dispatch every frame that is already buffered, then yield once.
+            for frame in decoder.feed(data):
                 if self._stopped:
                     break
-
-                obj = self.deserialize_message(buffer)
+                obj = self.deserialize_message(frame)
                 self.on_message(obj)
-            except asyncio.IncompleteReadError:
-                if not self._stopped:
-                    self.on_error_future.set_exception(
-                        Exception("Connection closed while reading from the driver")
-                    )
-                break
             await asyncio.sleep(0)
 
         await self._proc.communicate()
@@ -173,6 +250,27 @@ class PipeTransport(Transport):
     def send(self, message: Dict) -> None:
         assert self._output
         data = self.serialize_message(message)
-        self._output.write(
-            len(data).to_bytes(4, byteorder="little", signed=False) + data
+        self._pending_writes.append(
+            len(data).to_bytes(4, byteorder="little", signed=False)
         )
+        self._pending_writes.append(data)
+        self._pending_bytes += 4 + len(data)
+        self.sent_messages += 1
+        if self._pending_bytes >= _WRITE_FLUSH_THRESHOLD:
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Writes all queued frames to the driver in a single call."""
+        self._flush_scheduled = False
+        if not self._pending_writes:
+            return
+        assert self._output
+        pending = self._pending_writes
+        self.flush_count += 1
+        self.flushed_bytes += self._pending_bytes
+        self._pending_writes = []
+        self._pending_bytes = 0
+        self._output.writelines(pending)
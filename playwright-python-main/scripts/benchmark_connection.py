@@ -0,0 +1,173 @@
+# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures how long Connection takes to rewrite guids to channels in incoming
+# payloads and channels to guids in outgoing ones, walking the whole payload
+# versus only the paths the protocol schema lists, and to record the call site
+# of an API call in each stack capture mode, with the previous inspect.stack()
+# based capture as a baseline. Run it against the checkout,
+# e.g. `PYTHONPATH=. python scripts/benchmark_connection.py` when the package is
+# not installed in editable mode.
+
+import asyncio
+import inspect
+import time
+import traceback
+from typing import Any, Callable, List, Tuple
+
+import playwright._impl._connection as connection_module
+from playwright._impl._connection import (
+    ALL_PATHS,
+    ChannelOwner,
+    Connection,
+    capture_call_stack,
+)
+from playwright._impl._protocol_schema import (
+    COMMAND_CHANNEL_PATHS,
+    EVENT_CHANNEL_PATHS,
+    INITIALIZER_CHANNEL_PATHS,
+)
+from playwright._impl._transport import PipeTransport
+
+
+def measure(func: Callable[..., Any], *args: Any) -> float:
+    iterations = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 1:
+        for _ in range(10):
+            func(*args)
+        iterations += 10
+    return iterations / (time.perf_counter() - start)
+
+
+def legacy_capture(connection: Connection) -> None:
+    st = inspect.stack(0)
+    traceback.extract_stack(limit=10)
+    # Parsing needs the frames the previous capture produced, the cost that
+    # matters is inspect.stack() itself.
+    connection._parse_call_stack(
+        connection_module.CallStack([(info.frame, info.lineno) for info in st]),
+        False,
+    )
+
+
+def capture(connection: Connection) -> None:
+    st = capture_call_stack()
+    connection._parse_call_stack(st, False)
+    if connection_module.stack_capture_mode == "full":
+        st.format()
+
+
+def nested_call(depth: int, func: Callable[[], Any]) -> Any:
+    # Puts the capture under a stack as deep as a typical test runner's.
+    if depth:
+        return nested_call(depth - 1, func)
+    return func()
+
+
+async def main() -> None:
+    loop = asyncio.get_running_loop()
+    connection = Connection(None, ChannelOwner, PipeTransport(loop), loop)
+    for type, guid in [
+        ("Page", "page@1"),
+        ("Request", "request@1"),
+        ("Response", "response@1"),
+        ("ElementHandle", "handle@1"),
+    ]:
+        ChannelOwner(connection, type, guid, {})
+
+    headers = [{"name": f"x-header-{i}", "value": "v" * 40} for i in range(60)]
+    rows = [
+        {"o": [{"k": "id", "v": {"n": i}}, {"k": "name", "v": {"s": f"row {i}"}}]}
+        for i in range(10000)
+    ]
+    incoming: List[Tuple[str, Any, Any]] = [
+        (
+            "evaluate result, 10000 rows",
+            {"value": {"a": rows, "id": 1}},
+            COMMAND_CHANNEL_PATHS["Frame"]["evaluateExpression"][1],
+        ),
+        (
+            "Request initializer, 60 headers",
+            {
+                "frame": {"guid": "page@1"},
+                "url": "https://example.com/app.js",
+                "method": "GET",
+                "headers": headers,
+                "isNavigationRequest": False,
+            },
+            INITIALIZER_CHANNEL_PATHS["Request"],
+        ),
+        (
+            "Response initializer, 60 headers",
+            {
+                "request": {"guid": "request@1"},
+                "url": "https://example.com/app.js",
+                "status": 200,
+                "statusText": "OK",
+                "headers": headers,
+                "timing": {"startTime": 1.0, "responseStart": 2.0},
+                "fromServiceWorker": False,
+            },
+            INITIALIZER_CHANNEL_PATHS["Response"],
+        ),
+        (
+            "requestFinished event",
+            {
+                "request": {"guid": "request@1"},
+                "response": {"guid": "response@1"},
+                "page": {"guid": "page@1"},
+                "responseEndTiming": 12.5,
+            },
+            EVENT_CHANNEL_PATHS["BrowserContext"]["requestFinished"],
+        ),
+    ]
+    handle = connection._objects["handle@1"]._channel
+    outgoing: List[Tuple[str, Any, Any]] = [
+        (
+            "evaluate argument, 10000 rows",
+            {
+                "expression": "(rows, handle) => rows.length",
+                "isFunction": True,
+                "arg": {"value": {"a": rows}, "handles": [handle]},
+            },
+            COMMAND_CHANNEL_PATHS["Frame"]["evaluateExpression"][0],
+        ),
+        (
+            "route.fulfill, 60 headers",
+            {"status": 200, "headers": headers, "body": "b" * 1024},
+            COMMAND_CHANNEL_PATHS["Route"]["fulfill"][0],
+        ),
+    ]
+    for direction, rewrite, scenarios in [
+        ("incoming", connection._replace_guids_with_channels, incoming),
+        ("outgoing", connection._replace_channels_with_guids, outgoing),
+    ]:
+        for name, payload, paths in scenarios:
+            print(f"{direction} {name}")
+            for label, scenario_paths in [("full", ALL_PATHS), ("schema", paths)]:
+                rate = measure(rewrite, payload, scenario_paths)
+                print(f"  {label:8} {rate:12,.0f} payloads/s")
+
+    print("call site capture, 40 frames deep")
+    rate = measure(nested_call, 40, lambda: legacy_capture(connection))
+    print(f"  {'legacy':8} {rate:12,.0f} calls/s")
+    for mode in ["full", "lazy", "off"]:
+        connection_module.stack_capture_mode = mode
+        rate = measure(nested_call, 40, lambda: capture(connection))
+        print(f"  {mode:8} {rate:12,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,213 @@
+# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures PipeTransport.run throughput (messages/s and MB/s) by streaming
+# length-prefixed JSON frames through an OS pipe from a writer thread, the same
+# way the driver writes to stdout, and the send side by writing bursts of small
+# messages into a pipe drained by a reader thread. The previous read loop and
+# send are kept here as a baseline. Run it against the checkout, e.g. `PYTHONPATH=. python
+# scripts/benchmark_transport.py` when the package is not installed in
+# editable mode.
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from playwright._impl._transport import PipeTransport
+
+
+class LegacyPipeTransport(PipeTransport):
+    async def run(self) -> None:
+        assert self._proc.stdout
+        assert self._proc.stdin
+        while not self._stopped:
+            try:
+                buffer = await self._proc.stdout.readexactly(4)
+                if self._stopped:
+                    break
+                length = int.from_bytes(buffer, byteorder="little", signed=False)
+                buffer = bytes(0)
+                while length:
+                    to_read = min(length, 32768)
+                    data = await self._proc.stdout.readexactly(to_read)
+                    if self._stopped:
+                        break
+                    length -= to_read
+                    if len(buffer):
+                        buffer = buffer + data
+                    else:
+                        buffer = data
+                if self._stopped:
+                    break
+
+                obj = self.deserialize_message(buffer)
+                self.on_message(obj)
+            except asyncio.IncompleteReadError:
+                if not self._stopped:
+                    self.on_error_future.set_exception(
+                        Exception("Connection closed while reading from the driver")
+                    )
+                break
+            await asyncio.sleep(0)
+
+        await self._proc.communicate()
+        self._stopped_future.set_result(None)
+
+    def send(self, message: Dict) -> None:
+        assert self._output
+        data = self.serialize_message(message)
+        self.flush_count += 1
+        self._output.write(
+            len(data).to_bytes(4, byteorder="little", signed=False) + data
+        )
+
+
+class FakeDriverProcess:
+    def __init__(self, stdout: asyncio.StreamReader) -> None:
+        self.stdout = stdout
+        self.stdin = object()
+
+    async def communicate(self) -> None:
+        pass
+
+
+def encode_stream(messages: List[Dict]) -> bytes:
+    frames = []
+    for message in messages:
+        data = json.dumps(message).encode()
+        frames.append(len(data).to_bytes(4, byteorder="little", signed=False))
+        frames.append(data)
+    return b"".join(frames)
+
+
+def write_pipe(fd: int, stream: bytes) -> None:
+    view = memoryview(stream)
+    while view:
+        written = os.write(fd, view[:65536])
+        view = view[written:]
+    os.close(fd)
+
+
+async def measure(
+    transport_class: Callable[..., PipeTransport], stream: bytes
+) -> Tuple[int, float]:
+    loop = asyncio.get_running_loop()
+    read_fd, write_fd = os.pipe()
+    # Same buffer limit as the driver subprocess in PipeTransport.connect.
+    reader = asyncio.StreamReader(limit=32768)
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, "rb", 0)
+    )
+
+    transport = transport_class(loop)
+    transport._proc = FakeDriverProcess(reader)  # type: ignore
+    transport._stopped_future = loop.create_future()
+    received = 0
+
+    def on_message(_: Any) -> None:
+        nonlocal received
+        received += 1
+
+    transport.on_message = on_message
+    writer = threading.Thread(target=write_pipe, args=(write_fd, stream))
+    start = time.perf_counter()
+    writer.start()
+    await transport.run()
+    elapsed = time.perf_counter() - start
+    writer.join()
+    # The writer closing the pipe is reported as the driver going away.
+    transport.on_error_future.exception()
+    return received, elapsed
+
+
+def drain_pipe(fd: int) -> None:
+    while os.read(fd, 1024 * 1024):
+        pass
+    os.close(fd)
+
+
+async def measure_send(
+    transport_class: Callable[..., PipeTransport], bursts: int, burst_size: int
+) -> Tuple[int, float]:
+    loop = asyncio.get_running_loop()
+    read_fd, write_fd = os.pipe()
+    reader = threading.Thread(target=drain_pipe, args=(read_fd,))
+    reader.start()
+    pipe, protocol = await loop.connect_write_pipe(
+        asyncio.streams.FlowControlMixin, os.fdopen(write_fd, "wb", 0)
+    )
+    output = asyncio.StreamWriter(pipe, protocol, None, loop)
+
+    transport = transport_class(loop)
+    transport._output = output  # type: ignore
+    message = {"id": 1, "guid": "route@1", "method": "continue", "params": {}}
+    start = time.perf_counter()
+    for _ in range(bursts):
+        # Several calls issued from one task, e.g. a HAR replay continuing routes.
+        for _ in range(burst_size):
+            transport.send(message)
+        await asyncio.sleep(0)
+    transport.flush()
+    await output.drain()
+    elapsed = time.perf_counter() - start
+    output.close()
+    # The pipe is closed on the next loop iteration, so wait off the loop.
+    await loop.run_in_executor(None, reader.join)
+    return transport.flush_count, elapsed
+
+
+async def main() -> None:
+    scenarios: List[Tuple[str, List[Dict]]] = [
+        (
+            "50000 x 200 B events",
+            [{"guid": "page@1", "method": "console", "params": {"text": "x" * 150}}]
+            * 50000,
+        ),
+        ("2000 x 64 KB results", [{"id": 1, "result": {"value": "v" * 65536}}] * 2000),
+        (
+            "20 x 8 MB screenshots",
+            [{"id": 1, "result": {"binary": "b" * (8 * 1024 * 1024)}}] * 20,
+        ),
+    ]
+    for name, messages in scenarios:
+        stream = encode_stream(messages)
+        size_mb = len(stream) / 1024 / 1024
+        print(f"{name} ({size_mb:.1f} MB)")
+        for label, transport_class in [
+            ("legacy", LegacyPipeTransport),
+            ("current", PipeTransport),
+        ]:
+            received, elapsed = await measure(transport_class, stream)
+            assert received == len(messages)
+            print(
+                f"  {label:8} {received / elapsed:12,.0f} messages/s {size_mb / elapsed:10,.1f} MB/s"
+            )
+
+    bursts, burst_size = 5000, 20
+    print(f"send {bursts} bursts of {burst_size} route.continue messages")
+    for label, transport_class in [
+        ("legacy", LegacyPipeTransport),
+        ("current", PipeTransport),
+    ]:
+        writes, elapsed = await measure_send(transport_class, bursts, burst_size)
+        print(
+            f"  {label:8} {bursts * burst_size / elapsed:12,.0f} messages/s {writes:10,} writes"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
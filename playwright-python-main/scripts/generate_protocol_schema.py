@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Generates playwright/_impl/_protocol_schema.py from the driver's protocol.yml:
+# for every interface, the paths in command parameters, command results, events
+# and the initializer that can hold channel references.
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+import yaml
+
+from playwright._impl._driver import compute_driver_executable
+
+header = """# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# This file is generated by scripts/generate_protocol_schema.py, do not edit manually.
+
+# Channel paths: None when a value cannot contain channel references, True when
+# the value itself is a channel reference, otherwise a dict mapping property
+# names to channel paths. Arrays apply the path to each of their items.
+
+from typing import Any, Dict, Tuple
+"""
+
+primitive_types = {"string", "number", "boolean", "binary", "json", "undefined"}
+
+
+class ProtocolSchema:
+    def __init__(self, protocol: Dict[str, Any]) -> None:
+        self._protocol = protocol
+        self._type_paths: Dict[str, Any] = {}
+        self._in_progress: Set[str] = set()
+
+    def _named_type_path(self, name: str) -> Any:
+        if name in primitive_types:
+            return None
+        if name == "Channel":
+            return True
+        definition = self._protocol[name]
+        kind = definition["type"]
+        if kind == "interface":
+            return True
+        if kind == "enum":
+            return None
+        if name in self._type_paths:
+            return self._type_paths[name]
+        if name in self._in_progress:
+            # Recursive types are only allowed when they hold no channels, which is
+            # verified once the outermost definition is done.
+            return None
+        self._in_progress.add(name)
+        path = self.properties_path(definition.get("properties"))
+        self._in_progress.remove(name)
+        if path is not None and self._references(definition, name):
+            raise Exception(f"Recursive type {name} contains channels")
+        self._type_paths[name] = path
+        return path
+
+    def _references(self, definition: Any, name: str) -> bool:
+        if isinstance(definition, str):
+            return definition.rstrip("?") == name
+        if isinstance(definition, dict):
+            return any(self._references(value, name) for value in definition.values())
+        return False
+
+    def type_path(self, definition: Any) -> Any:
+        if isinstance(definition, str):
+            return self._named_type_path(definition.rstrip("?"))
+        kind = definition["type"].rstrip("?")
+        if kind == "object":
+            return self.properties_path(definition.get("properties"))
+        if kind == "array":
+            return self.type_path(definition["items"])
+        if kind == "enum":
+            return None
+        return self._named_type_path(kind)
+
+    def properties_path(self, properties: Optional[Dict[str, Any]]) -> Any:
+        result: Dict[str, Any] = {}
+        for key, definition in (properties or {}).items():
+            if key.startswith("$mixin"):
+                mixin = self._named_type_path(definition)
+                if mixin:
+                    result.update(mixin)
+                continue
+            path = self.type_path(definition)
+            if path is not None:
+                result[key] = path
+        return result or None
+
+    def interface_members(self, name: str, section: str) -> Dict[str, Any]:
+        definition = self._protocol[name]
+        members: Dict[str, Any] = {}
+        if definition.get("extends"):
+            members.update(self.interface_members(definition["extends"], section))
+        members.update(definition.get(section) or {})
+        return members
+
+
+def main() -> None:
+    _, entrypoint = compute_driver_executable()
+    protocol_path = Path(entrypoint).parent / "protocol.yml"
+    protocol = yaml.safe_load(protocol_path.read_text(encoding="utf-8"))
+    schema = ProtocolSchema(protocol)
+    interfaces = sorted(
+        name for name, value in protocol.items() if value["type"] == "interface"
+    )
+
+    commands: Dict[str, Dict[str, Any]] = {}
+    events: Dict[str, Dict[str, Any]] = {}
+    initializers: Dict[str, Any] = {}
+    for name in interfaces:
+        commands[name] = {
+            method: (
+                schema.properties_path((command or {}).get("parameters")),
+                schema.properties_path((command or {}).get("returns")),
+            )
+            for method, command in sorted(
+                schema.interface_members(name, "commands").items()
+            )
+        }
+        events[name] = {
+            event: schema.properties_path((definition or {}).get("parameters"))
+            for event, definition in sorted(
+                schema.interface_members(name, "events").items()
+            )
+        }
+        initializers[name] = schema.properties_path(protocol[name].get("initializer"))
+
+    print(header)
+    print(
+        f"COMMAND_CHANNEL_PATHS: Dict[str, Dict[str, Tuple[Any, Any]]] = {commands!r}"
+    )
+    print("")
+    print(f"EVENT_CHANNEL_PATHS: Dict[str, Dict[str, Any]] = {events!r}")
+    print("")
+    print(f"INITIALIZER_CHANNEL_PATHS: Dict[str, Any] = {initializers!r}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -18,6 +18,7 @@ function update_api {
 
 update_api "playwright/sync_api/_generated.py" "scripts/generate_sync_api.py"
 update_api "playwright/async_api/_generated.py" "scripts/generate_async_api.py"
+update_api "playwright/_impl/_protocol_schema.py" "scripts/generate_protocol_schema.py"
 
 playwright install
 
@@ -0,0 +1,190 @@
+# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+import playwright
+import playwright._impl._connection as connection_module
+from playwright._impl._connection import (
+    CallStack,
+    ChannelOwner,
+    Connection,
+    capture_call_stack,
+)
+from playwright._impl._json_codec import JsonCodec, OrjsonCodec
+from playwright._impl._protocol_schema import (
+    COMMAND_CHANNEL_PATHS,
+    EVENT_CHANNEL_PATHS,
+    INITIALIZER_CHANNEL_PATHS,
+)
+from playwright._impl._transport import PipeTransport
+
+
+def create_connection() -> Connection:
+    loop = asyncio.get_running_loop()
+    connection = Connection(None, ChannelOwner, PipeTransport(loop), loop)
+    for type, guid in [
+        ("Page", "page@1"),
+        ("Frame", "frame@1"),
+        ("Request", "request@1"),
+        ("Response", "response@1"),
+        ("ElementHandle", "handle@1"),
+    ]:
+        ChannelOwner(connection, type, guid, {})
+    return connection
+
+
+headers: List[Dict[str, str]] = [
+    {"name": f"x-header-{i}", "value": "v" * 40} for i in range(50)
+]
+
+
+@pytest.mark.asyncio
+async def test_schema_paths_should_match_full_walk_for_incoming_payloads() -> None:
+    connection = create_connection()
+    payloads: List[Any] = [
+        (
+            EVENT_CHANNEL_PATHS["BrowserContext"]["requestFinished"],
+            {
+                "request": {"guid": "request@1"},
+                "response": {"guid": "response@1"},
+                "page": {"guid": "page@1"},
+                "responseEndTiming": 12.5,
+            },
+        ),
+        (
+            COMMAND_CHANNEL_PATHS["Frame"]["querySelectorAll"][1],
+            {"elements": [{"guid": "handle@1"}, {"guid": "handle@1"}]},
+        ),
+        (COMMAND_CHANNEL_PATHS["Frame"]["evaluateExpression"][1], None),
+    ]
+    for channel_paths, payload in payloads:
+        assert connection._replace_guids_with_channels(
+            payload, channel_paths
+        ) == connection._replace_guids_with_channels(payload)
+
+    initializer = {
+        "request": {"guid": "request@1"},
+        "url": "https://example.com",
+        "status": 200,
+        "headers": headers,
+        # Looks like a channel reference, but is plain data.
+        "timing": {"guid": "page@1"},
+    }
+    response = connection._replace_guids_with_channels(
+        initializer, INITIALIZER_CHANNEL_PATHS["Response"]
+    )
+    assert response["request"] is connection._objects["request@1"]._channel
+    assert response["timing"] == {"guid": "page@1"}
+    assert response["headers"] is headers
+
+
+@pytest.mark.asyncio
+async def test_schema_paths_should_match_full_walk_for_outgoing_payloads() -> None:
+    connection = create_connection()
+    handle = connection._objects["handle@1"]._channel
+    params = {
+        "expression": "(a, b) => a",
+        "isFunction": True,
+        "arg": {
+            "value": {"a": [{"h": 0}, {"v": "undefined"}]},
+            "handles": [handle, handle],
+        },
+    }
+    channel_paths = COMMAND_CHANNEL_PATHS["Frame"]["evaluateExpression"][0]
+    result = connection._replace_channels_with_guids(params, channel_paths)
+    assert result == connection._replace_channels_with_guids(params)
+    assert result["arg"]["handles"] == [{"guid": "handle@1"}] * 2
+    assert result["arg"]["value"] is params["arg"]["value"]  # type: ignore
+    assert params["arg"]["handles"] == [handle, handle]  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_dispatch_should_report_bad_event_payload_to_listener_error(
+    capsys: pytest.CaptureFixture,
+) -> None:
+    connection = create_connection()
+    # A guid that is not a string cannot be looked up (unhashable).
+    message: Any = {
+        "guid": "page@1",
+        "method": "frameAttached",
+        "params": {"frame": {"guid": ["frame@1"]}},
+    }
+    connection.dispatch(message)
+    assert isinstance(connection._error, TypeError)
+    assert "Error occurred in event listener" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("codec", [JsonCodec(), OrjsonCodec()])
+def test_codec_should_encode_paths_and_sequences(codec: JsonCodec) -> None:
+    if codec.name == "orjson":
+        pytest.importorskip("orjson")
+    message = {"localPaths": (Path("a.txt"), "b.txt"), "keys": range(3)}
+    assert codec.loads(codec.dumps(message)) == {
+        "localPaths": ["a.txt", "b.txt"],
+        "keys": [0, 1, 2],
+    }
+
+
+class Locator:
+    # Stands in for a public API class: its code is compiled as if it was part
+    # of the playwright package.
+    exec(
+        compile(
+            "def click(self, capture):\n    return capture()\n",
+            str(Path(playwright.__file__).parent / "sync_api" / "_generated.py"),
+            "exec",
+        )
+    )
+
+
+def call_api(capture: Callable[[], CallStack]) -> CallStack:
+    return Locator().click(capture)  # type: ignore
+
+
+@pytest.mark.parametrize("mode", ["full", "lazy", "off"])
+@pytest.mark.asyncio
+async def test_call_stack_should_resolve_api_name(
+    monkeypatch: pytest.MonkeyPatch, mode: str
+) -> None:
+    monkeypatch.setattr(connection_module, "stack_capture_mode", mode)
+    connection = create_connection()
+    st = call_api(capture_call_stack)
+    parsed = connection._parse_call_stack(st, False)
+    assert parsed["apiName"] == "Locator.click"
+    assert connection._parse_call_stack(st, True)["apiName"] == ""
+
+    if mode == "off":
+        assert parsed["frames"] == []
+        return
+    assert parsed["frames"][0]["file"] == __file__
+    assert parsed["frames"][0]["function"] == "call_api"
+    assert len(parsed["frames"]) == (1 if mode == "lazy" else len(st.frames) - 1)
+    connection.set_is_tracing(True)
+    frames = connection._parse_call_stack(st, False)["frames"]
+    assert [frame["function"] for frame in frames[:2]] == [
+        "call_api",
+        "test_call_stack_should_resolve_api_name",
+    ]
+    assert len(frames) == len(st.frames) - 1
+
+
+def test_call_stack_should_format_like_traceback() -> None:
+    st, expected = capture_call_stack(), traceback.extract_stack(limit=10)
+    assert st.format() == "".join(expected.format())
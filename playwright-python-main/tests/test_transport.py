@@ -0,0 +1,156 @@
+# Copyright (c) Microsoft Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+from playwright._impl._json_codec import JsonCodec, OrjsonCodec, create_json_codec
+from playwright._impl._transport import FrameDecoder, PipeTransport
+
+
+def encode(message: Dict) -> bytes:
+    data = json.dumps(message).encode()
+    return len(data).to_bytes(4, byteorder="little", signed=False) + data
+
+
+def split(data: bytes, size: int) -> List[bytes]:
+    starts = range(0, len(data), size)
+    return [
+        data[start:end]
+        for start, end in zip(starts, range(size, len(data) + size, size))
+    ]
+
+
+def decode_all(decoder: FrameDecoder, chunks: List[bytes]) -> List[Any]:
+    return [json.loads(frame) for chunk in chunks for frame in decoder.feed(chunk)]
+
+
+def test_frame_decoder_should_split_frames_at_any_boundary() -> None:
+    messages = [{"id": i, "payload": "x" * i} for i in range(5)]
+    stream = b"".join(encode(message) for message in messages)
+    for size in [1, 2, 3, 5, 7, 64, len(stream)]:
+        assert decode_all(FrameDecoder(), split(stream, size)) == messages
+
+
+def test_frame_decoder_should_reassemble_large_frames() -> None:
+    large = {"id": 1, "result": {"binary": "a" * (5 * 1024 * 1024)}}
+    stream = encode(large) + encode({"id": 2}) + encode({"id": 3})
+    assert decode_all(FrameDecoder(), split(stream, 32768)) == [
+        large,
+        {"id": 2},
+        {"id": 3},
+    ]
+
+
+class FakeDriverProcess:
+    def __init__(self, stdout: asyncio.StreamReader) -> None:
+        self.stdout = stdout
+        self.stdin = object()
+
+    async def communicate(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_pipe_transport_should_dispatch_buffered_frames_in_order() -> None:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=32768)
+    messages = [{"id": i, "payload": "y" * (i * 10000)} for i in range(20)]
+    reader.feed_data(b"".join(encode(message) for message in messages))
+    reader.feed_eof()
+
+    transport = PipeTransport(loop)
+    transport._proc = FakeDriverProcess(reader)  # type: ignore
+    transport._stopped_future = loop.create_future()
+    received: List[Any] = []
+    transport.on_message = received.append
+    await transport.run()
+
+    assert received == messages
+    with pytest.raises(Exception, match="Connection closed while reading"):
+        transport.on_error_future.result()
+
+
+class FakeDriverStdin:
+    def __init__(self) -> None:
+        self.writes: List[bytes] = []
+        self.closed = False
+
+    def writelines(self, data: List[bytes]) -> None:
+        assert not self.closed
+        self.writes.append(b"".join(data))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_pipe_transport_should_coalesce_writes_in_order() -> None:
+    transport = PipeTransport(asyncio.get_running_loop())
+    stdin = FakeDriverStdin()
+    transport._output = stdin  # type: ignore
+    messages = [{"id": i, "method": "updateSubscription"} for i in range(10)]
+    for message in messages:
+        transport.send(message)
+    assert stdin.writes == []
+
+    await asyncio.sleep(0)
+    assert len(stdin.writes) == 1
+    assert decode_all(FrameDecoder(), stdin.writes) == messages
+    assert transport.flush_count == 1
+    assert transport.flushed_bytes == len(stdin.writes[0])
+    assert transport.sent_messages == 10
+
+    # Large payloads are written right away, after the frames queued before them.
+    transport.send({"id": 10})
+    transport.send({"id": 11, "params": {"buffer": "z" * 512 * 1024}})
+    assert len(stdin.writes) == 2
+    assert [
+        message["id"] for message in decode_all(FrameDecoder(), stdin.writes)
+    ] == list(range(12))
+
+    # Stopping flushes what is still queued before closing the pipe.
+    transport.send({"id": 12})
+    transport.request_stop()
+    assert stdin.closed
+    assert decode_all(FrameDecoder(), stdin.writes[2:]) == [{"id": 12}]
+
+
+def test_json_codec_should_be_selectable_with_env(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("PLAYWRIGHT_JSON_CODEC", "json")
+    assert create_json_codec().name == "json"
+
+
+def test_orjson_codec_should_match_stdlib() -> None:
+    pytest.importorskip("orjson")
+    assert create_json_codec("orjson").name == "orjson"
+    codec = OrjsonCodec()
+    stdlib = JsonCodec()
+    message = {
+        "id": 1,
+        "guid": "page@1",
+        "method": "evaluateExpression",
+        "params": {"expression": "() => '😀 ü \\n'", "arg": {"v": "undefined"}},
+        "values": [0.5, -1, True, None, [], {}],
+    }
+    assert codec.loads(codec.dumps(message)) == stdlib.loads(stdlib.dumps(message))
+    assert codec.loads(bytearray(stdlib.dumps(message))) == message
+    # Not supported by orjson, handled by the stdlib fallback.
+    assert codec.loads(codec.dumps({"n": 2**70})) == {"n": 2**70}
+    assert codec.loads(b'{"s": "\\ud800"}') == {"s": "\ud800"}
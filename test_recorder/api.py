@@ -2,7 +2,7 @@
 import json
 import asyncio
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from pathlib import Path
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
@@ -13,13 +13,18 @@ from loguru import logger
 
 from config.settings import settings
 from core.models import TestSession, ActionRecord, TestCase
-# 使用新的实时录制器
-from core.realtime_recorder import realtime_recorder
+# 实时录制会话由多会话录制管理器管理（共享浏览器）
+from core.recording_manager import recording_manager, AdmissionError
 # 新增：导入Inspector录制器
 from core.inspector_recorder import inspector_recorder
+from core.event_channel import recorder_event_channel, RecorderEvent
 from core.ai_generator import ai_generator
+from core.playwright_analyzer import playwright_analyzer
 from utils.file_manager import FileManager
 from utils.export_handler import export_handler
+from utils.io_pool import io_pool, run_io, read_text_file
+from utils.job_manager import job_manager, Job
+from utils.loop_monitor import loop_lag_monitor
 
 # 创建文件管理器实例
 file_manager = FileManager()
@@ -31,110 +36,418 @@ app = FastAPI(title="测试用例录制系统（跨窗口增强版）", version=
 app.mount("/static", StaticFiles(directory=str(settings.STATIC_DIR)), name="static")
 
 # WebSocket连接管理
+class ClientConnection:
+    """单个WebSocket客户端连接
+
+    每个连接拥有独立的有界发送队列和写入任务，慢速客户端不会阻塞其他客户端的广播。
+    发送队列满时按照 WS_SLOW_CONSUMER_POLICY 处理：
+    - drop: 丢弃最旧的消息
+    - coalesce: 将积压的消息合并为一个batch消息（超过 WS_BATCH_MAX_BYTES 时丢弃最旧的部分）
+    - disconnect: 断开该客户端
+    队列中的每一项是 (消息, 消息包含的录制器事件)，消息发送完成后才记录这些事件的投递延迟
+    """
+    
+    BATCH_PREFIX = '{"type": "batch", "messages": ['
+    BATCH_SUFFIX = ']}'
+    
+    def __init__(self, websocket: WebSocket, on_close=None):
+        self.websocket = websocket
+        self.policy = settings.WS_SLOW_CONSUMER_POLICY
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self.writer_task: Optional[asyncio.Task] = None
+        self.closed = False
+        self._on_close = on_close
+        # 订阅的会话ID，为空时接收所有会话的消息
+        self.topics: Set[str] = set()
+        
+        # 统计信息
+        self.connected_at = datetime.now()
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.coalesced_count = 0
+        self.max_queue_depth = 0
+    
+    def wants(self, session_id: Optional[str]) -> bool:
+        """是否需要接收指定会话的消息（全局消息总是接收）"""
+        return not self.topics or session_id is None or session_id in self.topics
+    
+    def start(self):
+        """启动写入任务"""
+        self.writer_task = asyncio.create_task(self._writer())
+    
+    def enqueue(self, message: str, events: Optional[List[RecorderEvent]] = None) -> bool:
+        """将消息加入发送队列（不等待），返回客户端是否仍然可用"""
+        if self.closed:
+            return False
+        
+        item = (message, events or [])
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if self.policy == "disconnect":
+                logger.warning(f"WebSocket客户端发送队列已满（{self.queue.maxsize}），断开慢速客户端")
+                self.dropped_count += self.queue.qsize() + 1
+                self.close()
+                return False
+            elif self.policy == "coalesce":
+                self._coalesce(item)
+            else:
+                # 丢弃最旧的消息，保留最新状态
+                self.queue.get_nowait()
+                self.queue.put_nowait(item)
+                self.dropped_count += 1
+        
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+    
+    def _coalesce(self, item: Tuple[str, List[RecorderEvent]]):
+        """将积压的消息与新消息合并为一个batch消息"""
+        pending = []
+        while True:
+            try:
+                message, events = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            # 已合并的batch消息展开，避免嵌套
+            if message.startswith(self.BATCH_PREFIX):
+                message = message[len(self.BATCH_PREFIX):-len(self.BATCH_SUFFIX)]
+            pending.append((message, events))
+        pending.append(item)
+        
+        # 从最新的消息往前保留，合并后的大小不超过 WS_BATCH_MAX_BYTES，最新的消息总是保留
+        kept = [item]
+        size = len(self.BATCH_PREFIX) + len(self.BATCH_SUFFIX) + len(item[0].encode('utf-8'))
+        for message, events in reversed(pending[:-1]):
+            size += len(message.encode('utf-8')) + 2
+            if size > settings.WS_BATCH_MAX_BYTES:
+                break
+            kept.append((message, events))
+        kept.reverse()
+        
+        self.dropped_count += len(pending) - len(kept)
+        self.coalesced_count += len(kept) - 1
+        # 消息已是JSON字符串，直接拼接避免重复序列化
+        batch = self.BATCH_PREFIX + ", ".join(message for message, _ in kept) + self.BATCH_SUFFIX
+        self.queue.put_nowait((batch, [event for _, events in kept for event in events]))
+    
+    async def _writer(self):
+        """写入任务：依次发送队列中的消息"""
+        try:
+            while not self.closed:
+                message, events = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(message), timeout=settings.WS_SEND_TIMEOUT)
+                self.sent_count += 1
+                # 发送完成后记录投递延迟（包含在发送队列中等待的时间）
+                for event in events:
+                    recorder_event_channel.mark_delivered(event)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"WebSocket发送超时（{settings.WS_SEND_TIMEOUT}秒），断开客户端")
+            self.close()
+        except Exception as e:
+            logger.error(f"WebSocket发送消息失败: {e}")
+            self.close()
+    
+    def close(self):
+        """关闭连接并停止写入任务"""
+        if self.closed:
+            return
+        self.closed = True
+        
+        if self.writer_task and not self.writer_task.done() and self.writer_task is not asyncio.current_task():
+            self.writer_task.cancel()
+        
+        asyncio.create_task(self._close_websocket())
+        if self._on_close:
+            self._on_close(self.websocket)
+    
+    async def _close_websocket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+    
+    def get_stats(self) -> Dict:
+        """获取连接统计信息"""
+        return {
+            "connected_at": self.connected_at.isoformat(),
+            "topics": sorted(self.topics),
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "sent": self.sent_count,
+            "dropped": self.dropped_count,
+            "coalesced": self.coalesced_count
+        }
+
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
         self.message_processor_task = None
         self.is_processing = False
         
+        # 已断开连接的累计统计
+        self.total_dropped = 0
+        self.total_coalesced = 0
+        self.slow_consumer_disconnects = 0
+        
+        # 动作批量发送统计
+        self.batch_frames = 0
+        self.batched_actions = 0
+        
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, on_close=self._on_client_closed)
+        client.start()
+        self.active_connections[websocket] = client
         logger.info(f"WebSocket连接已建立，当前连接数: {len(self.active_connections)}")
         
         # 启动消息处理器（如果还没有启动）
-        if self.message_processor_task is None or self.message_processor_task.done():
-            logger.info("启动WebSocket消息处理器")
-            self.message_processor_task = asyncio.create_task(self.process_message_queue())
+        self.ensure_processor_started()
     
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            self._collect_stats(client)
+            client.closed = True
+            if client.writer_task and not client.writer_task.done():
+                client.writer_task.cancel()
         logger.info(f"WebSocket连接已断开，当前连接数: {len(self.active_connections)}")
     
+    def _on_client_closed(self, websocket: WebSocket):
+        """客户端因发送失败或处理过慢被关闭"""
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            self._collect_stats(client)
+            self.slow_consumer_disconnects += 1
+            logger.info(f"WebSocket慢速客户端已移除，当前连接数: {len(self.active_connections)}")
+    
+    def _collect_stats(self, client: ClientConnection):
+        self.total_dropped += client.dropped_count
+        self.total_coalesced += client.coalesced_count
+    
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        try:
-            await websocket.send_text(message)
+        client = self.active_connections.get(websocket)
+        if client is None:
+            logger.error("发送个人消息失败: 连接不存在")
+            return
+        if client.enqueue(message):
             logger.debug(f"发送个人消息成功: {message[:100]}...")
-        except Exception as e:
-            logger.error(f"发送个人消息失败: {e}")
     
-    async def broadcast(self, message: str):
-        """广播消息到所有连接"""
+    def subscribe(self, websocket: WebSocket, session_id: str):
+        """订阅指定会话的消息"""
+        client = self.active_connections.get(websocket)
+        if client:
+            client.topics.add(session_id)
+    
+    def unsubscribe(self, websocket: WebSocket, session_id: Optional[str] = None):
+        """取消订阅指定会话（不指定时取消全部订阅，恢复接收所有消息）"""
+        client = self.active_connections.get(websocket)
+        if client:
+            if session_id:
+                client.topics.discard(session_id)
+            else:
+                client.topics.clear()
+    
+    async def broadcast(self, message: str, session_id: Optional[str] = None,
+                        events: Optional[List[RecorderEvent]] = None):
+        """广播消息到订阅了该会话的连接（仅入队，由各连接的写入任务异步发送）
+
+        events为消息包含的录制器事件，各连接发送完成后记录投递延迟
+        """
         if not self.active_connections:
             logger.debug("没有活动的WebSocket连接，跳过广播")
             return
-            
-        logger.debug(f"广播消息到 {len(self.active_connections)} 个连接: {message[:100]}...")
-        disconnected = []
+        
+        clients = [client for client in list(self.active_connections.values()) if client.wants(session_id)]
+        logger.debug(f"广播消息到 {len(clients)} 个连接: {message[:100]}...")
         success_count = 0
         
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
+        for client in clients:
+            if client.enqueue(message, events):
                 success_count += 1
-            except Exception as e:
-                logger.error(f"广播消息失败: {e}")
-                disconnected.append(connection)
-        
-        # 移除断开的连接
-        for connection in disconnected:
-            self.disconnect(connection)
         
-        logger.debug(f"广播完成，成功: {success_count}，失败: {len(disconnected)}")
+        logger.debug(f"广播完成，成功: {success_count}，失败: {len(clients) - success_count}")
+    
+    def get_stats(self) -> Dict:
+        """获取WebSocket连接统计信息"""
+        clients = [client.get_stats() for client in self.active_connections.values()]
+        return {
+            "active_connections": len(clients),
+            "policy": settings.WS_SLOW_CONSUMER_POLICY,
+            "queue_size_limit": settings.WS_SEND_QUEUE_SIZE,
+            "total_queue_depth": sum(c["queue_depth"] for c in clients),
+            "dropped": self.total_dropped + sum(c["dropped"] for c in clients),
+            "coalesced": self.total_coalesced + sum(c["coalesced"] for c in clients),
+            "slow_consumer_disconnects": self.slow_consumer_disconnects,
+            "batch_frames": self.batch_frames,
+            "batched_actions": self.batched_actions,
+            "clients": clients
+        }
     
     async def process_message_queue(self):
-        """处理录制器的消息队列"""
+        """处理录制器推送的事件（事件到达时立即唤醒，无需轮询）
+
+        每次唤醒后取出通道中已到达的全部事件，连续的动作事件合并为一个actions_batch消息帧发送
+        """
         logger.info("WebSocket消息队列处理器已启动")
         self.is_processing = True
         message_count = 0
         
         while True:
             try:
-                # 处理实时录制器的消息队列
-                realtime_queue = realtime_recorder.get_message_queue()
-                inspector_queue = inspector_recorder.get_message_queue()
+                event = await recorder_event_channel.get()
                 
-                # 检查实时录制器队列
-                realtime_queue_size = realtime_queue.qsize()
-                inspector_queue_size = inspector_queue.qsize()
+                # 短暂等待以合并突发事件（默认不等待，只合并本轮已到达的事件）
+                if settings.WS_BATCH_LINGER_MS > 0:
+                    await asyncio.sleep(settings.WS_BATCH_LINGER_MS / 1000)
                 
-                if realtime_queue_size > 0:
-                    logger.debug(f"实时录制器队列中有 {realtime_queue_size} 条消息待处理")
-                
-                if inspector_queue_size > 0:
-                    logger.debug(f"Inspector录制器队列中有 {inspector_queue_size} 条消息待处理")
-                
-                # 处理实时录制器消息
-                while not realtime_queue.empty():
-                    try:
-                        event_type, data = realtime_queue.get_nowait()
-                        message_count += 1
-                        logger.info(f"处理实时录制器消息 #{message_count}: {event_type}")
-                        await self._process_recorder_message(event_type, data, "realtime")
-                    except Exception as e:
-                        logger.error(f"处理实时录制器消息失败: {e}")
-                
-                # 处理Inspector录制器消息
-                while not inspector_queue.empty():
-                    try:
-                        event_type, data = inspector_queue.get_nowait()
-                        message_count += 1
-                        logger.info(f"处理Inspector录制器消息 #{message_count}: {event_type}")
-                        await self._process_recorder_message(event_type, data, "inspector")
-                    except Exception as e:
-                        logger.error(f"处理Inspector录制器消息失败: {e}")
-                
-                # 短暂休眠避免CPU占用过高
-                await asyncio.sleep(0.1)
+                events = [event] + recorder_event_channel.get_nowait_all()
+                message_count += len(events)
+                logger.info(f"处理录制器消息 #{message_count}: 本轮 {len(events)} 条")
+                await self._dispatch_events(events)
                 
+            except asyncio.CancelledError:
+                self.is_processing = False
+                raise
             except Exception as e:
                 logger.error(f"消息队列处理器异常: {e}")
                 import traceback
                 logger.error(f"异常详情: {traceback.format_exc()}")
-                await asyncio.sleep(1)
     
-    async def _process_recorder_message(self, event_type: str, data: any, recorder_type: str):
+    async def _dispatch_events(self, events: List[RecorderEvent]):
+        """分发一轮事件，同一会话的连续动作事件按数量/大小上限合并发送"""
+        pending_actions: List[str] = []
+        pending_events: List[RecorderEvent] = []
+        pending_bytes = 0
+        
+        async def flush():
+            nonlocal pending_actions, pending_events, pending_bytes
+            if not pending_actions:
+                return
+            if len(pending_actions) == 1:
+                frame = self._build_action_frame(pending_events[0].recorder_type, pending_actions[0])
+            else:
+                frame = self._build_actions_batch_frame(pending_actions)
+                self.batch_frames += 1
+                self.batched_actions += len(pending_actions)
+            await self.broadcast(frame, pending_events[0].session_id, pending_events)
+            pending_actions, pending_events, pending_bytes = [], [], 0
+        
+        for event in events:
+            if event.event_type == 'action_recorded':
+                try:
+                    action_json = self._serialize_action(event.data, event.recorder_type)
+                except Exception as e:
+                    logger.error(f"序列化{event.recorder_type}录制器动作失败: {e}")
+                    continue
+                # 不同会话的动作分别发送，保证按会话订阅的客户端只收到自己的动作
+                if pending_events and pending_events[0].session_id != event.session_id:
+                    await flush()
+                pending_actions.append(action_json)
+                pending_events.append(event)
+                pending_bytes += len(action_json)
+                
+                if (len(pending_actions) >= settings.WS_BATCH_MAX_ACTIONS
+                        or pending_bytes >= settings.WS_BATCH_MAX_BYTES):
+                    await flush()
+            else:
+                # 保持事件顺序：先发送已累积的动作
+                await flush()
+                await self._process_recorder_message(event.event_type, event.data, event.recorder_type,
+                                                     event.session_id, [event])
+        
+        await flush()
+    
+    def ensure_processor_started(self):
+        """确保消息处理器已启动"""
+        if self.message_processor_task is None or self.message_processor_task.done():
+            logger.info("启动WebSocket消息处理器")
+            self.message_processor_task = asyncio.create_task(self.process_message_queue())
+    
+    def _build_action_payload(self, data: any, recorder_type: str) -> Dict:
+        """构建动作消息的action部分（增强跨窗口支持）"""
+        # 处理新的消息格式，包含跨窗口信息
+        if isinstance(data, dict) and 'action_record' in data:
+            # 新格式：包含action_record, analyzed_element，以及playwright_code或新增代码行code_delta
+            action_record = data['action_record']
+            analyzed_element = data.get('analyzed_element', {})
+            
+            # 提取跨窗口信息
+            window_info = data.get('window_info', {})
+            cross_window_stats = data.get('cross_window_stats', {})
+            is_cross_window = data.get('is_cross_window', False)
+            
+            logger.debug(f"处理{recorder_type}录制器新格式消息: {action_record.action_type}, 跨窗口: {is_cross_window}")
+            
+            action = {
+                "recorder_type": recorder_type,
+                "id": action_record.id,
+                "action_type": action_record.action_type,
+                "timestamp": action_record.timestamp.isoformat(),
+                "page_url": action_record.page_url,
+                "page_title": action_record.page_title,
+                "title": action_record.page_title,  # 兼容前端
+                "description": action_record.description,
+                "element_info": action_record.element_info,
+                "screenshot_path": action_record.screenshot_path,
+                "additional_data": action_record.additional_data,
+                "analyzed_element": analyzed_element,
+                # 跨窗口增强信息
+                "window_info": window_info,
+                "cross_window_stats": cross_window_stats,
+                "is_cross_window": is_cross_window
+            }
+            if 'code_delta' in data:
+                # 实时录制器：只推送完整脚本中新增的代码行，前端按行数检测缺口后补齐
+                action["session_id"] = action_record.session_id
+                action["code_delta"] = data['code_delta']
+                action["code_line_count"] = data.get('code_line_count', 0)
+            else:
+                action["playwright_code"] = data.get('playwright_code', '')
+        else:
+            # 兼容旧格式
+            action_record = data
+            logger.debug(f"处理{recorder_type}录制器旧格式消息: {action_record.action_type}")
+            
+            action = {
+                "recorder_type": recorder_type,
+                "id": action_record.id,
+                "action_type": action_record.action_type,
+                "timestamp": action_record.timestamp.isoformat(),
+                "page_url": action_record.page_url,
+                "page_title": action_record.page_title,
+                "title": action_record.page_title,  # 兼容前端
+                "description": action_record.description,
+                "element_info": action_record.element_info,
+                "screenshot_path": action_record.screenshot_path,
+                "additional_data": action_record.additional_data,
+                # 默认跨窗口信息
+                "window_info": {},
+                "cross_window_stats": {},
+                "is_cross_window": False
+            }
+        
+        return action
+    
+    def _serialize_action(self, data: any, recorder_type: str) -> str:
+        """序列化动作（每个动作只序列化一次）"""
+        return json.dumps(self._build_action_payload(data, recorder_type), default=str)
+    
+    def _build_action_frame(self, recorder_type: str, action_json: str) -> str:
+        """构建单个动作的消息帧"""
+        return '{"type": "action_recorded", "recorder_type": ' + json.dumps(recorder_type) + ', "action": ' + action_json + '}'
+    
+    def _build_actions_batch_frame(self, actions_json: List[str]) -> str:
+        """将多个已序列化的动作拼接为一个actions_batch消息帧"""
+        return '{"type": "actions_batch", "count": ' + str(len(actions_json)) + ', "actions": [' + ", ".join(actions_json) + ']}'
+    
+    async def _process_recorder_message(self, event_type: str, data: any, recorder_type: str,
+                                        session_id: Optional[str] = None,
+                                        events: Optional[List[RecorderEvent]] = None):
         """处理录制器消息的统一方法（增强跨窗口支持）"""
         try:
             if event_type == 'recording_started':
@@ -147,7 +460,7 @@ class ConnectionManager:
                     "features": data.get('features', [])
                 }
                 message_json = json.dumps(message)
-                await self.broadcast(message_json)
+                await self.broadcast(message_json, session_id, events)
                 logger.info(f"{recorder_type}录制器已开始录制（跨窗口增强版）")
                 
             elif event_type == 'recording_stopped':
@@ -155,6 +468,7 @@ class ConnectionManager:
                 enhanced_data = data.copy() if isinstance(data, dict) else {}
                 
                 # 添加跨窗口统计信息
+                realtime_recorder = recording_manager.get_recorder(session_id) if session_id else None
                 if recorder_type == "realtime" and hasattr(realtime_recorder, 'get_cross_window_stats'):
                     enhanced_data['cross_window_stats'] = realtime_recorder.get_cross_window_stats()
                 elif recorder_type == "inspector" and hasattr(inspector_recorder, 'get_cross_window_statistics'):
@@ -167,77 +481,27 @@ class ConnectionManager:
                     "cross_window_support": True
                 }
                 message_json = json.dumps(message)
-                await self.broadcast(message_json)
+                await self.broadcast(message_json, session_id, events)
                 logger.info(f"{recorder_type}录制器已停止录制（跨窗口增强版）")
                 
             elif event_type == 'action_recorded':
-                # 处理新的消息格式，包含跨窗口信息
-                if isinstance(data, dict) and 'action_record' in data:
-                    # 新格式：包含action_record, playwright_code, analyzed_element
-                    action_record = data['action_record']
-                    playwright_code = data.get('playwright_code', '')
-                    analyzed_element = data.get('analyzed_element', {})
-                    
-                    # 提取跨窗口信息
-                    window_info = data.get('window_info', {})
-                    cross_window_stats = data.get('cross_window_stats', {})
-                    is_cross_window = data.get('is_cross_window', False)
-                    
-                    logger.debug(f"处理{recorder_type}录制器新格式消息: {action_record.action_type}, 跨窗口: {is_cross_window}")
-                    
-                    message = {
-                        "type": "action_recorded",
-                        "recorder_type": recorder_type,
-                        "action": {
-                            "id": action_record.id,
-                            "action_type": action_record.action_type,
-                            "timestamp": action_record.timestamp.isoformat(),
-                            "page_url": action_record.page_url,
-                            "page_title": action_record.page_title,
-                            "title": action_record.page_title,  # 兼容前端
-                            "description": action_record.description,
-                            "element_info": action_record.element_info,
-                            "screenshot_path": action_record.screenshot_path,
-                            "additional_data": action_record.additional_data,
-                            # 新增Playwright相关信息
-                            "playwright_code": playwright_code,
-                            "analyzed_element": analyzed_element,
-                            # 跨窗口增强信息
-                            "window_info": window_info,
-                            "cross_window_stats": cross_window_stats,
-                            "is_cross_window": is_cross_window
-                        }
-                    }
-                else:
-                    # 兼容旧格式
-                    action_record = data
-                    logger.debug(f"处理{recorder_type}录制器旧格式消息: {action_record.action_type}")
-                    
-                    message = {
-                        "type": "action_recorded",
-                        "recorder_type": recorder_type,
-                        "action": {
-                            "id": action_record.id,
-                            "action_type": action_record.action_type,
-                            "timestamp": action_record.timestamp.isoformat(),
-                            "page_url": action_record.page_url,
-                            "page_title": action_record.page_title,
-                            "title": action_record.page_title,  # 兼容前端
-                            "description": action_record.description,
-                            "element_info": action_record.element_info,
-                            "screenshot_path": action_record.screenshot_path,
-                            "additional_data": action_record.additional_data,
-                            # 默认跨窗口信息
-                            "window_info": {},
-                            "cross_window_stats": {},
-                            "is_cross_window": False
-                        }
-                    }
-                
-                message_json = json.dumps(message, default=str)
-                await self.broadcast(message_json)
-                logger.debug(f"广播{recorder_type}录制器动作: {message['action']['action_type']}")
-                
+                action_json = self._serialize_action(data, recorder_type)
+                await self.broadcast(self._build_action_frame(recorder_type, action_json), session_id, events)
+                logger.debug(f"广播{recorder_type}录制器动作")
+
+            elif event_type == 'action_updated':
+                # 已录制的动作被改写（ID不变），前端按ID替换
+                action_json = self._serialize_action(data, recorder_type)
+                frame = '{"type": "action_updated", "recorder_type": ' + json.dumps(recorder_type) + ', "action": ' + action_json + '}'
+                await self.broadcast(frame, session_id, events)
+                logger.debug(f"广播{recorder_type}录制器动作更新")
+
+            elif event_type == 'action_screenshot':
+                # 一张截图对应的一批动作，前端按ID补上截图
+                frame = json.dumps({"type": "action_screenshot", "recorder_type": recorder_type, **data})
+                await self.broadcast(frame, session_id, events)
+                logger.debug(f"广播{recorder_type}录制器截图: {len(data.get('action_ids', []))} 个动作")
+
             else:
                 # 其他类型的消息
                 message = {
@@ -246,7 +510,7 @@ class ConnectionManager:
                     "data": data
                 }
                 message_json = json.dumps(message, default=str)
-                await self.broadcast(message_json)
+                await self.broadcast(message_json, session_id, events)
                 logger.debug(f"广播{recorder_type}录制器消息: {event_type}")
                 
         except Exception as e:
@@ -267,6 +531,9 @@ class StartRecordingRequest(BaseModel):
     # 新增：跨窗口选项
     cross_window_enabled: bool = True  # 是否启用跨窗口录制
 
+class StopRecordingRequest(BaseModel):
+    session_id: Optional[str] = None  # 为空时停止所有录制
+
 class NavigateRequest(BaseModel):
     url: str
 
@@ -280,14 +547,24 @@ class ExportRequest(BaseModel):
     # 新增：包含跨窗口信息
     include_cross_window_info: bool = True
 
+class BatchExportRequest(BaseModel):
+    session_ids: List[str]
+    format: str = "excel"
+    include_screenshots: bool = True
+    author: str = ""
+    version: str = "1.0"
+    remarks: str = ""
+
 # 路由定义
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """主页"""
     try:
         template_path = settings.TEMPLATES_DIR / "index.html"
-        with open(template_path, "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
+        content = await run_io(read_text_file, template_path)
+        if content is None:
+            raise FileNotFoundError(str(template_path))
+        return HTMLResponse(content=content)
     except Exception as e:
         logger.error(f"读取模板失败: {e}")
         return HTMLResponse("<h1>模板加载失败</h1>", status_code=500)
@@ -297,16 +574,23 @@ async def test_page():
     """停止按钮测试页面"""
     try:
         test_template_path = settings.STATIC_DIR / "test_stop_button.html"
-        with open(test_template_path, "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
+        content = await run_io(read_text_file, test_template_path)
+        if content is None:
+            raise FileNotFoundError(str(test_template_path))
+        return HTMLResponse(content=content)
     except Exception as e:
         logger.error(f"读取测试模板失败: {e}")
         return HTMLResponse("<h1>测试页面加载失败</h1>", status_code=500)
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket连接端点"""
+async def websocket_endpoint(websocket: WebSocket, session_id: Optional[str] = None):
+    """WebSocket连接端点
+
+    连接时可通过 ?session_id= 或 {"type": "subscribe", "session_id": ...} 只订阅指定会话的消息
+    """
     await manager.connect(websocket)
+    if session_id:
+        manager.subscribe(websocket, session_id)
     try:
         while True:
             data = await websocket.receive_text()
@@ -317,6 +601,18 @@ async def websocket_endpoint(websocket: WebSocket):
                     json.dumps({"type": "pong"}), 
                     websocket
                 )
+            elif message.get("type") == "subscribe" and message.get("session_id"):
+                manager.subscribe(websocket, message["session_id"])
+                await manager.send_personal_message(
+                    json.dumps({"type": "subscribed", "session_id": message["session_id"]}),
+                    websocket
+                )
+            elif message.get("type") == "unsubscribe":
+                manager.unsubscribe(websocket, message.get("session_id"))
+                await manager.send_personal_message(
+                    json.dumps({"type": "unsubscribed", "session_id": message.get("session_id")}),
+                    websocket
+                )
             
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -370,13 +666,14 @@ async def start_recording(request: StartRecordingRequest):
         else:
             # 使用实时录制器（默认）
             try:
-                realtime_recorder.initialize()
-                session_id = realtime_recorder.start_recording(
+                # 在共享浏览器中开始新的录制会话（超过准入限制时拒绝）
+                session_id = await recording_manager.start_session(
                     test_name=request.test_name,
                     description=request.description
                 )
                 
                 # 检查跨窗口功能是否可用
+                realtime_recorder = recording_manager.get_recorder(session_id)
                 cross_window_available = hasattr(realtime_recorder, 'is_cross_window_recording_active')
                 
                 return {
@@ -401,9 +698,12 @@ async def start_recording(request: StartRecordingRequest):
                         "popup_handling": cross_window_available,
                         "window_relationships": cross_window_available,
                         "real_time_coordination": cross_window_available
-                    }
+                    },
+                    "active_sessions": recording_manager.active_count
                 }
                 
+            except AdmissionError as e:
+                raise HTTPException(status_code=e.status_code, detail=f"无法开始新的录制会话: {e.reason}")
             except Exception as e:
                 logger.error(f"实时录制器启动失败: {e}")
                 raise HTTPException(status_code=500, detail=f"实时录制器启动失败: {str(e)}")
@@ -414,54 +714,140 @@ async def start_recording(request: StartRecordingRequest):
         logger.error(f"开始录制失败: {e}")
         raise HTTPException(status_code=500, detail=f"开始录制失败: {str(e)}")
 
+async def _post_process_session(job: Job, session: TestSession) -> Dict:
+    """停止录制后台任务的公共部分：更新会话索引并生成测试用例"""
+    job.update(60, "更新会话索引")
+    await file_manager.sync_session(session.id)
+    
+    result = {
+        "session_id": session.id,
+        "action_count": len(session.actions),
+        "test_case_id": None
+    }
+    
+    if settings.GENERATE_TEST_CASE_ON_STOP and session.actions:
+        job.update(75, "生成测试用例")
+        try:
+            test_case = await ai_generator.generate_test_case_async(session)
+            await file_manager.save_test_case(test_case)
+            result["test_case_id"] = test_case.id
+        except Exception as e:
+            # 会话已保存，测试用例可以稍后重新生成
+            logger.error(f"停止录制后生成测试用例失败: {session.id}, 错误: {e}")
+            result["test_case_error"] = str(e)
+    
+    return result
+
+def _submit_realtime_stop(realtime_recorder) -> Job:
+    """提交实时录制会话的收尾任务（录制器已停止接收事件）"""
+    async def run(job: Job) -> Dict:
+        job.update(10, "关闭录制上下文，保存trace、视频、会话和Playwright代码")
+        session = await recording_manager.finalize_session(realtime_recorder)
+        result = await _post_process_session(job, session)
+        result["files"] = {"playwright_code": f"{session.id}_playwright_code.py"}
+        # 只列出实际保存的文件（预热上下文没有视频，停止trace失败时没有trace）
+        if session.trace_file:
+            result["files"]["trace"] = Path(session.trace_file).name
+        if session.video_file:
+            result["files"]["video"] = Path(session.video_file).name
+        return result
+    
+    return job_manager.submit("stop_recording", run, session_id=realtime_recorder.session.id)
+
+def _submit_inspector_stop(session_id: Optional[str]) -> Job:
+    """提交Inspector录制器的停止任务（停止进程、解析代码都在I/O线程池中执行）"""
+    async def run(job: Job) -> Dict:
+        job.update(10, "停止Inspector录制器并生成代码")
+        session = await run_io(inspector_recorder.stop_recording)
+        result = await _post_process_session(job, session)
+        result["files"] = {
+            "enhanced_code": f"{session.id}_inspector_enhanced_code.py",
+            "analysis_report": f"{session.id}_cross_window_analysis.md",
+            "original_code": f"{session.id}_inspector_original_code.py"
+        }
+        return result
+    
+    return job_manager.submit("stop_recording", run, session_id=session_id)
+
+def _session_summary(session: TestSession, status: str) -> Dict:
+    return {
+        "id": session.id,
+        "name": session.name,
+        "description": session.description,
+        "start_time": session.start_time.isoformat(),
+        "end_time": session.end_time.isoformat() if session.end_time else None,
+        "action_count": len(session.actions),
+        "status": status
+    }
+
 @app.post("/api/recording/stop")
-async def stop_recording():
-    """停止录制测试用例（增强跨窗口支持）"""
+async def stop_recording(request: Optional[StopRecordingRequest] = None):
+    """停止录制测试用例（增强跨窗口支持）
+
+    指定session_id时只停止该会话，否则停止所有正在进行的录制。
+    录制立即停止，保存trace和视频、生成代码和测试用例在后台任务中完成，
+    返回的job_id可通过 GET /api/jobs/{job_id} 查询，进度通过WebSocket推送（job_progress）
+    """
     try:
         result_sessions = []
+        target_session_id = request.session_id if request else None
+        
+        # 尝试停止实时录制会话
+        if target_session_id:
+            realtime_session_ids = [target_session_id] if recording_manager.get_recorder(target_session_id) else []
+        else:
+            realtime_session_ids = list(recording_manager.sessions.keys())
         
-        # 尝试停止实时录制器
-        if realtime_recorder.is_recording:
+        for realtime_session_id in realtime_session_ids:
             try:
-                session = realtime_recorder.stop_recording()
+                realtime_recorder = recording_manager.get_recorder(realtime_session_id)
                 
                 # 获取跨窗口统计信息
                 cross_window_stats = {}
                 if hasattr(realtime_recorder, 'get_cross_window_stats'):
                     cross_window_stats = realtime_recorder.get_cross_window_stats()
                 
+                realtime_recorder = recording_manager.detach_session(realtime_session_id)
+                job = _submit_realtime_stop(realtime_recorder)
+                
                 result_sessions.append({
                     "recorder_type": "realtime",
-                    "session": session,
+                    "session": realtime_recorder.session,
                     "success": True,
+                    "job_id": job.id,
                     "cross_window_stats": cross_window_stats
                 })
-                logger.info("实时录制器已停止")
+                logger.info(f"实时录制会话已停止，后台处理中: {realtime_session_id}")
             except Exception as e:
-                logger.error(f"停止实时录制器失败: {e}")
+                logger.error(f"停止实时录制会话失败: {realtime_session_id}, 错误: {e}")
                 result_sessions.append({
                     "recorder_type": "realtime",
                     "success": False,
                     "error": str(e)
                 })
         
-        # 尝试停止Inspector录制器
-        if inspector_recorder.is_recording:
+        # 尝试停止Inspector录制器（同一个会话只提交一个停止任务）
+        inspector_session = inspector_recorder.session
+        inspector_stopping = inspector_session is not None and any(
+            not job.done for job in job_manager.list_jobs(inspector_session.id))
+        if inspector_recorder.is_recording and not inspector_stopping and (
+                not target_session_id or (inspector_session and inspector_session.id == target_session_id)):
             try:
-                session = inspector_recorder.stop_recording()
-                
                 # 获取跨窗口统计信息
                 cross_window_stats = {}
                 if hasattr(inspector_recorder, 'get_cross_window_statistics'):
                     cross_window_stats = inspector_recorder.get_cross_window_statistics()
                 
+                job = _submit_inspector_stop(inspector_session.id if inspector_session else None)
+                
                 result_sessions.append({
                     "recorder_type": "inspector",
-                    "session": session,
+                    "session": inspector_session,
                     "success": True,
+                    "job_id": job.id,
                     "cross_window_stats": cross_window_stats
                 })
-                logger.info("Inspector录制器已停止")
+                logger.info("Inspector录制器停止任务已提交")
             except Exception as e:
                 logger.error(f"停止Inspector录制器失败: {e}")
                 result_sessions.append({
@@ -522,28 +908,21 @@ async def stop_recording():
                     cross_window_summary["popup_windows"] > 0
                 )
             
+            action_count = len(main_session.actions) if main_session else 0
             return {
                 "success": True,
-                "message": f"录制停止成功，共记录 {len(main_session.actions)} 个操作" + 
-                          (f"，包含 {cross_window_summary['cross_window_actions']} 个跨窗口操作" if cross_window_summary['has_cross_window_activity'] else ""),
-                "session": {
-                    "id": main_session.id,
-                    "name": main_session.name,
-                    "description": main_session.description,
-                    "start_time": main_session.start_time.isoformat(),
-                    "end_time": main_session.end_time.isoformat() if main_session.end_time else None,
-                    "action_count": len(main_session.actions),
-                    "status": main_session.status
-                },
+                "message": f"录制已停止，共记录 {action_count} 个操作" + 
+                          (f"，包含 {cross_window_summary['cross_window_actions']} 个跨窗口操作" if cross_window_summary['has_cross_window_activity'] else "") +
+                          "，正在后台保存和生成测试用例",
+                "job_id": main_result["job_id"],
+                "session": _session_summary(main_session, "processing") if main_session else None,
                 "cross_window_summary": cross_window_summary,
                 "cross_window_stats": main_cross_window_stats,
                 "recorder_type": main_result["recorder_type"],
-                "all_results": result_sessions,
-                "additional_files": {
-                    "enhanced_code": f"{main_session.id}_inspector_enhanced_code.py" if main_result["recorder_type"] == "inspector" else None,
-                    "analysis_report": f"{main_session.id}_cross_window_analysis.md" if main_result["recorder_type"] == "inspector" else None,
-                    "original_code": f"{main_session.id}_inspector_original_code.py" if main_result["recorder_type"] == "inspector" else None
-                }
+                "all_results": [
+                    {**s, "session": _session_summary(s["session"], "processing") if s.get("session") else None}
+                    for s in result_sessions
+                ]
             }
         else:
             # 所有录制器都失败了
@@ -556,6 +935,25 @@ async def stop_recording():
         logger.error(f"停止录制失败: {e}")
         raise HTTPException(status_code=500, detail=f"停止录制失败: {str(e)}")
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询后台任务状态和结果"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务未找到")
+    return {
+        "success": True,
+        "job": job.to_dict()
+    }
+
+@app.get("/api/jobs")
+async def list_jobs(session_id: Optional[str] = None):
+    """列出后台任务（可按会话过滤）"""
+    return {
+        "success": True,
+        "jobs": [job.to_dict() for job in job_manager.list_jobs(session_id)]
+    }
+
 @app.post("/api/navigate")
 async def navigate(request: NavigateRequest):
     """导航到指定URL"""
@@ -581,10 +979,12 @@ async def navigate(request: NavigateRequest):
 async def get_status():
     """获取录制状态"""
     try:
+        realtime_recorder = recording_manager.get_latest_recorder()
         return {
-            "recording": realtime_recorder.is_recording,
-            "action_count": realtime_recorder.action_count,
-            "session_id": realtime_recorder.session.id if realtime_recorder.session else None
+            "recording": recording_manager.is_recording,
+            "action_count": realtime_recorder.action_count if realtime_recorder else 0,
+            "session_id": realtime_recorder.session.id if realtime_recorder and realtime_recorder.session else None,
+            "sessions": recording_manager.list_sessions()
         }
     except Exception as e:
         logger.error(f"获取状态失败: {e}")
@@ -595,42 +995,47 @@ async def get_status():
         }
 
 @app.get("/api/sessions")
-async def get_sessions():
-    """获取所有录制会话"""
+async def get_sessions(limit: int = 50, cursor: Optional[str] = None, fields: Optional[str] = None,
+                       tag: Optional[str] = None, status: Optional[str] = None,
+                       start_from: Optional[str] = None, start_to: Optional[str] = None,
+                       name_prefix: Optional[str] = None):
+    """分页获取录制会话摘要（查询会话索引，会话详情通过 /api/sessions/{id} 获取）"""
     try:
-        # 从文件系统加载会话数据
-        sessions_dir = settings.RECORDINGS_DIR
-        session_files = list(sessions_dir.glob("*_session.json"))
-        sessions = []
+        if limit < 1 or limit > settings.SESSIONS_PAGE_MAX_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit必须在1到{settings.SESSIONS_PAGE_MAX_LIMIT}之间")
         
-        for session_file in session_files:
-            try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session_data = json.load(f)
-                    # 转换时间戳字符串为datetime对象
-                    if 'start_time' in session_data:
-                        session_data['start_time'] = datetime.fromisoformat(session_data['start_time'])
-                    if 'end_time' in session_data:
-                        session_data['end_time'] = datetime.fromisoformat(session_data['end_time'])
-                    sessions.append(session_data)
-            except Exception as e:
-                logger.error(f"加载会话文件失败 {session_file}: {e}")
-                continue
-        
-        # 按开始时间倒序排序
-        sessions.sort(key=lambda x: x.get('start_time', datetime.min), reverse=True)
+        try:
+            result = await file_manager.list_session_summaries(
+                limit=limit,
+                cursor=cursor,
+                fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+                tag=tag,
+                status=status,
+                start_from=start_from,
+                start_to=start_to,
+                name_prefix=name_prefix
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        return sessions
+        return {
+            "success": True,
+            "sessions": result["sessions"],
+            "count": len(result["sessions"]),
+            "next_cursor": result["next_cursor"]
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取会话列表失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str):
-    """获取指定会话"""
+    """获取指定会话（包含全部操作记录）"""
     try:
-        session = file_manager.get_session(session_id)
+        session = await file_manager.get_session(session_id)
         if session:
             return {
                 "success": True,
@@ -638,6 +1043,8 @@ async def get_session(session_id: str):
             }
         else:
             raise HTTPException(status_code=404, detail="会话未找到")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取会话失败: {e}")
         return {
@@ -649,7 +1056,7 @@ async def get_session(session_id: str):
 async def delete_session(session_id: str):
     """删除指定会话"""
     try:
-        success = file_manager.delete_session(session_id)
+        success = await file_manager.delete_session(session_id)
         if success:
             return {
                 "success": True,
@@ -671,15 +1078,15 @@ async def generate_testcase(session_id: str):
         logger.info(f"收到生成测试用例请求: {session_id}")
         
         # 获取会话数据
-        session_data = file_manager.get_session(session_id)
+        session_data = await file_manager.get_session(session_id)
         if not session_data:
             raise HTTPException(status_code=404, detail="会话未找到")
         
-        # 生成测试用例
-        test_case = ai_generator.generate_test_case(session_data)
+        # 生成测试用例（可能调用AI接口，在生成器的线程池中执行，不阻塞事件循环和文件I/O线程池）
+        test_case = await ai_generator.generate_test_case_async(session_data)
         
         # 保存测试用例
-        file_manager.save_test_case(session_id, test_case)
+        await file_manager.save_test_case(test_case)
         
         return {
             "success": True,
@@ -701,31 +1108,31 @@ async def export_testcase(request: ExportRequest):
         logger.info(f"收到导出请求: {request.session_id}, 格式: {request.format}, 包含跨窗口信息: {request.include_cross_window_info}")
         
         # 获取会话数据
-        session_data = file_manager.get_session(request.session_id)
+        session_data = await file_manager.get_session(request.session_id)
         if not session_data:
             raise HTTPException(status_code=404, detail="会话未找到")
         
         # 获取测试用例
-        test_case = file_manager.get_test_case(request.session_id)
+        test_case = await file_manager.get_test_case(request.session_id)
         if not test_case:
             # 如果没有测试用例，先生成一个
-            test_case = ai_generator.generate_test_case(session_data)
-            file_manager.save_test_case(request.session_id, test_case)
+            test_case = await ai_generator.generate_test_case_async(session_data)
+            await file_manager.save_test_case(test_case)
         
         # 准备跨窗口信息（如果需要）
         cross_window_info = {}
         if request.include_cross_window_info:
             # 尝试读取跨窗口分析报告
             analysis_report_path = settings.RECORDINGS_DIR / f"{request.session_id}_cross_window_analysis.md"
-            if analysis_report_path.exists():
-                with open(analysis_report_path, 'r', encoding='utf-8') as f:
-                    cross_window_info["analysis_report"] = f.read()
+            analysis_report = await run_io(read_text_file, analysis_report_path)
+            if analysis_report is not None:
+                cross_window_info["analysis_report"] = analysis_report
             
             # 尝试读取增强代码
             enhanced_code_path = settings.RECORDINGS_DIR / f"{request.session_id}_inspector_enhanced_code.py"
-            if enhanced_code_path.exists():
-                with open(enhanced_code_path, 'r', encoding='utf-8') as f:
-                    cross_window_info["enhanced_code"] = f.read()
+            enhanced_code = await run_io(read_text_file, enhanced_code_path)
+            if enhanced_code is not None:
+                cross_window_info["enhanced_code"] = enhanced_code
             
             # 尝试从会话数据中获取跨窗口统计
             if hasattr(session_data, 'additional_data') and session_data.additional_data:
@@ -737,8 +1144,9 @@ async def export_testcase(request: ExportRequest):
                 except:
                     pass
         
-        # 导出文件（传递跨窗口信息）
-        export_path = export_handler.export_test_case(
+        # 导出文件（传递跨窗口信息，在I/O线程池中写入）
+        export_path = await run_io(
+            export_handler.export_test_case,
             test_case=test_case,
             format=request.format,
             include_screenshots=request.include_screenshots,
@@ -764,6 +1172,42 @@ async def export_testcase(request: ExportRequest):
             "error": str(e)
         }
 
+@app.post("/api/export/batch")
+async def export_testcases_batch(request: BatchExportRequest):
+    """批量导出多个会话的测试用例为一个zip压缩包（逐个读取和导出，不同时持有所有测试用例）"""
+    try:
+        if not request.session_ids:
+            raise HTTPException(status_code=400, detail="未指定会话")
+        
+        logger.info(f"收到批量导出请求: {len(request.session_ids)} 个会话, 格式: {request.format}")
+        
+        test_cases = file_manager.iter_test_cases_sync(request.session_ids, ai_generator.generate_test_case)
+        export_path = await run_io(
+            export_handler.export_test_cases,
+            test_cases,
+            format=request.format,
+            include_screenshots=request.include_screenshots,
+            author=request.author,
+            version=request.version,
+            remarks=request.remarks
+        )
+        
+        return {
+            "success": True,
+            "download_url": f"/api/download/{export_path.name}",
+            "file_path": str(export_path),
+            "message": "导出成功"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"批量导出失败: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 @app.get("/api/download/{filename}")
 async def download_file(filename: str):
     """下载文件"""
@@ -796,7 +1240,7 @@ async def get_screenshot(filename: str):
         if file_path.exists():
             return FileResponse(
                 path=str(file_path),
-                media_type='image/png'
+                media_type='image/jpeg' if file_path.suffix.lower() in ('.jpg', '.jpeg') else 'image/png'
             )
         else:
             raise HTTPException(status_code=404, detail="截图未找到")
@@ -808,15 +1252,19 @@ async def get_screenshot(filename: str):
 async def get_recording_status():
     """获取录制器状态（增强跨窗口支持）"""
     try:
+        # 多会话时以最近开始的实时录制会话为准
+        realtime_recorder = recording_manager.get_latest_recorder()
+        
         # 获取实时录制器状态
         realtime_status = {
-            "is_recording": realtime_recorder.is_recording,
+            "is_recording": recording_manager.is_recording,
+            "active_sessions": recording_manager.list_sessions(),
             "current_session": None,
             "cross_window_support": True,
             "cross_window_stats": {}
         }
         
-        if realtime_recorder.is_recording and realtime_recorder.session:
+        if realtime_recorder and realtime_recorder.session:
             session = realtime_recorder.session
             realtime_status["current_session"] = {
                 "id": session.id,
@@ -883,6 +1331,9 @@ async def get_recording_status():
 async def get_cross_window_stats():
     """获取跨窗口录制统计信息"""
     try:
+        # 多会话时以最近开始的实时录制会话为准
+        realtime_recorder = recording_manager.get_latest_recorder()
+        
         stats = {
             "realtime_recorder": {},
             "inspector_recorder": {},
@@ -890,7 +1341,7 @@ async def get_cross_window_stats():
         }
         
         # 获取实时录制器的跨窗口统计
-        if realtime_recorder.is_recording:
+        if realtime_recorder:
             stats["active_recorder"] = "realtime"
             if hasattr(realtime_recorder, 'get_cross_window_stats'):
                 stats["realtime_recorder"] = realtime_recorder.get_cross_window_stats()
@@ -919,6 +1370,9 @@ async def get_cross_window_stats():
 async def get_recording_windows():
     """获取当前录制的所有窗口信息"""
     try:
+        # 多会话时以最近开始的实时录制会话为准
+        realtime_recorder = recording_manager.get_latest_recorder()
+        
         windows_info = {
             "windows": [],
             "main_window": None,
@@ -927,7 +1381,7 @@ async def get_recording_windows():
             "active_recorder": None
         }
         
-        if realtime_recorder.is_recording:
+        if realtime_recorder:
             windows_info["active_recorder"] = "realtime"
             
             # 获取窗口列表
@@ -991,9 +1445,12 @@ async def get_recording_windows():
 async def flush_cross_window_events():
     """强制刷新跨窗口事件"""
     try:
+        # 多会话时以最近开始的实时录制会话为准
+        realtime_recorder = recording_manager.get_latest_recorder()
+        
         flushed = False
         
-        if realtime_recorder.is_recording:
+        if realtime_recorder:
             if hasattr(realtime_recorder, 'force_flush_cross_window_events'):
                 await realtime_recorder.force_flush_cross_window_events()
                 flushed = True
@@ -1013,12 +1470,29 @@ async def flush_cross_window_events():
         raise HTTPException(status_code=500, detail=f"刷新跨窗口事件失败: {str(e)}")
 
 @app.get("/api/recording/enhanced-code/{session_id}")
-async def get_enhanced_code(session_id: str):
-    """获取增强版生成的代码（支持跨窗口）"""
+async def get_enhanced_code(session_id: str, since: Optional[int] = None):
+    """获取增强版生成的代码（支持跨窗口）
+
+    正在录制的实时会话直接返回内存中增量生成的代码；传入since时只返回第since行之后的代码行
+    """
     try:
         enhanced_code = ""
         code_stats = {}
         
+        code_builder = getattr(recording_manager.get_recorder(session_id), 'code_builder', None)
+        if code_builder:
+            result = {
+                "success": True,
+                "code_stats": code_builder.get_stats(),
+                "code_line_count": len(code_builder.code_lines),
+                "message": "增强代码获取成功"
+            }
+            if since is None:
+                result["enhanced_code"] = code_builder.render()
+            else:
+                result["code_delta"] = code_builder.lines_since(max(since, 0))
+            return result
+        
         # 如果是Inspector录制器的会话，获取增强代码
         if hasattr(inspector_recorder, 'get_enhanced_code') and inspector_recorder.session and inspector_recorder.session.id == session_id:
             enhanced_code = inspector_recorder.get_enhanced_code()
@@ -1029,9 +1503,7 @@ async def get_enhanced_code(session_id: str):
         # 也可以从保存的文件中读取
         if not enhanced_code:
             enhanced_code_file = settings.RECORDINGS_DIR / f"{session_id}_inspector_enhanced_code.py"
-            if enhanced_code_file.exists():
-                with open(enhanced_code_file, 'r', encoding='utf-8') as f:
-                    enhanced_code = f.read()
+            enhanced_code = await run_io(read_text_file, enhanced_code_file) or ""
         
         return {
             "success": True,
@@ -1048,18 +1520,14 @@ async def get_enhanced_code(session_id: str):
 async def get_analysis_report(session_id: str):
     """获取跨窗口分析报告"""
     try:
-        report_content = ""
-        
         # 尝试从文件中读取分析报告
         report_file = settings.RECORDINGS_DIR / f"{session_id}_cross_window_analysis.md"
-        if report_file.exists():
-            with open(report_file, 'r', encoding='utf-8') as f:
-                report_content = f.read()
+        report_content = await run_io(read_text_file, report_file)
         
         return {
             "success": True,
-            "report_content": report_content,
-            "report_file": str(report_file) if report_file.exists() else None,
+            "report_content": report_content or "",
+            "report_file": str(report_file) if report_content is not None else None,
             "message": "分析报告获取成功" if report_content else "未找到分析报告"
         }
         
@@ -1067,6 +1535,27 @@ async def get_analysis_report(session_id: str):
         logger.error(f"获取分析报告失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取分析报告失败: {str(e)}")
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """获取运行指标"""
+    try:
+        return {
+            "success": True,
+            "websocket": manager.get_stats(),
+            "event_channel": recorder_event_channel.get_stats(),
+            "recording_manager": recording_manager.get_stats(),
+            "session_cache": file_manager.get_cache_stats(),
+            "io_pool": io_pool.get_stats(),
+            "jobs": job_manager.get_stats(),
+            "event_loop_lag": loop_lag_monitor.get_stats(),
+            "screenshots": recording_manager.get_screenshot_stats(),
+            "element_analyzer": playwright_analyzer.get_stats(),
+            "test_case_generator": ai_generator.get_stats()
+        }
+    except Exception as e:
+        logger.error(f"获取运行指标失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取运行指标失败: {str(e)}")
+
 # 应用启动和关闭事件
 @app.on_event("startup")
 async def startup_event():
@@ -1078,17 +1567,38 @@ async def startup_event():
     settings.SCREENSHOTS_DIR.mkdir(exist_ok=True)
     settings.EXPORTS_DIR.mkdir(exist_ok=True)
     settings.LOGS_DIR.mkdir(exist_ok=True)
+    
+    # 启动事件循环延迟监控
+    loop_lag_monitor.start()
+    
+    # 初始化文件管理器（恢复会话日志并对账会话索引）
+    await file_manager.initialize()
+    
+    # 绑定录制器事件通道并启动消息处理器
+    recorder_event_channel.bind(asyncio.get_running_loop())
+    manager.ensure_processor_started()
+    
+    # 后台启动共享浏览器并预热录制上下文
+    recording_manager.warm_up()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
     logger.info("测试用例录制系统关闭")
     
-    # 清理录制器资源
+    # 等待停止录制的后台任务完成，再停止所有录制会话并关闭共享浏览器
     try:
-        realtime_recorder.cleanup()
+        await job_manager.wait_all(timeout=30)
+        await recording_manager.shutdown()
     except Exception as e:
         logger.error(f"清理录制器资源失败: {e}")
+    
+    # 录制会话已全部停止，之后发布的事件没有消费者
+    recorder_event_channel.close()
+    
+    await loop_lag_monitor.stop()
+    io_pool.shutdown()
+    ai_generator.pool.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
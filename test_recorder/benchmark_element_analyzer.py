@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+元素分析器基准测试
+用 recordings/*_session.json 中录制的元素信息回放 analyze_element 调用，
+对比不缓存、按指纹缓存以及 analyze_many 批量分析的耗时，并校验结果一致
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from core.playwright_analyzer import PlaywrightElementAnalyzer
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+
+
+def load_elements():
+    """读取所有会话中的元素信息（按录制顺序）"""
+    sessions = []
+    for path in sorted(RECORDINGS_DIR.glob("*_session.json")):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"   ⚠️ 跳过 {path.name}: {e}")
+            continue
+        elements = [action['element_info'] for action in data.get('actions', []) if action.get('element_info')]
+        if elements:
+            sessions.append(elements)
+    return sessions
+
+
+def run_per_event(analyzer, sessions):
+    return [[analyzer.analyze_element(element) for element in elements] for elements in sessions]
+
+
+def run_batch(analyzer, sessions):
+    return [analyzer.analyze_many(elements) for elements in sessions]
+
+
+def benchmark(name, factory, func, sessions, rounds=20):
+    """每轮使用新的分析器实例（缓存从空开始）"""
+    best = None
+    result = None
+    analyzer = None
+    for _ in range(rounds):
+        analyzer = factory()
+        start = time.perf_counter()
+        result = func(analyzer, sessions)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    count = sum(len(elements) for elements in sessions)
+    print(f"   {name}: {best * 1000:.2f} ms（{count} 次分析，平均 {best / count * 1e6:.2f} µs/次）")
+    return result, analyzer, best
+
+
+def main():
+    print("🔍 元素分析器基准测试")
+
+    sessions = load_elements()
+    count = sum(len(elements) for elements in sessions)
+    if not count:
+        print("   ❌ recordings 目录中没有包含元素信息的会话")
+        return 1
+    print(f"\n1. 语料: {len(sessions)} 个会话，{count} 个元素事件")
+
+    print("\n2. 耗时对比...")
+    baseline, _, baseline_time = benchmark("不缓存", lambda: PlaywrightElementAnalyzer(cache_size=0), run_per_event, sessions)
+    cached, analyzer, cached_time = benchmark("指纹缓存（逐个事件）", PlaywrightElementAnalyzer, run_per_event, sessions)
+    batched, _, batch_time = benchmark("analyze_many（按会话批量）", PlaywrightElementAnalyzer, run_batch, sessions)
+    print(f"   加速比: 逐个事件 {baseline_time / cached_time:.2f}x，批量 {baseline_time / batch_time:.2f}x")
+    print(f"   缓存统计: {analyzer.get_stats()}")
+
+    print("\n3. 正确性...")
+    ok = baseline == cached == batched
+    print(f"   {'✅' if ok else '❌'} 三种方式的分析结果{'一致' if ok else '不一致'}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+导出基准测试
+用录制会话生成的测试用例扩展出不同步骤数的测试用例（步骤轮流引用截图目录中的截图），
+分别导出为Excel、Word、JSON，记录耗时和Python内存峰值，验证内存占用不随步骤数增长，
+并校验导出文件可以被 openpyxl / python-docx 正常打开
+"""
+
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+from loguru import logger
+
+from config.settings import settings
+from core.ai_generator import AITestCaseGenerator
+from core.models import TestSession, TestStep
+from utils.export_handler import export_handler
+from utils.test_case_cache import TestCaseCache
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+STEP_COUNTS = (200, 2000)
+
+
+def load_test_case():
+    """用最大的录制会话生成测试用例"""
+    paths = sorted(RECORDINGS_DIR.glob("*_session.json"), key=lambda path: path.stat().st_size, reverse=True)
+    if not paths:
+        return None
+    session = TestSession(**json.loads(paths[0].read_text(encoding="utf-8")))
+    generator = AITestCaseGenerator(cache=TestCaseCache(Path(tempfile.gettempdir()), enabled=False), provider="rules")
+    return generator.generate_test_case(session)
+
+
+def with_steps(test_case, count, screenshots):
+    """复制步骤直到count个"""
+    expanded = test_case.model_copy(deep=True)
+    base = test_case.test_steps
+    expanded.test_steps = [
+        TestStep(**{
+            **base[index % len(base)].model_dump(),
+            "step_number": index + 1,
+            "screenshot_path": str(screenshots[index % len(screenshots)]) if screenshots else ""
+        })
+        for index in range(count)
+    ]
+    return expanded
+
+
+def verify(path, format, count):
+    """打开导出文件，检查步骤数"""
+    if format == "excel":
+        import openpyxl
+        worksheet = openpyxl.load_workbook(path, read_only=True)["测试步骤"]
+        return sum(1 for _ in worksheet.iter_rows()) == count + 1
+    if format == "word":
+        import docx
+        return len(docx.Document(path).tables[1].rows) == count + 1
+    with open(path, encoding="utf-8") as f:
+        return len(json.load(f)["test_case"]["test_steps"]) == count
+
+
+def main():
+    print("🔍 导出基准测试")
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    test_case = load_test_case()
+    if not test_case or not test_case.test_steps:
+        print("   ❌ recordings 目录中没有可用的会话")
+        return 1
+    screenshots = sorted(settings.SCREENSHOTS_DIR.glob("*.png"))[:40]
+    print(f"\n1. 测试用例: {len(test_case.test_steps)} 个原始步骤，{len(screenshots)} 张截图轮流引用")
+
+    ok = True
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+        print("\n2. 单个测试用例导出（耗时 / Python内存峰值 / 文件大小）...")
+        for format in ("excel", "word", "json"):
+            peaks = []
+            for count in STEP_COUNTS:
+                expanded = with_steps(test_case, count, screenshots)
+                output_path = temp / f"{format}_{count}{export_handler.extensions[format]}"
+                tracemalloc.start()
+                start = time.perf_counter()
+                export_handler.export_test_case(expanded, format, output_path=output_path)
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                peaks.append(peak)
+                valid = verify(output_path, format, count)
+                ok = ok and valid
+                print(f"   {'✅' if valid else '❌'} {format} {count} 步: {elapsed:.2f} s / {peak / 1e6:.1f} MB / "
+                      f"{output_path.stat().st_size / 1e6:.2f} MB")
+            flat = peaks[-1] <= peaks[0] * 2
+            ok = ok and flat
+            print(f"   {'✅' if flat else '❌'} {format} 步数增加 {STEP_COUNTS[-1] // STEP_COUNTS[0]} 倍，"
+                  f"内存峰值 {peaks[-1] / max(peaks[0], 1):.2f} 倍")
+
+        print("\n3. 批量导出为压缩包...")
+        test_cases = (with_steps(test_case, 50, screenshots).model_copy(update={"id": f"TC_{index:05d}"}) for index in range(20))
+        archive = export_handler.export_test_cases(test_cases, "word", output_path=temp / "batch.zip")
+        names = zipfile.ZipFile(archive).namelist()
+        valid = len(names) == 20
+        ok = ok and valid
+        print(f"   {'✅' if valid else '❌'} 压缩包包含 {len(names)} 个文档，{archive.stat().st_size / 1e6:.2f} MB")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
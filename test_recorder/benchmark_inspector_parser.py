@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Inspector代码解析基准测试
+回放codegen输出文件的增长过程（每录制一个操作重写一次整个文件，连续输入会合并fill），
+对比旧的全量读取+追加行比较方式与增量解析器的耗时和正确性
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from core.codegen_parser import CodegenTailParser
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+
+HEADER = '''import asyncio
+import re
+from playwright.async_api import Playwright, async_playwright, expect
+
+
+async def run(playwright: Playwright) -> None:
+    browser = await playwright.chromium.launch(headless=False)
+    context = await browser.new_context()
+    page = await context.new_page()
+'''
+
+FOOTER = '''
+    # ---------------------
+    await context.close()
+    await browser.close()
+
+
+async def main() -> None:
+    async with async_playwright() as playwright:
+        await run(playwright)
+
+
+asyncio.run(main())
+'''
+
+
+def load_recorded_statements():
+    """从已录制的代码文件中提取操作语句"""
+    statements = []
+    for path in sorted(RECORDINGS_DIR.glob("*_playwright_code.py")):
+        for line in path.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if CodegenTailParser.is_statement(line):
+                statements.append(line)
+    if not statements:
+        statements = [
+            'await page.goto("http://192.168.1.128/login")',
+            'await page.get_by_role("button", name="登录").click()',
+            'await page.goto("http://192.168.1.128/index")',
+        ]
+    return statements
+
+
+def build_growth_sequence(statements, target_count=400):
+    """生成codegen输出文件的版本序列，每第5个操作是一次逐字输入（改写上一行的fill）"""
+    versions = []
+    body = []
+    i = 0
+    while len(body) < target_count:
+        if i % 5 == 4:
+            body.append('    await page.get_by_placeholder("用户名").fill("a")\n')
+            versions.append(HEADER + "".join(body) + FOOTER)
+            for text in ("ad", "adm", "admi", "admin"):
+                body[-1] = f'    await page.get_by_placeholder("用户名").fill("{text}")\n'
+                versions.append(HEADER + "".join(body) + FOOTER)
+        else:
+            body.append("    " + statements[i % len(statements)] + "\n")
+            versions.append(HEADER + "".join(body) + FOOTER)
+        i += 1
+    return versions, [line.strip() for line in body]
+
+
+def legacy_parse(versions):
+    """旧方式：每次全量解码比较，只把新增的行当作新操作"""
+    last_content = ""
+    actions = []
+    for data in versions:
+        content = data.decode("utf-8")
+        if content == last_content:
+            continue
+        old_lines = last_content.splitlines() if last_content else []
+        new_lines = content.splitlines()
+        if len(new_lines) > len(old_lines):
+            for line in new_lines[len(old_lines):]:
+                line = line.strip()
+                if not line or line.startswith('#') or line.startswith('import'):
+                    continue
+                actions.append(line)
+        last_content = content
+    return actions
+
+
+def incremental_parse(versions):
+    """增量解析：应用insert/update/delete事件"""
+    parser = CodegenTailParser()
+    model = []
+    for data in versions:
+        for change in parser.feed(data):
+            if change.kind == "insert":
+                model.insert(change.index, (change.statement_id, change.code_line))
+            elif change.kind == "update":
+                model[change.index] = (change.statement_id, change.code_line)
+            else:
+                del model[change.index]
+    return [code for _, code in model], parser
+
+
+def benchmark(name, func, versions, rounds=5):
+    best = None
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func(versions)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"   {name}: {best * 1000:.2f} ms（{len(versions)} 个版本，平均 {best / len(versions) * 1e6:.1f} µs/版本）")
+    return result
+
+
+def main():
+    print("🔍 Inspector代码解析基准测试")
+
+    statements = load_recorded_statements()
+    versions, expected = build_growth_sequence(statements)
+    # 两种方式都从文件读到的字节开始
+    versions = [content.encode("utf-8") for content in versions]
+    print(f"\n1. 回放序列: {len(statements)} 条已录制语句，{len(versions)} 个文件版本，最终 {len(expected)} 个操作")
+
+    print("\n2. 耗时对比...")
+    legacy_actions = benchmark("旧方式（全量读取+追加行）", legacy_parse, versions)
+    incremental_actions, parser = benchmark("增量解析", incremental_parse, versions)
+
+    print("\n3. 正确性...")
+    legacy_ok = legacy_actions == expected
+    incremental_ok = incremental_actions == expected
+    missing = sum(1 for code in expected if code not in set(legacy_actions))
+    extra = sum(1 for code in legacy_actions if code not in set(expected))
+    print(f"   旧方式: {'✅' if legacy_ok else '❌'} 得到 {len(legacy_actions)} 个操作，"
+          f"缺少 {missing} 个，多出 {extra} 个（新语句插在结尾代码之前，旧方式只取末尾多出的行）")
+    print(f"   增量解析: {'✅' if incremental_ok else '❌'} 得到 {len(incremental_actions)} 个操作")
+    print(f"   解析统计: {parser.get_stats()}")
+
+    return 0 if incremental_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+测试用例批量生成基准测试
+用 recordings/*_session.json 复制出一个会话库（改写会话ID），在临时缓存目录中对比：
+逐个解析+生成、按文件批量生成（冷缓存/热缓存），本地桩AI（模拟网络延迟）下串行与线程池并发的耗时，
+按会话生成的缓存命中，以及异步生成不占用文件I/O线程池
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from core.ai_client import RateLimiter, StubCompletionClient
+from core.ai_generator import AITestCaseGenerator
+from core.models import TestSession
+from utils.io_pool import IOPool
+from utils.test_case_cache import TestCaseCache
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+
+
+def build_library(target_dir: Path, copies: int = 12):
+    """复制录制的会话文件，生成会话ID互不相同的会话库"""
+    sources = []
+    for path in sorted(RECORDINGS_DIR.glob("*_session.json")):
+        try:
+            sources.append(json.loads(path.read_text(encoding="utf-8")))
+        except Exception as e:
+            print(f"   ⚠️ 跳过 {path.name}: {e}")
+
+    files = []
+    for copy in range(copies):
+        for data in sources:
+            session = dict(data, id=f"{data['id']}-{copy}")
+            path = target_dir / f"{session['id']}_session.json"
+            path.write_text(json.dumps(session, ensure_ascii=False), encoding="utf-8")
+            files.append(path)
+    return files
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def legacy_generate(generator, files):
+    """旧方式：逐个解析会话文件并生成"""
+    test_cases = []
+    for path in files:
+        session = TestSession(**json.loads(path.read_bytes()))
+        test_cases.append(generator.generate_test_case(session))
+    return test_cases
+
+
+async def measure_io_latency(generator, sessions, io_pool):
+    """并发生成测试用例时，测量文件I/O线程池中一个空任务的等待时间"""
+    generations = [asyncio.create_task(generator.generate_test_case_async(session)) for session in sessions]
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await io_pool.run(lambda: None)
+    latency = time.perf_counter() - start
+    await asyncio.gather(*generations)
+    return latency
+
+
+def dump(test_cases):
+    return [test_case.model_dump() for test_case in test_cases]
+
+
+def main():
+    print("🔍 测试用例批量生成基准测试")
+    # 每个用例一条INFO日志，基准中只保留警告
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    ok = True
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+        library_dir = temp / "sessions"
+        library_dir.mkdir()
+        files = build_library(library_dir)
+        if not files:
+            print("   ❌ recordings 目录中没有会话文件")
+            return 1
+        print(f"\n1. 会话库: {len(files)} 个会话文件")
+
+        print("\n2. 规则生成（无AI）...")
+        rules_cache = TestCaseCache(temp / "rules_cache")
+        legacy, legacy_time = timed(lambda: legacy_generate(AITestCaseGenerator(cache=rules_cache, provider="rules"), files))
+        cold, cold_time = timed(lambda: AITestCaseGenerator(cache=rules_cache, provider="rules").generate_batch_from_files(files))
+        # 模拟无关修改后重新生成整个库：新的生成器实例，磁盘缓存保留
+        warm_generator = AITestCaseGenerator(cache=rules_cache, provider="rules")
+        warm, warm_time = timed(lambda: warm_generator.generate_batch_from_files(files))
+        for name, elapsed in (("逐个解析+生成", legacy_time), ("批量生成（冷缓存）", cold_time), ("批量生成（热缓存）", warm_time)):
+            print(f"   {name}: {elapsed * 1000:.1f} ms（平均 {elapsed / len(files) * 1e6:.0f} µs/会话）")
+        print(f"   热缓存加速比: {legacy_time / warm_time:.2f}x，缓存统计: {rules_cache.get_stats()['hits']} 命中")
+        same = dump(legacy) == dump(cold) == dump(warm)
+        ok = ok and same and len(warm) == len(files)
+        print(f"   {'✅' if same else '❌'} 三种方式生成的测试用例{'一致' if same else '不一致'}")
+
+        print("\n3. 本地桩AI（每次调用模拟 20 ms 延迟）...")
+        subset = files[:48]
+        for workers in (1, 8):
+            client = StubCompletionClient(latency=0.02)
+            generator = AITestCaseGenerator(cache=TestCaseCache(temp / f"ai_cache_{workers}"), client=client)
+            _, elapsed = timed(lambda: generator.generate_batch_from_files(subset, max_workers=workers))
+            print(f"   {workers} 个工作线程（冷缓存）: {elapsed * 1000:.1f} ms，AI调用 {client.calls} 次")
+        _, elapsed = timed(lambda: generator.generate_batch_from_files(subset, max_workers=8))
+        warm_calls = client.calls - len(subset)
+        ok = ok and warm_calls == 0
+        print(f"   {'✅' if warm_calls == 0 else '❌'} 热缓存: {elapsed * 1000:.1f} ms，新增AI调用 {warm_calls} 次")
+
+        print("\n4. 限流...")
+        limiter = RateLimiter(requests_per_minute=600)
+        client = StubCompletionClient(rate_limiter=limiter)
+        generator = AITestCaseGenerator(cache=TestCaseCache(temp / "limited_cache"), client=client)
+        _, elapsed = timed(lambda: generator.generate_batch_from_files(files[:6], max_workers=6))
+        limited = elapsed >= 0.45
+        ok = ok and limited
+        print(f"   {'✅' if limited else '❌'} 每分钟600次、6个并发请求耗时 {elapsed * 1000:.0f} ms（预期约 500 ms）")
+
+        print("\n5. 按会话生成的缓存（generate_test_case）...")
+        sessions = [TestSession(**json.loads(path.read_bytes())) for path in files[:24]]
+        for name, provider, client in (("规则生成", "rules", None), ("本地桩AI", None, StubCompletionClient())):
+            cache = TestCaseCache(temp / f"session_cache_{name}")
+            first = [AITestCaseGenerator(cache=cache, provider=provider, client=client).generate_test_case(s) for s in sessions]
+            second = [AITestCaseGenerator(cache=cache, provider=provider, client=client).generate_test_case(s) for s in sessions]
+            hits = cache.get_stats()["hits"]
+            calls = client.calls if client else 0
+            # 只有第一次生成调用AI
+            cached = hits == len(sessions) and dump(first) == dump(second) and calls == (len(sessions) if client else 0)
+            ok = ok and cached
+            print(f"   {'✅' if cached else '❌'} {name}: 第二次生成缓存命中 {hits}/{len(sessions)}，AI调用 {calls} 次")
+
+        print("\n6. 异步生成不占用文件I/O线程池（桩AI每次调用 200 ms）...")
+        io_pool = IOPool(max_workers=4)
+        client = StubCompletionClient(latency=0.2)
+        generator = AITestCaseGenerator(cache=TestCaseCache(temp / "async_cache", enabled=False), client=client)
+        latency = asyncio.run(measure_io_latency(generator, sessions[:8], io_pool))
+        generator.pool.shutdown()
+        io_pool.shutdown()
+        free = latency < 0.1
+        ok = ok and free
+        print(f"   {'✅' if free else '❌'} 8个并发生成期间，文件I/O任务等待 {latency * 1000:.1f} ms")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,15 @@ class Settings(BaseSettings):
     HOST: str = "127.0.0.1"
     PORT: int = 8000
     
+    # WebSocket配置
+    WS_SEND_QUEUE_SIZE: int = 256  # 每个客户端的发送队列长度
+    WS_SLOW_CONSUMER_POLICY: str = "coalesce"  # drop, coalesce, disconnect
+    WS_SEND_TIMEOUT: float = 10.0  # 单条消息发送超时(秒)
+    WS_BATCH_LINGER_MS: int = 0  # 合并动作消息前的等待时间(毫秒)
+    WS_BATCH_MAX_ACTIONS: int = 50  # 单个actions_batch消息的最大动作数
+    WS_BATCH_MAX_BYTES: int = 256 * 1024  # 单个actions_batch消息的最大字节数
+    EVENT_CHANNEL_MAX_SIZE: int = 10000  # 录制器事件通道最多积压的事件数（超出时丢弃最旧的事件）
+    
     # 存储路径配置
     BASE_DIR: Path = Path(__file__).parent.parent
     RECORDINGS_DIR: Path = BASE_DIR / "recordings"
@@ -23,13 +32,23 @@ class Settings(BaseSettings):
     TEMPLATES_DIR: Path = BASE_DIR / "templates"
     STATIC_DIR: Path = BASE_DIR / "static"
     LOGS_DIR: Path = BASE_DIR / "logs"
+    CACHE_DIR: Path = BASE_DIR / "cache"
     
     # 数据库配置
     DATABASE_URL: str = f"sqlite:///{BASE_DIR}/database.db"
+    SESSIONS_PAGE_MAX_LIMIT: int = 200  # 会话列表单页最大数量
+    SESSION_CACHE_MAX_ENTRIES: int = 200  # 会话缓存最大条目数
+    SESSION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 会话缓存最大字节数（按会话文件大小估算）
+    IO_THREAD_POOL_SIZE: int = 4  # 文件I/O线程池大小
     
     # AI配置
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = "gpt-3.5-turbo"
+    AI_PROVIDER: str = "auto"  # auto(配置了OPENAI_API_KEY时使用openai), rules, openai, stub
+    OPENAI_REQUESTS_PER_MINUTE: int = 60  # OpenAI请求限流（每分钟请求数）
+    OPENAI_TIMEOUT: float = 30.0  # 单次OpenAI请求超时(秒)
+    TEST_CASE_MAX_WORKERS: int = 4  # 批量生成测试用例的最大并发数
+    TEST_CASE_CACHE_ENABLED: bool = True  # 按会话内容哈希缓存生成的测试用例
     
     # Playwright配置
     BROWSER_TYPE: str = "chromium"  # chromium, firefox, webkit
@@ -41,10 +60,31 @@ class Settings(BaseSettings):
     ENABLE_TEXT_EXTRACTION: bool = True
     ENABLE_TRACING: bool = True
     SCREENSHOT_QUALITY: int = 90
+    SCREENSHOT_COALESCE_MS: int = 300  # 操作停顿该时间(毫秒)后截图，期间的连续操作共用一张截图
+    SCREENSHOT_MAX_COALESCE_MS: int = 1500  # 连续操作时最长等待该时间(毫秒)截图
+    SCREENSHOT_MAX_PER_SECOND: float = 2.0  # 每个会话每秒最多截图次数，0表示不限制
+    SCREENSHOT_MAX_SESSION_BYTES: int = 200 * 1024 * 1024  # 每个会话截图总字节数上限，0表示不限制
+    SCREENSHOT_TIMEOUT: float = 5.0  # 单次截图超时(秒)
+    ANALYZER_CACHE_SIZE: int = 2048  # 元素分析结果缓存条目数（按元素指纹），0表示不缓存
+    
+    # 多会话录制配置
+    MAX_CONCURRENT_SESSIONS: int = 4  # 共享浏览器中同时录制的最大会话数
+    MIN_FREE_MEMORY_MB: int = 512  # 开始新会话时要求的最小可用内存(MB)
+    SESSION_MEMORY_ESTIMATE_MB: int = 150  # 每个录制会话（浏览器上下文）的预估内存(MB)
+    MAX_CPU_LOAD: float = 0.9  # 开始新会话时允许的最大CPU负载（1分钟负载/CPU核数）
+    WARM_POOL_SIZE: int = 2  # 预热的空白录制上下文数量，0表示不预热
+    WARM_POOL_IDLE_TIMEOUT: float = 600.0  # 预热上下文空闲超过该时间(秒)后回收重建
+    WARM_POOL_HEALTH_INTERVAL: float = 30.0  # 预热上下文健康检查间隔(秒)
     
     # 导出配置
     EXCEL_TEMPLATE: str = "test_case_template.xlsx"
     WORD_TEMPLATE: str = "test_case_template.docx"
+    EXPORT_SCREENSHOT_MAX_WIDTH: int = 640  # 导出时嵌入截图的最大宽度(像素)，超出时按比例缩小
+    EXPORT_SCREENSHOT_QUALITY: int = 75  # 嵌入截图的JPEG质量
+    
+    # 后台任务配置
+    JOB_HISTORY_SIZE: int = 200  # 保留的已完成后台任务数量
+    GENERATE_TEST_CASE_ON_STOP: bool = True  # 停止录制的后台任务中生成并保存测试用例
     
     # 日志配置
     LOG_LEVEL: str = "INFO"
@@ -67,7 +107,8 @@ class Settings(BaseSettings):
             self.EXPORTS_DIR,
             self.TEMPLATES_DIR,
             self.STATIC_DIR,
-            self.LOGS_DIR
+            self.LOGS_DIR,
+            self.CACHE_DIR
         ]
         
         for directory in directories:
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+测试用例生成的大模型补全客户端
+规则生成的测试用例可以交给大模型润色描述和预期结果。OpenAI请求经过令牌桶限流；
+StubCompletionClient 在本地原样返回输入，不访问网络，用于测试和基准
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from config.settings import settings
+
+
+class RateLimiter:
+    """令牌桶限流器（线程安全）
+
+    令牌按 requests_per_minute 的速率补充，最多积累burst个；
+    令牌不足时调用方预约下一个令牌并在锁外等待，多个线程按预约顺序依次放行
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.acquired = 0
+        self.waited = 0.0
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens * self.interval if self._tokens < 0 else 0.0
+            self.acquired += 1
+            self.waited += wait
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": 60.0 / self.interval if self.interval else None,
+            "acquired": self.acquired,
+            "waited_seconds": round(self.waited, 3)
+        }
+
+
+class CompletionClient:
+    """补全客户端基类"""
+
+    provider = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    @property
+    def cache_namespace(self) -> str:
+        """缓存键的命名空间，不同提供方/模型的结果互不复用"""
+        return self.provider
+
+    def complete(self, messages: List[Dict[str, str]]) -> str:
+        """发送对话消息，返回回复文本"""
+        with self._lock:
+            self.calls += 1
+        try:
+            return self._complete(messages)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.cache_namespace,
+            "calls": self.calls,
+            "failures": self.failures
+        }
+
+
+class OpenAICompletionClient(CompletionClient):
+    """OpenAI聊天补全客户端（openai为可选依赖）"""
+
+    provider = "openai"
+
+    def __init__(self, api_key: str, model: str, timeout: float, rate_limiter: RateLimiter):
+        super().__init__()
+        from openai import OpenAI
+
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self._client = OpenAI(api_key=api_key, timeout=timeout)
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"openai:{self.model}"
+
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
+        self.rate_limiter.acquire()
+        response = self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0
+        )
+        return response.choices[0].message.content or ""
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats["rate_limiter"] = self.rate_limiter.get_stats()
+        return stats
+
+
+class StubCompletionClient(CompletionClient):
+    """本地桩客户端：原样返回请求中的测试用例JSON，可设置模拟延迟"""
+
+    provider = "stub"
+
+    def __init__(self, latency: float = 0.0, rate_limiter: Optional[RateLimiter] = None):
+        super().__init__()
+        self.latency = latency
+        self.rate_limiter = rate_limiter
+
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        if self.latency:
+            time.sleep(self.latency)
+        payload = json.loads(messages[-1]["content"])
+        return json.dumps({
+            "description": payload.get("description", ""),
+            "steps": payload.get("steps", [])
+        }, ensure_ascii=False)
+
+
+def create_completion_client(provider: Optional[str] = None) -> Optional[CompletionClient]:
+    """按配置创建补全客户端，返回None表示只使用规则生成
+
+    provider: auto(配置了OPENAI_API_KEY时使用openai), rules, openai, stub
+    """
+    provider = (provider or settings.AI_PROVIDER or "auto").lower()
+
+    if provider == "stub":
+        return StubCompletionClient()
+
+    if provider == "rules" or (provider == "auto" and not settings.OPENAI_API_KEY):
+        return None
+
+    if provider not in ("auto", "openai"):
+        logger.warning(f"未知的AI提供方: {provider}，使用规则生成")
+        return None
+
+    if not settings.OPENAI_API_KEY:
+        logger.warning("未配置OPENAI_API_KEY，使用规则生成")
+        return None
+
+    try:
+        return OpenAICompletionClient(
+            api_key=settings.OPENAI_API_KEY,
+            model=settings.OPENAI_MODEL,
+            timeout=settings.OPENAI_TIMEOUT,
+            rate_limiter=RateLimiter(settings.OPENAI_REQUESTS_PER_MINUTE)
+        )
+    except ImportError:
+        logger.warning("未安装openai，使用规则生成")
+        return None
+    except Exception as e:
+        logger.error(f"创建OpenAI客户端失败: {e}，使用规则生成")
+        return None
@@ -1,17 +1,65 @@
+import hashlib
 import json
 import re
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
 from datetime import datetime
 
 from loguru import logger
 from config.settings import settings, ACTION_TYPES, ELEMENT_TYPES
 from core.models import ActionRecord, TestStep, TestCase, TestSession
+from core.ai_client import CompletionClient, create_completion_client
+from utils.io_pool import IOPool
+from utils.test_case_cache import TestCaseCache
+
+# 生成器版本，修改生成规则或提示词时递增，使旧的缓存结果失效
+GENERATOR_VERSION = "1"
+
+# 参与生成的会话字段（计算缓存键时只序列化这些字段，page_text等未使用的大字段不参与）
+SESSION_KEY_FIELDS = {
+    "id": True,
+    "name": True,
+    "description": True,
+    "trace_file": True,
+    "start_time": True,
+    "duration": True,
+    "actions": {
+        "__all__": {"action_type", "element_info", "page_url", "page_title", "additional_data", "screenshot_path"}
+    }
+}
+
+AI_SYSTEM_PROMPT = (
+    "你是资深测试工程师。用户会提供一个由录制操作生成的测试用例JSON，"
+    "请润色用例描述以及每个步骤的description和expected_result，使其简洁、专业、可执行。"
+    "保持步骤数量和顺序不变，只返回JSON：{\"description\": \"...\", "
+    "\"steps\": [{\"step_number\": 1, \"description\": \"...\", \"expected_result\": \"...\"}]}"
+)
 
 
 class AITestCaseGenerator:
-    """AI测试用例生成器"""
+    """AI测试用例生成器
+    
+    规则生成测试用例，配置了AI提供方时再交给大模型润色；
+    结果按会话内容哈希+生成器版本+提供方缓存到磁盘，批量生成在线程池中并发执行；
+    异步接口在生成器自己的线程池中执行，AI请求（最长等待超时和限流）不占用文件I/O线程池
+    """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[TestCaseCache] = None, provider: Optional[str] = None,
+                 client: Optional[CompletionClient] = None):
+        self.cache = cache or TestCaseCache(
+            settings.CACHE_DIR / "test_cases",
+            enabled=settings.TEST_CASE_CACHE_ENABLED
+        )
+        self.provider = provider
+        self.max_workers = settings.TEST_CASE_MAX_WORKERS
+        self.pool = IOPool(max_workers=self.max_workers, thread_name_prefix="testcase-gen")
+        # 未传入client时按provider（默认settings.AI_PROVIDER）在首次使用时创建
+        self._client: Optional[CompletionClient] = client
+        self._client_loaded = client is not None
+        self._client_lock = threading.Lock()
+        
         self.action_templates = {
             "click": "点击【{element_desc}】{element_type}",
             "fill": "在【{element_desc}】{element_type}中输入\"{value}\"",
@@ -24,8 +72,40 @@ class AITestCaseGenerator:
             "wait": "等待{duration}秒"
         }
     
+    @property
+    def client(self) -> Optional[CompletionClient]:
+        """补全客户端（首次使用时按配置创建，None表示只使用规则生成）"""
+        if not self._client_loaded:
+            with self._client_lock:
+                if not self._client_loaded:
+                    self._client = create_completion_client(self.provider)
+                    self._client_loaded = True
+        return self._client
+    
     def generate_test_case(self, session: TestSession) -> TestCase:
-        """从会话记录生成完整的测试用例"""
+        """从会话记录生成完整的测试用例
+        
+        先按会话内容哈希查询缓存（规则生成和AI润色都缓存，缓存键区分提供方），未命中时再生成
+        """
+        cache_key = None
+        if self.cache.enabled:
+            cache_key = self._cache_key("session", self._session_digest(session))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"测试用例缓存命中: {session.id}")
+                return cached
+        
+        test_case, cacheable = self._build_test_case(session)
+        if cache_key and cacheable:
+            self.cache.put(cache_key, test_case)
+        return test_case
+    
+    async def generate_test_case_async(self, session: TestSession) -> TestCase:
+        """在生成器的线程池中生成测试用例（供事件循环中调用）"""
+        return await self.pool.run(self.generate_test_case, session)
+    
+    def _build_test_case(self, session: TestSession) -> Tuple[TestCase, bool]:
+        """生成测试用例，返回(测试用例, 是否可缓存)；AI润色失败时返回规则生成结果且不缓存"""
         try:
             # 分析操作记录，生成测试步骤
             test_steps = self._generate_test_steps(session.actions)
@@ -49,8 +129,13 @@ class AITestCaseGenerator:
             # 生成前置条件
             test_case.preconditions = self._generate_preconditions(session.actions)
             
+            # AI润色
+            cacheable = True
+            if self.client is not None:
+                cacheable = self._refine_with_ai(test_case)
+            
             logger.info(f"成功生成测试用例: {test_case.name}")
-            return test_case
+            return test_case, cacheable
             
         except Exception as e:
             logger.error(f"生成测试用例失败: {e}")
@@ -354,20 +439,150 @@ class AITestCaseGenerator:
         
         return preconditions
     
-    def generate_batch_test_cases(self, sessions: List[TestSession]) -> List[TestCase]:
-        """批量生成测试用例"""
-        test_cases = []
+    def _refine_with_ai(self, test_case: TestCase) -> bool:
+        """用大模型润色描述和步骤，返回是否成功；失败时保留规则生成的内容"""
+        payload = {
+            "name": test_case.name,
+            "description": test_case.description,
+            "steps": [
+                {
+                    "step_number": step.step_number,
+                    "action": step.action,
+                    "description": step.description,
+                    "expected_result": step.expected_result
+                }
+                for step in test_case.test_steps
+            ]
+        }
+        messages = [
+            {"role": "system", "content": AI_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}
+        ]
+        
+        try:
+            refined = self._parse_ai_reply(self.client.complete(messages))
+        except Exception as e:
+            logger.warning(f"AI润色测试用例失败，使用规则生成结果: {e}")
+            return False
+        
+        steps = refined.get("steps")
+        if not isinstance(steps, list) or len(steps) != len(test_case.test_steps):
+            logger.warning("AI返回的步骤数与原步骤不一致，使用规则生成结果")
+            return False
+        
+        for step, item in zip(test_case.test_steps, steps):
+            if isinstance(item, dict):
+                step.description = str(item.get("description") or step.description)
+                step.expected_result = str(item.get("expected_result") or step.expected_result)
+        
+        if refined.get("description"):
+            test_case.description = str(refined["description"])
+        
+        return True
+    
+    @staticmethod
+    def _parse_ai_reply(reply: str) -> Dict[str, Any]:
+        """解析AI回复中的JSON（兼容```json代码块包裹）"""
+        match = re.search(r"\{.*\}", reply or "", re.S)
+        if not match:
+            raise ValueError("AI回复中没有JSON")
+        data = json.loads(match.group(0))
+        if not isinstance(data, dict):
+            raise ValueError("AI回复的JSON不是对象")
+        return data
+    
+    @staticmethod
+    def _session_digest(session: TestSession) -> str:
+        """会话中参与生成的字段的内容哈希"""
+        data = session.model_dump_json(include=SESSION_KEY_FIELDS)
+        return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _cache_key(self, source: str, digest: str) -> str:
+        """缓存键 = 生成器版本 + 提供方 + 内容来源 + 内容哈希"""
+        namespace = self.client.cache_namespace if self.client is not None else "rules"
+        raw = f"{GENERATOR_VERSION}|{namespace}|{source}|{digest}"
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def generate_batch_test_cases(self, sessions: List[TestSession], max_workers: Optional[int] = None) -> List[TestCase]:
+        """批量生成测试用例（线程池并发，结果保持输入顺序，失败的会话跳过）"""
+        return self._run_batch(
+            self.generate_test_case,
+            sessions,
+            max_workers,
+            lambda session: f"会话ID: {session.id}"
+        )
+    
+    def generate_batch_from_files(self, session_files: Iterable[Path], max_workers: Optional[int] = None) -> List[TestCase]:
+        """按会话文件批量生成测试用例
+        
+        缓存键取会话文件字节的哈希，命中时既不解析会话JSON也不重新生成，适合整库重新生成
+        """
+        return self._run_batch(
+            self._generate_from_file,
+            [Path(path) for path in session_files],
+            max_workers,
+            lambda path: f"会话文件: {path.name}"
+        )
+    
+    def _generate_from_file(self, session_file: Path) -> TestCase:
+        data = session_file.read_bytes()
+        
+        cache_key = None
+        if self.cache.enabled:
+            cache_key = self._cache_key("file", hashlib.blake2b(data, digest_size=16).hexdigest())
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        session = TestSession(**json.loads(data))
+        test_case, cacheable = self._build_test_case(session)
+        if cache_key and cacheable:
+            self.cache.put(cache_key, test_case)
+        return test_case
+    
+    def _run_batch(self, func: Callable[[Any], TestCase], items: List[Any],
+                   max_workers: Optional[int], describe: Callable[[Any], str]) -> List[TestCase]:
+        """在线程池中执行批量生成，并发数不超过max_workers
+        
+        未指定max_workers时，只有使用AI润色（等待网络）时才开启多个工作线程；
+        规则生成是纯Python计算，受GIL限制，多线程反而更慢
+        """
+        items = list(items)
+        if not items:
+            return []
         
-        for session in sessions:
+        results: List[Optional[TestCase]] = [None] * len(items)
+        
+        def run(index: int):
             try:
-                test_case = self.generate_test_case(session)
-                test_cases.append(test_case)
+                results[index] = func(items[index])
             except Exception as e:
-                logger.error(f"批量生成测试用例失败，会话ID: {session.id}, 错误: {e}")
-                continue
+                logger.error(f"批量生成测试用例失败，{describe(items[index])}, 错误: {e}")
+        
+        if max_workers is None:
+            max_workers = self.max_workers if self.client is not None else 1
+        workers = max(1, min(max_workers, len(items)))
+        if workers == 1:
+            for index in range(len(items)):
+                run(index)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="testcase-gen") as executor:
+                list(executor.map(run, range(len(items))))
         
-        logger.info(f"批量生成完成，成功生成 {len(test_cases)} 个测试用例")
+        test_cases = [test_case for test_case in results if test_case is not None]
+        logger.info(f"批量生成完成，成功生成 {len(test_cases)}/{len(items)} 个测试用例")
         return test_cases
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存和AI调用统计信息"""
+        client = self.client
+        return {
+            "generator_version": GENERATOR_VERSION,
+            "max_workers": self.max_workers,
+            "pool": self.pool.get_stats(),
+            "cache": self.cache.get_stats(),
+            "ai": client.get_stats() if client is not None else None
+        }
 
 
 # 全局AI生成器实例
@@ -2,13 +2,17 @@
 """Playwright代码生成器 - 将操作序列转换为标准的Playwright测试代码"""
 
 import re
-from typing import List, Dict, Optional
+from pathlib import Path
+from typing import Any, List, Dict, Optional
 from datetime import datetime
 from loguru import logger
 
 from core.models import ActionRecord
 from core.playwright_analyzer import playwright_analyzer
 
+# 需要分析元素的交互操作类型
+INTERACTION_ACTION_TYPES = ("click", "input", "keypress", "select")
+
 
 class PlaywrightCodeGenerator:
     """Playwright代码生成器"""
@@ -24,9 +28,15 @@ class PlaywrightCodeGenerator:
             self.current_url = ""
             self.action_sequence = []
             
+            # 批量分析交互操作的元素（相同元素只分析一次）
+            interactions = [action for action in actions
+                            if action.action_type in INTERACTION_ACTION_TYPES and action.element_info]
+            analyses = playwright_analyzer.analyze_many(action.element_info for action in interactions)
+            analyzed_by_action = {id(action): analyzed for action, analyzed in zip(interactions, analyses)}
+            
             # 分析所有操作
             for action in actions:
-                self._process_action(action)
+                self._process_action(action, analyzed_by_action.get(id(action)))
             
             # 生成代码
             code = self._generate_full_code(test_name)
@@ -37,15 +47,15 @@ class PlaywrightCodeGenerator:
             logger.error(f"生成测试代码失败: {e}")
             return self._generate_error_code(str(e))
     
-    def _process_action(self, action: ActionRecord):
-        """处理单个操作记录"""
+    def _process_action(self, action: ActionRecord, analyzed: Optional[Dict] = None):
+        """处理单个操作记录（analyzed为预先分析的元素信息）"""
         try:
             action_type = action.action_type
             
             if action_type == "goto":
                 self._process_goto_action(action)
-            elif action_type in ["click", "input", "keypress", "select"]:
-                self._process_interaction_action(action)
+            elif action_type in INTERACTION_ACTION_TYPES:
+                self._process_interaction_action(action, analyzed)
             elif action_type == "load":
                 # 页面加载事件通常不需要生成代码
                 pass
@@ -67,7 +77,7 @@ class PlaywrightCodeGenerator:
             })
             self.current_url = url
     
-    def _process_interaction_action(self, action: ActionRecord):
+    def _process_interaction_action(self, action: ActionRecord, analyzed: Optional[Dict] = None):
         """处理交互操作"""
         try:
             element_info = action.element_info
@@ -75,7 +85,8 @@ class PlaywrightCodeGenerator:
                 return
             
             # 使用Playwright分析器分析元素
-            analyzed = playwright_analyzer.analyze_element(element_info)
+            if analyzed is None:
+                analyzed = playwright_analyzer.analyze_element(element_info)
             
             # 获取最佳选择器
             best_selector = playwright_analyzer.get_best_selector(analyzed['selectors'])
@@ -173,11 +184,8 @@ from playwright.async_api import Playwright, async_playwright, expect"""
             lines.append("    page = await context.new_page()")
             
             # 添加操作代码
-            for action in self.action_sequence:
-                if action['type'] == 'goto':
-                    lines.append(f'    await page.goto("{action["url"]}")')
-                elif action['type'] == 'interaction':
-                    lines.append(f"    {action['code_line']}")
+            for code_line in self._operation_code_lines():
+                lines.append(f"    {code_line}")
             
             # 添加清理代码
             lines.append("")
@@ -191,6 +199,16 @@ from playwright.async_api import Playwright, async_playwright, expect"""
             logger.error(f"生成run函数失败: {e}")
             return "async def run(playwright: Playwright) -> None:\n    pass"
     
+    def _operation_code_lines(self) -> List[str]:
+        """run函数体中的操作代码行"""
+        return [self._entry_code_line(entry) for entry in self.action_sequence]
+    
+    @staticmethod
+    def _entry_code_line(entry: Dict) -> str:
+        if entry['type'] == 'goto':
+            return f'await page.goto("{entry["url"]}")'
+        return entry['code_line']
+    
     def _generate_error_code(self, error_msg: str) -> str:
         """生成错误提示代码"""
         return f"""# 代码生成失败: {error_msg}
@@ -295,5 +313,62 @@ asyncio.run(main())"""
             return code
 
 
+class IncrementalCodeGenerator(PlaywrightCodeGenerator):
+    """单个录制会话的增量代码生成器
+
+    每个新操作只处理一次，生成的代码行追加到脚本中（O(1)），optimize_code的规则
+    （去除重复的goto）在追加时应用；停止录制时只需拼接已生成的代码行写入文件
+    """
+    
+    def __init__(self, test_name: str = "test"):
+        super().__init__()
+        self.test_name = test_name
+        self.code_lines: List[str] = []
+        self._last_goto_line: Optional[str] = None
+        self.skipped_gotos = 0
+    
+    def add_action(self, action: ActionRecord, analyzed: Optional[Dict] = None) -> List[str]:
+        """处理一个新操作，返回新增的代码行（可能为空）"""
+        start = len(self.action_sequence)
+        self._process_action(action, analyzed)
+        
+        new_lines = []
+        for entry in self.action_sequence[start:]:
+            code_line = self._entry_code_line(entry)
+            if entry['type'] == 'goto':
+                # 去除重复的goto操作
+                if code_line == self._last_goto_line:
+                    self.skipped_gotos += 1
+                    continue
+                self._last_goto_line = code_line
+            self.code_lines.append(code_line)
+            new_lines.append(code_line)
+        return new_lines
+    
+    def lines_since(self, index: int) -> List[str]:
+        """获取第index行之后的代码行（客户端断线重连后补齐）"""
+        return self.code_lines[index:]
+    
+    def _operation_code_lines(self) -> List[str]:
+        return self.code_lines
+    
+    def render(self) -> str:
+        """生成当前的完整测试代码"""
+        return self._generate_full_code(self.test_name)
+    
+    def flush(self, path: Path) -> Path:
+        """把完整代码写入文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        return path
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "actions": len(self.action_sequence),
+            "code_lines": len(self.code_lines),
+            "skipped_gotos": self.skipped_gotos
+        }
+
+
 # 全局代码生成器实例
-code_generator = PlaywrightCodeGenerator() 
\ No newline at end of file
+code_generator = PlaywrightCodeGenerator()
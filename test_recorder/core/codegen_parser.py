@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+codegen输出的增量解析器
+playwright codegen 每录制一个操作都会重写整个输出文件，并可能修改之前的行（例如合并连续的fill）。
+解析器记录每行的字节偏移和哈希，每次只定位发生变化的区域（公共前缀/后缀之外的部分），
+对该区域的行哈希做行级diff，只解码和解析变化的语句，输出 insert/update/delete 变化事件，
+每条操作语句拥有稳定的ID，修改时ID不变
+
+CodeFileWatcher 监听输出文件的变化（inotify/ReadDirectoryChangesW等），空闲时不占用CPU
+"""
+
+import difflib
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from watchdog.events import FileSystemEventHandler
+
+# 视为录制操作的语句前缀（page、page1等页面对象上的操作以及断言）
+STATEMENT_PREFIXES = ("await page", "await expect(")
+
+
+@dataclass
+class CodeLine:
+    """输出文件中的一行"""
+    offset: int  # 行首字节偏移
+    data: bytes  # 行内容（含换行符）
+    digest: int  # 行内容哈希
+    statement_id: Optional[str] = None  # 操作语句的稳定ID，非操作语句为None
+
+
+@dataclass
+class StatementChange:
+    """操作语句的变化事件
+
+    事件需按顺序应用：insert的index为插入位置，update/delete的index为当前位置
+    """
+    kind: str  # insert / update / delete
+    statement_id: str
+    index: int
+    code_line: str = ""
+    previous_code_line: str = ""
+
+
+@dataclass
+class ParserStats:
+    """解析统计"""
+    updates: int = 0
+    skipped: int = 0
+    bytes_read: int = 0
+    lines_hashed: int = 0
+    lines_decoded: int = 0
+    changes: Dict[str, int] = field(default_factory=lambda: {"insert": 0, "update": 0, "delete": 0})
+
+
+def _common_prefix_length(a: bytes, b: bytes) -> int:
+    """两个字节串的公共前缀长度
+
+    二分查找，每次只比较尚未确认的区间[low, mid)，复制和比较的总字节数约为O(n)，比较在C层完成
+    """
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[low:mid] == b[low:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix_length(a: bytes, b: bytes, limit: int) -> int:
+    """两个字节串的公共后缀长度（不超过limit）"""
+    low, high = 0, limit
+    len_a, len_b = len(a), len(b)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len_a - mid:len_a - low] == b[len_b - mid:len_b - low]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class CodegenTailParser:
+    """codegen输出文件的增量解析器"""
+
+    def __init__(self):
+        self._data = b""
+        self._lines: List[CodeLine] = []
+        self._file_stat: Optional[Tuple[int, int]] = None
+        self._statement_count = 0
+        self.stats = ParserStats()
+
+    @staticmethod
+    def is_statement(text: str) -> bool:
+        """是否为录制操作语句"""
+        return text.startswith(STATEMENT_PREFIXES)
+
+    @property
+    def line_count(self) -> int:
+        return len(self._lines)
+
+    def statements(self) -> List[Tuple[str, str]]:
+        """当前所有操作语句 [(statement_id, code_line)]"""
+        return [
+            (line.statement_id, self._decode(line))
+            for line in self._lines if line.statement_id
+        ]
+
+    def reset(self):
+        self._data = b""
+        self._lines = []
+        self._file_stat = None
+        self._statement_count = 0
+        self.stats = ParserStats()
+
+    def read_file(self, path: Path) -> List[StatementChange]:
+        """读取输出文件并返回变化；文件的mtime和大小均未变化时不读取，读到截断中的空文件时忽略"""
+        stat = os.stat(path)
+        file_stat = (stat.st_mtime_ns, stat.st_size)
+        if file_stat == self._file_stat:
+            self.stats.skipped += 1
+            return []
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data and self._data:
+            # codegen重写文件时先截断再写入，读到空文件说明写入尚未完成，等待下一次变化事件
+            self.stats.skipped += 1
+            return []
+        self._file_stat = file_stat
+        self.stats.bytes_read += len(data)
+        return self.feed(data)
+
+    def feed(self, data: bytes) -> List[StatementChange]:
+        """输入文件的最新完整内容，返回操作语句的变化"""
+        old_data = self._data
+        if data == old_data:
+            self.stats.skipped += 1
+            return []
+        self.stats.updates += 1
+
+        old_lines = self._lines
+        prefix = _common_prefix_length(old_data, data)
+        suffix = _common_suffix_length(old_data, data, min(len(old_data), len(data)) - prefix)
+
+        # 完全位于公共前缀内的行未变化（最后一行没有换行符时可能被续写，不能视为未变化）
+        start = self._lines_within(old_lines, prefix)
+        if start and start == len(old_lines) and not old_lines[-1].data.endswith(b"\n"):
+            start -= 1
+
+        # 位于公共后缀内、且在新内容中仍是行首的行未变化
+        delta = len(data) - len(old_data)
+        tail_boundary = len(old_data) - suffix
+        end = len(old_lines)
+        while end > start:
+            line = old_lines[end - 1]
+            new_offset = line.offset + delta
+            if line.offset < tail_boundary or (new_offset > 0 and data[new_offset - 1:new_offset] != b"\n"):
+                break
+            end -= 1
+
+        region_start = old_lines[start].offset if start < len(old_lines) else len(old_data)
+        region_end = old_lines[end].offset + delta if end < len(old_lines) else len(data)
+        new_middle = self._split_lines(data, region_start, region_end)
+        old_middle = old_lines[start:end]
+
+        # 变化区域之前的语句数 = 总数 - 变化区域及之后的语句数（只需扫描文件尾部）
+        base_index = self._statement_count - sum(1 for line in old_lines[start:] if line.statement_id)
+        changes = self._diff(old_middle, new_middle, base_index)
+
+        # 公共后缀内的行只需平移偏移
+        tail = old_lines[end:]
+        if delta:
+            for line in tail:
+                line.offset += delta
+
+        self._lines = old_lines[:start] + new_middle + tail
+        self._data = data
+
+        for change in changes:
+            self.stats.changes[change.kind] += 1
+            if change.kind == 'insert':
+                self._statement_count += 1
+            elif change.kind == 'delete':
+                self._statement_count -= 1
+        return changes
+
+    @staticmethod
+    def _lines_within(lines: List[CodeLine], limit: int) -> int:
+        """二分查找结束位置不超过limit的行数（行按偏移有序）"""
+        low, high = 0, len(lines)
+        while low < high:
+            mid = (low + high) // 2
+            line = lines[mid]
+            if line.offset + len(line.data) <= limit:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _split_lines(self, data: bytes, start: int, end: int) -> List[CodeLine]:
+        lines = []
+        pos = start
+        while pos < end:
+            newline = data.find(b"\n", pos, end)
+            line_end = end if newline < 0 else newline + 1
+            chunk = data[pos:line_end]
+            lines.append(CodeLine(offset=pos, data=chunk, digest=hash(chunk)))
+            pos = line_end
+        self.stats.lines_hashed += len(lines)
+        return lines
+
+    def _decode(self, line: CodeLine) -> str:
+        return line.data.decode('utf-8', errors='replace').strip()
+
+    def _diff(self, old_lines: List[CodeLine], new_lines: List[CodeLine], base_index: int) -> List[StatementChange]:
+        """对变化区域做行级diff，转换为操作语句的变化事件"""
+        changes: List[StatementChange] = []
+        index = base_index
+
+        matcher = difflib.SequenceMatcher(
+            None,
+            [line.digest for line in old_lines],
+            [line.digest for line in new_lines],
+            autojunk=False
+        )
+
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                for old_line, new_line in zip(old_lines[i1:i2], new_lines[j1:j2]):
+                    new_line.statement_id = old_line.statement_id
+                    if new_line.statement_id:
+                        index += 1
+                continue
+
+            removed = [line for line in old_lines[i1:i2] if line.statement_id]
+            added = []
+            for line in new_lines[j1:j2]:
+                text = self._decode(line)
+                self.stats.lines_decoded += 1
+                if self.is_statement(text):
+                    added.append((line, text))
+
+            # 修改的语句保留原ID，多出的语句作为插入或删除
+            for position in range(max(len(removed), len(added))):
+                if position < len(removed) and position < len(added):
+                    old_line = removed[position]
+                    new_line, text = added[position]
+                    new_line.statement_id = old_line.statement_id
+                    previous = self._decode(old_line)
+                    if previous != text:
+                        changes.append(StatementChange('update', new_line.statement_id, index, text, previous))
+                    index += 1
+                elif position < len(added):
+                    new_line, text = added[position]
+                    new_line.statement_id = str(uuid.uuid4())
+                    changes.append(StatementChange('insert', new_line.statement_id, index, text))
+                    index += 1
+                else:
+                    old_line = removed[position]
+                    changes.append(StatementChange('delete', old_line.statement_id, index,
+                                                   previous_code_line=self._decode(old_line)))
+
+        return changes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取解析统计信息"""
+        return {
+            "updates": self.stats.updates,
+            "skipped": self.stats.skipped,
+            "bytes_read": self.stats.bytes_read,
+            "lines": len(self._lines),
+            "lines_hashed": self.stats.lines_hashed,
+            "lines_decoded": self.stats.lines_decoded,
+            "changes": dict(self.stats.changes)
+        }
+
+
+class CodeFileWatcher(FileSystemEventHandler):
+    """代码文件监控器
+
+    每次文件事件都交给回调处理，不做丢弃式的去抖：解析器在mtime和大小未变化时不会读取文件，
+    重复事件的开销很小，而丢弃事件可能漏掉codegen最后一次写入
+    """
+
+    def __init__(self, code_file_path: Path, callback: Callable):
+        self.code_file_path = code_file_path
+        self.callback = callback
+
+    def on_created(self, event):
+        self._dispatch_path(event, event.src_path)
+
+    def on_modified(self, event):
+        self._dispatch_path(event, event.src_path)
+
+    def on_moved(self, event):
+        # 先写临时文件再重命名覆盖的方式
+        self._dispatch_path(event, event.dest_path)
+
+    def _dispatch_path(self, event, path):
+        if event.is_directory or Path(os.fsdecode(path)) != self.code_file_path:
+            return
+        try:
+            if self.callback:
+                self.callback()
+        except Exception as e:
+            logger.error(f"代码文件变化回调失败: {e}")
@@ -21,6 +21,7 @@ from loguru import logger
 # 导入自定义模块
 from .window_detector import WindowDetector, WindowInfo
 from .page_event_coordinator import PageEventCoordinator, CrossWindowEvent
+from .recorder_binding import install_recorder_binding
 
 
 class CrossWindowManager:
@@ -72,6 +73,9 @@ class CrossWindowManager:
             await self.window_detector.start_monitoring(context, main_page)
             await self.event_coordinator.start()
             
+            # 暴露录制器绑定（所有窗口共用同一通道上报事件）
+            await install_recorder_binding(context, self._on_binding_event)
+            
             # 为主页面注入事件监听器
             await self._inject_event_listeners(main_page, self.window_detector.main_window_id)
             
@@ -200,7 +204,7 @@ class CrossWindowManager:
         
         script = f"""
         (function() {{
-            const windowId = '{window_id}';
+            const windowId = 'WINDOW_ID_PLACEHOLDER';
             
             if (window.playwrightWindowId === windowId) {{
                 return 'already_injected_for_window';
@@ -283,7 +287,7 @@ class CrossWindowManager:
                     let parentPath = parent.tagName.toLowerCase();
                     
                     if (parent.id) {{
-                        return `//*[@id="${{parent.id}}"]/${{{path}}}`;
+                        return `//*[@id="${{parent.id}}"]/${{path}}`;
                     }}
                     
                     if (parent.className) {{
@@ -319,8 +323,10 @@ class CrossWindowManager:
                         timestamp: Date.now()
                     }};
                     
-                    // 发送到控制台供Playwright捕获
-                    console.log('RECORDER_EVENT:' + eventType + ':' + JSON.stringify(eventPayload));
+                    // 通过录制器绑定通道上报
+                    if (window.__recorderChannel) {{
+                        window.__recorderChannel.emit(eventType, eventPayload);
+                    }}
                     
                     // 简化调试信息
                     console.log('RECORDER_DEBUG: 事件记录', {{
@@ -421,7 +427,7 @@ class CrossWindowManager:
         """
         
         self._event_script_cache = script
-        return script
+        return script.replace("WINDOW_ID_PLACEHOLDER", window_id)
     
     async def _on_event_processed(self, event: CrossWindowEvent):
         """处理单个事件"""
@@ -448,6 +454,13 @@ class CrossWindowManager:
         except Exception as e:
             logger.error(f"批量处理事件失败: {e}")
     
+    async def _on_binding_event(self, source: Dict[str, Any], event_type: str, event_data: Dict[str, Any]):
+        """处理页面通过录制器绑定上报的事件"""
+        if not self.is_active:
+            return
+        window_id = event_data.get('windowId') or self.window_detector.main_window_id
+        await self.record_browser_action(window_id, event_type, event_data)
+    
     # 录制事件接口
     async def record_browser_action(self, window_id: str, event_type: str, event_data: Dict[str, Any]):
         """记录浏览器操作事件（从JavaScript事件监听器调用）- 简化版"""
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+录制器事件通道
+录制器（运行在各自的线程/事件循环中）通过该通道把事件推送到FastAPI事件循环，
+消费端只在有事件到达时被唤醒，不再需要定时轮询队列
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from loguru import logger
+from config.settings import settings
+
+
+@dataclass
+class RecorderEvent:
+    """录制器事件"""
+    event_type: str
+    data: Any
+    recorder_type: str
+    # 事件所属的录制会话（用于按会话订阅），None表示全局事件
+    session_id: Optional[str] = None
+    # 事件进入通道的时间（秒）
+    created_at: float = field(default_factory=time.time)
+    # 事件在页面中发生的时间（秒），用于计算端到端延迟
+    source_ts: Optional[float] = None
+
+
+class LatencyTracker:
+    """事件投递延迟统计（从DOM事件到WebSocket发送）"""
+
+    def __init__(self, window_size: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self.total_count = 0
+        self.max_ms = 0.0
+
+    def record(self, latency_ms: float):
+        """记录一次延迟采样"""
+        with self._lock:
+            self._samples.append(latency_ms)
+            self.total_count += 1
+            if latency_ms > self.max_ms:
+                self.max_ms = latency_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取延迟统计信息"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.total_count, "avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": self.max_ms}
+
+        def percentile(p: float) -> float:
+            index = min(len(samples) - 1, int(round(p * (len(samples) - 1))))
+            return round(samples[index], 2)
+
+        return {
+            "count": self.total_count,
+            "avg_ms": round(sum(samples) / len(samples), 2),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max_ms, 2)
+        }
+
+
+class RecorderEventChannel:
+    """线程安全的asyncio事件通道
+
+    生产者可以在任意线程调用 publish()；消费者在绑定的事件循环中 await get()。
+    绑定事件循环之前发布的事件会暂存，绑定后按顺序投递。
+    队列和暂存区最多积压 max_size 个事件，超出时丢弃最旧的事件（与WebSocket客户端的drop策略一致）；
+    通道关闭或绑定的事件循环已关闭后发布的事件直接丢弃
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or settings.EVENT_CHANNEL_MAX_SIZE
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Deque[RecorderEvent] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.latency = LatencyTracker()
+        self.published_count = 0
+        self.dropped_count = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """绑定消费端事件循环（需在该事件循环中调用）"""
+        with self._lock:
+            self._loop = loop
+            self._closed = False
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            while self._pending:
+                self._queue.put_nowait(self._pending.popleft())
+        logger.info("录制器事件通道已绑定到事件循环")
+
+    def close(self):
+        """关闭通道：解除事件循环绑定并清空积压的事件"""
+        with self._lock:
+            self._loop = None
+            self._queue = None
+            self._pending.clear()
+            self._closed = True
+        logger.info("录制器事件通道已关闭")
+
+    def publish(self, recorder_type: str, event_type: str, data: Any, source_ts: Optional[float] = None,
+                session_id: Optional[str] = None):
+        """发布事件（线程安全）"""
+        event = RecorderEvent(
+            event_type=event_type,
+            data=data,
+            recorder_type=recorder_type,
+            session_id=session_id,
+            source_ts=source_ts
+        )
+
+        with self._lock:
+            self.published_count += 1
+            loop = self._loop
+            if self._closed or (loop is not None and loop.is_closed()):
+                # 没有消费者了，暂存只会无限增长
+                self._pending.clear()
+                self.dropped_count += 1
+                return
+            if loop is None:
+                if len(self._pending) >= self.max_size:
+                    self._pending.popleft()
+                    self.dropped_count += 1
+                self._pending.append(event)
+                return
+            queue = self._queue
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is loop:
+            self._put(queue, event)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # 事件循环在检查之后关闭
+                with self._lock:
+                    self.dropped_count += 1
+
+    def _put(self, queue: asyncio.Queue, event: RecorderEvent):
+        """在事件循环中入队，队列已满时丢弃最旧的事件"""
+        if queue.full():
+            queue.get_nowait()
+            with self._lock:
+                self.dropped_count += 1
+        queue.put_nowait(event)
+
+    async def get(self) -> RecorderEvent:
+        """等待下一个事件"""
+        if self._queue is None:
+            self.bind(asyncio.get_running_loop())
+        return await self._queue.get()
+
+    def get_nowait_all(self) -> List[RecorderEvent]:
+        """取出当前已到达的所有事件（不等待）"""
+        events = []
+        if self._queue is None:
+            return events
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return events
+
+    def qsize(self) -> int:
+        """待处理事件数量"""
+        if self._queue is None:
+            return len(self._pending)
+        return self._queue.qsize()
+
+    def mark_delivered(self, event: RecorderEvent):
+        """记录事件已通过WebSocket发送，更新延迟统计"""
+        origin = event.source_ts if event.source_ts else event.created_at
+        self.latency.record(max(0.0, (time.time() - origin) * 1000))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取通道统计信息"""
+        return {
+            "published": self.published_count,
+            "pending": self.qsize(),
+            "max_size": self.max_size,
+            "dropped": self.dropped_count,
+            "latency": self.latency.get_stats()
+        }
+
+
+# 全局录制器事件通道实例
+recorder_event_channel = RecorderEventChannel()
@@ -14,46 +14,20 @@ import subprocess
 import sys
 import time
 import threading
-import queue
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Callable
 import uuid
 import tempfile
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 
 from loguru import logger
 
 from config.settings import settings
 from core.models import TestSession, ActionRecord
-
-
-class CodeFileWatcher(FileSystemEventHandler):
-    """代码文件监控器"""
-    
-    def __init__(self, code_file_path: Path, callback: Callable):
-        self.code_file_path = code_file_path
-        self.callback = callback
-        self.last_modified = 0
-        
-    def on_modified(self, event):
-        """文件修改事件处理"""
-        if event.is_directory:
-            return
-            
-        if Path(event.src_path) == self.code_file_path:
-            # 防止重复触发
-            current_time = time.time()
-            if current_time - self.last_modified < 0.1:  # 100ms内的重复事件忽略
-                return
-            self.last_modified = current_time
-            
-            try:
-                if self.callback:
-                    self.callback()
-            except Exception as e:
-                logger.error(f"代码文件变化回调失败: {e}")
+from core.event_channel import recorder_event_channel, RecorderEventChannel
+from core.session_journal import SessionJournal
+from core.codegen_parser import CodegenTailParser, CodeFileWatcher, StatementChange
 
 
 class InspectorTestRecorder:
@@ -72,14 +46,17 @@ class InspectorTestRecorder:
         self.file_observer: Optional[Observer] = None
         self.file_watcher: Optional[CodeFileWatcher] = None
         
-        # 代码内容跟踪
-        self.last_code_content = ""
+        # 代码文件增量解析
+        self.code_parser = CodegenTailParser()
         self.generated_actions: List[Dict] = []
         
-        # 消息队列和监听器
-        self.message_queue = queue.Queue()
+        # 事件通道和监听器
+        self.message_queue = recorder_event_channel
         self._listeners: List[Callable] = []
         
+        # 会话动作日志（追加写）
+        self.journal: Optional[SessionJournal] = None
+        
         # 临时目录
         self.temp_dir = Path(tempfile.mkdtemp(prefix="inspector_recorder_"))
         
@@ -123,9 +100,17 @@ class InspectorTestRecorder:
                 actions=[]
             )
             
+            # 创建会话动作日志
+            self.journal = SessionJournal(session_id)
+            self.journal.open(
+                self.session,
+                settings.RECORDINGS_DIR / f"{session_id}_inspector_session.json",
+                extra={'recording_method': 'inspector'}
+            )
+            
             self.is_recording = True
             self.action_count = 0
-            self.last_code_content = ""
+            self.code_parser.reset()
             self.generated_actions.clear()
             
             # 重置统计
@@ -215,63 +200,37 @@ class InspectorTestRecorder:
             raise
     
     def _on_code_file_changed(self):
-        """代码文件变化处理"""
+        """代码文件变化处理（增量解析，只处理变化的语句）"""
         try:
             if not self.code_file_path.exists():
                 return
             
-            # 读取当前内容
-            with open(self.code_file_path, 'r', encoding='utf-8') as f:
-                current_content = f.read()
-            
-            # 检查是否有实际变化
-            if current_content == self.last_code_content:
+            changes = self.code_parser.read_file(self.code_file_path)
+            if not changes:
                 return
             
-            logger.debug(f"检测到代码文件变化: {self.code_file_path}")
-            
-            # 解析新增的代码行
-            new_actions = self._parse_code_changes(self.last_code_content, current_content)
+            logger.debug(f"检测到代码文件变化: {self.code_file_path}，{len(changes)} 处语句变化")
             
-            # 处理新动作
-            for action in new_actions:
-                self._process_inspector_action(action)
+            for change in changes:
+                self._apply_statement_change(change)
             
-            # 更新内容
-            self.last_code_content = current_content
-            self.stats["code_lines"] = len(current_content.splitlines())
+            self.stats["code_lines"] = self.code_parser.line_count
             
         except Exception as e:
             logger.error(f"处理代码文件变化失败: {e}")
     
-    def _parse_code_changes(self, old_content: str, new_content: str) -> List[Dict]:
-        """解析代码变化，提取新的动作"""
-        try:
-            old_lines = old_content.splitlines() if old_content else []
-            new_lines = new_content.splitlines()
-            
-            # 找出新增的行
-            if len(new_lines) <= len(old_lines):
-                return []
-            
-            new_actions = []
-            added_lines = new_lines[len(old_lines):]
-            
-            for line in added_lines:
-                line = line.strip()
-                if not line or line.startswith('#') or line.startswith('import'):
-                    continue
-                
-                # 解析动作类型
-                action = self._parse_code_line(line)
-                if action:
-                    new_actions.append(action)
-            
-            return new_actions
-            
-        except Exception as e:
-            logger.error(f"解析代码变化失败: {e}")
-            return []
+    def _apply_statement_change(self, change: StatementChange):
+        """把语句的新增/修改/删除应用到会话动作"""
+        if change.kind == 'insert':
+            action = self._parse_code_line(change.code_line)
+            if action:
+                self._process_inspector_action(action, action_id=change.statement_id, index=change.index)
+        elif change.kind == 'update':
+            action = self._parse_code_line(change.code_line)
+            if action:
+                self._update_inspector_action(change.statement_id, action)
+        elif change.kind == 'delete':
+            self._delete_inspector_action(change.statement_id)
     
     def _parse_code_line(self, code_line: str) -> Optional[Dict]:
         """解析单行代码，提取动作信息"""
@@ -377,40 +336,51 @@ class InspectorTestRecorder:
         match = re.search(r'\.select_option\([^,]+,\s*["\']([^"\']*)["\']', code_line)
         return match.group(1) if match else ""
     
-    def _process_inspector_action(self, action_data: Dict):
-        """处理Inspector动作"""
+    def _build_action_record(self, action_data: Dict, action_id: str) -> ActionRecord:
+        """根据解析结果创建ActionRecord"""
+        return ActionRecord(
+            id=action_id,
+            session_id=self.session.id,
+            action_type=action_data['action_type'],
+            timestamp=action_data['timestamp'],
+            page_url="",  # Inspector模式下无法直接获取URL
+            page_title=action_data['description'],
+            element_info=action_data['element_info'],
+            description=action_data['description'],
+            screenshot_path="",  # Inspector模式下无截图
+            additional_data=json.dumps({
+                'code_line': action_data['code_line'],
+                'source': 'inspector'
+            })
+        )
+    
+    def _process_inspector_action(self, action_data: Dict, action_id: Optional[str] = None,
+                                  index: Optional[int] = None):
+        """处理Inspector动作（index为在会话动作中的插入位置，默认追加）"""
         try:
             # 创建ActionRecord
-            action_record = ActionRecord(
-                id=str(uuid.uuid4()),
-                session_id=self.session.id,
-                action_type=action_data['action_type'],
-                timestamp=action_data['timestamp'],
-                page_url="",  # Inspector模式下无法直接获取URL
-                page_title=action_data['description'],
-                element_info=action_data['element_info'],
-                description=action_data['description'],
-                screenshot_path="",  # Inspector模式下无截图
-                additional_data=json.dumps({
-                    'code_line': action_data['code_line'],
-                    'source': 'inspector'
-                })
-            )
+            action_record = self._build_action_record(action_data, action_id or str(uuid.uuid4()))
             
             # 添加到会话
-            self.session.actions.append(action_record)
+            if index is None or index >= len(self.session.actions):
+                self.session.actions.append(action_record)
+                index = None
+            else:
+                self.session.actions.insert(index, action_record)
+            if self.journal:
+                self.journal.append_action(action_record, index=index)
             self.action_count += 1
             self.stats["total_actions"] += 1
             
             # 生成Playwright代码
             playwright_code = action_data['code_line']
             
-            # 添加到消息队列
-            self.message_queue.put(('action_recorded', {
+            # 推送到事件通道
+            self.message_queue.publish('inspector', 'action_recorded', {
                 'action_record': action_record,
                 'playwright_code': playwright_code,
                 'source': 'inspector'
-            }))
+            }, session_id=self.session.id)
             
             # 通知监听器
             self._notify_listeners("action_recorded", action_record)
@@ -420,6 +390,64 @@ class InspectorTestRecorder:
         except Exception as e:
             logger.error(f"处理Inspector动作失败: {e}")
     
+    def _find_action_index(self, action_id: str) -> Optional[int]:
+        for i, action in enumerate(self.session.actions):
+            if action.id == action_id:
+                return i
+        return None
+    
+    def _update_inspector_action(self, action_id: str, action_data: Dict):
+        """codegen改写了已录制的语句（例如合并连续的fill），更新对应动作，ID不变"""
+        try:
+            index = self._find_action_index(action_id)
+            if index is None:
+                self._process_inspector_action(action_data, action_id=action_id)
+                return
+            
+            # 保留原动作的时间
+            action_data['timestamp'] = self.session.actions[index].timestamp
+            action_record = self._build_action_record(action_data, action_id)
+            self.session.actions[index] = action_record
+            if self.journal:
+                self.journal.update_action(action_record)
+            
+            self.message_queue.publish('inspector', 'action_updated', {
+                'action_record': action_record,
+                'playwright_code': action_data['code_line'],
+                'source': 'inspector'
+            }, session_id=self.session.id)
+            
+            self._notify_listeners("action_updated", action_record)
+            
+            logger.info(f"Inspector动作已更新: {action_data['action_type']} - {action_data['description']}")
+            
+        except Exception as e:
+            logger.error(f"更新Inspector动作失败: {e}")
+    
+    def _delete_inspector_action(self, action_id: str):
+        """codegen删除了已录制的语句，删除对应动作"""
+        try:
+            index = self._find_action_index(action_id)
+            if index is None:
+                return
+            
+            self.session.actions.pop(index)
+            self.action_count -= 1
+            self.stats["total_actions"] -= 1
+            if self.journal:
+                self.journal.delete_action(action_id)
+            
+            self.message_queue.publish('inspector', 'action_deleted', {
+                'action_id': action_id
+            }, session_id=self.session.id)
+            
+            self._notify_listeners("action_deleted", action_id)
+            
+            logger.info(f"Inspector动作已删除: {action_id}")
+            
+        except Exception as e:
+            logger.error(f"删除Inspector动作失败: {e}")
+    
     def stop_recording(self) -> TestSession:
         """停止录制并保存结果"""
         try:
@@ -457,7 +485,10 @@ class InspectorTestRecorder:
                     logger.error(f"停止Inspector进程失败: {e}")
                 finally:
                     self.inspector_process = None
-            
+
+            # 补读一次，处理监控停止后codegen的最后写入
+            self._on_code_file_changed()
+
             # 更新会话状态
             self.session.end_time = datetime.now()
             self.session.status = "completed"
@@ -484,13 +515,13 @@ class InspectorTestRecorder:
         try:
             session_file = settings.RECORDINGS_DIR / f"{self.session.id}_inspector_session.json"
             
-            # 准备会话数据
-            session_data = self.session.dict()
-            session_data['stats'] = self.stats
-            session_data['recording_method'] = 'inspector'
-            
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2, default=str)
+            # 将会话日志压缩为完整的会话文件
+            journal = self.journal or SessionJournal(self.session.id)
+            journal.compact(self.session, session_file, extra={
+                'stats': self.stats,
+                'recording_method': 'inspector'
+            })
+            self.journal = None
             
             logger.info(f"Inspector会话数据已保存: {session_file}")
             
@@ -519,8 +550,8 @@ class InspectorTestRecorder:
         except Exception as e:
             logger.error(f"保存Inspector生成的代码失败: {e}")
     
-    def get_message_queue(self) -> queue.Queue:
-        """获取消息队列"""
+    def get_message_queue(self) -> RecorderEventChannel:
+        """获取消息通道"""
         return self.message_queue
     
     def add_listener(self, listener: Callable):
@@ -559,7 +590,9 @@ class InspectorTestRecorder:
     
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
-        return self.stats.copy()
+        stats = self.stats.copy()
+        stats["code_parser"] = self.code_parser.get_stats()
+        return stats
 
 
 # 全局Inspector录制器实例
@@ -1,13 +1,29 @@
 #!/usr/bin/env python3
 """Playwright元素分析器 - 将DOM元素信息转换为Playwright语义化选择器"""
 
-import re
-from typing import Dict, Optional, List, Tuple
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, List, Tuple
 from loguru import logger
 
+from config.settings import settings
+
+# 类名中的角色提示（按顺序匹配）
+CLASS_ROLE_HINTS = (
+    (('btn', 'button'), 'button'),
+    (('link',), 'link'),
+    (('nav', 'menu'), 'navigation'),
+    (('search',), 'searchbox'),
+    (('input', 'form'), 'textbox'),
+)
+
 
 class PlaywrightElementAnalyzer:
-    """Playwright元素分析器"""
+    """Playwright元素分析器
+
+    分析结果按元素指纹（标签、类型、ID、类名、文本、placeholder、href）缓存在有界LRU中，
+    同一个按钮被反复点击时不再重复生成选择器
+    """
     
     # 角色映射表
     ROLE_MAPPING = {
@@ -50,11 +66,91 @@ class PlaywrightElementAnalyzer:
         'ROWHEADER': 'rowheader'
     }
     
-    def __init__(self):
-        pass
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache_size = settings.ANALYZER_CACHE_SIZE if cache_size is None else cache_size
+        self._cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _fingerprint(element_info: Dict) -> Tuple:
+        """元素指纹：参与分析的字段，指纹相同的元素分析结果相同"""
+        get = element_info.get
+        return (get('tagName', ''), get('type', ''), get('id', ''), get('className', ''),
+                get('text', ''), get('placeholder', ''), get('href', ''))
     
     def analyze_element(self, element_info: Dict) -> Dict:
-        """分析元素并生成Playwright选择器信息"""
+        """分析元素并生成Playwright选择器信息
+
+        返回结果的浅拷贝，selectors等嵌套结构在缓存中共享，调用方不应修改
+        """
+        if self.cache_size <= 0:
+            return self._analyze(element_info)
+        
+        fingerprint = self._fingerprint(element_info)
+        with self._lock:
+            try:
+                cached = self._cache.get(fingerprint)
+            except TypeError:
+                # 字段值不可哈希（例如SVG元素的className），不缓存
+                return self._analyze(element_info)
+            if cached is not None:
+                self._cache.move_to_end(fingerprint)
+                self.hits += 1
+                return dict(cached)
+            self.misses += 1
+        
+        result = self._analyze(element_info)
+        
+        with self._lock:
+            self._cache[fingerprint] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return dict(result)
+    
+    def analyze_many(self, elements: Iterable[Dict]) -> List[Dict]:
+        """批量分析元素（用于整个会话的后处理），批内相同指纹的元素只分析一次"""
+        results = []
+        batch: Dict[Tuple, Dict] = {}
+        for element_info in elements:
+            element_info = element_info or {}
+            fingerprint = self._fingerprint(element_info)
+            try:
+                analyzed = batch.get(fingerprint)
+            except TypeError:
+                results.append(self._analyze(element_info))
+                continue
+            if analyzed is None:
+                analyzed = batch[fingerprint] = self.analyze_element(element_info)
+                results.append(analyzed)
+            else:
+                results.append(dict(analyzed))
+        return results
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions
+            }
+    
+    def _analyze(self, element_info: Dict) -> Dict:
+        """分析元素（不使用缓存）"""
         try:
             tag_name = element_info.get('tagName', '').upper()
             element_type = element_info.get('type', '').lower()
@@ -112,16 +208,10 @@ class PlaywrightElementAnalyzer:
             # 检查类名中的角色提示
             if class_name:
                 class_lower = class_name.lower()
-                if 'btn' in class_lower or 'button' in class_lower:
-                    return 'button'
-                elif 'link' in class_lower:
-                    return 'link'
-                elif 'nav' in class_lower or 'menu' in class_lower:
-                    return 'navigation'
-                elif 'search' in class_lower:
-                    return 'searchbox'
-                elif 'input' in class_lower or 'form' in class_lower:
-                    return 'textbox'
+                for hints, role in CLASS_ROLE_HINTS:
+                    for hint in hints:
+                        if hint in class_lower:
+                            return role
             
             return None
             
@@ -135,9 +225,10 @@ class PlaywrightElementAnalyzer:
         selectors = []
         
         try:
+            clean_text = self._clean_text(text)
+            
             # 1. get_by_role - 最优先
             if role and text:
-                clean_text = self._clean_text(text)
                 if clean_text:
                     selectors.append({
                         'method': 'get_by_role',
@@ -147,8 +238,7 @@ class PlaywrightElementAnalyzer:
                     })
             
             # 2. get_by_text - 对于有文本的元素
-            if text and len(text.strip()) > 0 and len(text.strip()) < 50:
-                clean_text = self._clean_text(text)
+            if text and 0 < len(text.strip()) < 50:
                 if clean_text:
                     selectors.append({
                         'method': 'get_by_text',
@@ -225,8 +315,8 @@ class PlaywrightElementAnalyzer:
         if not text:
             return ""
         
-        # 移除多余的空白字符
-        cleaned = re.sub(r'\s+', ' ', text.strip())
+        # 合并空白字符（str.split与正则\s匹配相同的Unicode空白）
+        cleaned = ' '.join(text.split())
         
         # 限制长度
         if len(cleaned) > 30:
@@ -3,13 +3,13 @@ import json
 import time
 import threading
 import asyncio
-import queue
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Callable, Tuple
 from pathlib import Path
 import uuid
 import tempfile
 import os
+import shutil
 
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 from loguru import logger
@@ -17,7 +17,13 @@ from loguru import logger
 from config.settings import settings
 from core.models import TestSession, ActionRecord
 from core.playwright_analyzer import playwright_analyzer
-from core.code_generator import code_generator
+from core.code_generator import code_generator, IncrementalCodeGenerator
+from core.event_channel import recorder_event_channel, RecorderEventChannel
+from core.recorder_binding import install_recorder_binding
+from core.screenshot_pipeline import ScreenshotPipeline
+from core.session_journal import SessionJournal
+from core.warm_pool import WarmContext, build_context_options
+from utils.io_pool import run_io
 
 
 class RealtimeTestRecorder:
@@ -41,11 +47,26 @@ class RealtimeTestRecorder:
         self.loop = None
         self.recording_thread: Optional[threading.Thread] = None
         
-        # 消息队列用于线程间通信
-        self.message_queue = queue.Queue()
+        # 事件通道用于线程间通信（推送到WebSocket）
+        self.message_queue = recorder_event_channel
         
-        # 临时目录
+        # 会话动作日志（追加写）
+        self.journal: Optional[SessionJournal] = None
+        
+        # 增量代码生成（每个操作生成一次代码，停止时直接写入）
+        self.code_builder: Optional[IncrementalCodeGenerator] = None
+        
+        # 后台截图流水线（截图完成后补填操作的screenshot_path）
+        self.screenshots: Optional[ScreenshotPipeline] = None
+        
+        # 首个页面事件耗时统计（从请求开始录制算起）
+        self.start_requested_at: Optional[float] = None
+        self.first_event_at: Optional[float] = None
+        self.on_first_event: Optional[Callable[[float], None]] = None
+        
+        # 临时目录（trace和视频先写入这里，会话结束时移动到录制目录）
         self.temp_dir = Path(tempfile.mkdtemp(prefix="realtime_recorder_"))
+        self.video_path: Optional[Path] = None
         
     def initialize(self):
         """初始化录制器"""
@@ -70,17 +91,7 @@ class RealtimeTestRecorder:
             logger.info(f"准备开始录制: {test_name}")
             
             # 创建新的测试会话
-            session_id = str(uuid.uuid4())
-            self.session = TestSession(
-                id=session_id,
-                name=test_name,
-                description=description,
-                start_time=datetime.now(),
-                actions=[]
-            )
-            
-            self.is_recording = True
-            self.action_count = 0
+            session_id = self._create_session(test_name, description)
             
             # 启动录制线程
             self.recording_thread = threading.Thread(
@@ -97,6 +108,78 @@ class RealtimeTestRecorder:
             logger.error(f"开始录制失败: {e}")
             raise Exception(f"开始录制失败: {str(e)}")
     
+    def _create_session(self, test_name: str, description: str) -> str:
+        """创建测试会话和会话动作日志"""
+        session_id = str(uuid.uuid4())
+        self.session = TestSession(
+            id=session_id,
+            name=test_name,
+            description=description,
+            start_time=datetime.now(),
+            actions=[]
+        )
+        
+        # 创建会话动作日志
+        self.journal = SessionJournal(session_id)
+        self.journal.open(self.session)
+        self.code_builder = IncrementalCodeGenerator(test_name)
+        
+        self.is_recording = True
+        self.action_count = 0
+        return session_id
+    
+    async def start_in_browser(self, browser: Browser, test_name: str, description: str = "",
+                               warm: Optional[WarmContext] = None) -> str:
+        """在共享浏览器中以独立上下文开始录制（由录制管理器在其事件循环中调用）
+
+        提供预热上下文时直接使用，不再创建上下文和页面
+        """
+        if self.is_recording:
+            raise ValueError("录制已在进行中")
+        
+        self.browser = browser
+        self.loop = asyncio.get_running_loop()
+        session_id = self._create_session(test_name, description)
+        
+        try:
+            await self._open_recording_context(warm)
+        except Exception:
+            self.is_recording = False
+            await self._close_recording_context()
+            if self.journal:
+                self.journal.close()
+                self.journal = None
+            await run_io(self._remove_temp_dir)
+            raise
+        
+        logger.info(f"开始录制测试用例: {test_name} (ID: {session_id}，共享浏览器)")
+        return session_id
+    
+    async def stop_in_browser(self) -> TestSession:
+        """停止共享浏览器中的录制，只关闭本会话的上下文"""
+        self.detach()
+        return await self.finish_in_browser()
+    
+    def detach(self):
+        """停止接收页面事件（可在任意线程调用，收尾工作由 finish_in_browser 完成）"""
+        if not self.is_recording or not self.session:
+            raise ValueError("当前没有正在进行的录制")
+        
+        self.is_recording = False
+        self.session.end_time = datetime.now()
+    
+    async def finish_in_browser(self) -> TestSession:
+        """关闭本会话的上下文，在I/O线程池中保存trace、视频、会话和代码，最后删除临时目录"""
+        try:
+            await self._close_recording_context()
+            # 共享浏览器由录制管理器关闭
+            self.browser = None
+            
+            await run_io(self._finish_session)
+        finally:
+            await run_io(self._remove_temp_dir)
+        return self.session
+    
     def _run_recording_loop(self):
         """在独立线程中运行异步录制循环"""
         try:
@@ -131,37 +214,8 @@ class RealtimeTestRecorder:
                 args=['--start-maximized']
             )
             
-            # 创建上下文
-            self.context = await self.browser.new_context(
-                viewport=None,  # 使用全屏
-                record_video_dir=str(self.temp_dir / "videos"),
-                record_video_size={"width": 1280, "height": 720}
-            )
-            
-            # 开始trace
-            await self.context.tracing.start(
-                screenshots=True,
-                snapshots=True,
-                sources=True
-            )
-            
-            # 创建页面
-            self.page = await self.context.new_page()
-            
-            # 设置基础事件监听器
-            await self._setup_basic_event_listeners()
-            
-            # 导航到起始页面
-            await self.page.goto("about:blank")
-            
-            # 记录初始导航
-            await self._record_action(
-                action_type="goto",
-                url="about:blank",
-                title="浏览器已启动",
-                description="录制开始，浏览器已准备就绪",
-                element_info={"type": "navigation", "url": "about:blank"}
-            )
+            # 创建录制上下文和页面
+            await self._open_recording_context()
             
             logger.info("浏览器已启动，基础录制功能已激活，等待用户操作...")
             
@@ -173,6 +227,83 @@ class RealtimeTestRecorder:
             logger.error(f"异步录制失败: {e}")
             raise
     
+    async def _open_recording_context(self, warm: Optional[WarmContext] = None):
+        """在当前浏览器中创建录制上下文、开始trace并打开页面（或使用预热上下文）"""
+        if warm:
+            # 预热上下文已暴露绑定并打开空白页，只需接管事件（预热上下文不录制视频，见core/warm_pool.py）
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = warm.temp_dir
+            self.context = warm.context
+            self.page = warm.page
+            warm.attach(self._on_binding_event)
+        else:
+            # 创建上下文
+            self.context = await self.browser.new_context(**build_context_options(self.temp_dir))
+            
+            # 暴露录制器绑定（页面事件通过绑定批量上报）
+            await install_recorder_binding(self.context, self._on_binding_event)
+        
+        # 开始trace
+        await self.context.tracing.start(
+            screenshots=True,
+            snapshots=True,
+            sources=True
+        )
+        
+        if not warm:
+            # 创建页面并导航到起始页面
+            self.page = await self.context.new_page()
+            await self._setup_basic_event_listeners()
+            await self.page.goto("about:blank")
+        else:
+            await self._setup_basic_event_listeners()
+        
+        self.screenshots = ScreenshotPipeline(self.page, self.session.id, self._on_screenshot_captured)
+        
+        # 记录初始导航
+        await self._record_action(
+            action_type="goto",
+            url="about:blank",
+            title="浏览器已启动",
+            description="录制开始，浏览器已准备就绪",
+            element_info={"type": "navigation", "url": "about:blank"}
+        )
+    
+    async def _close_recording_context(self):
+        """停止trace并关闭录制上下文"""
+        if self.screenshots:
+            # 页面关闭前为等待中的操作截最后一张图
+            await self.screenshots.close()
+            self.screenshots = None
+        
+        if not self.context:
+            return
+        
+        # 视频在上下文关闭后才写完，先保留页面的视频对象
+        video = self.page.video if self.page else None
+        
+        try:
+            # 停止trace
+            trace_path = self.temp_dir / "trace.zip"
+            await self.context.tracing.stop(path=str(trace_path))
+        except Exception as e:
+            logger.error(f"停止trace失败: {e}")
+        
+        try:
+            # 关闭上下文
+            await self.context.close()
+        except Exception as e:
+            logger.error(f"关闭上下文失败: {e}")
+        finally:
+            self.context = None
+            self.page = None
+        
+        if video:
+            try:
+                self.video_path = Path(await video.path())
+            except Exception as e:
+                logger.error(f"获取视频文件失败: {e}")
+    
     async def _setup_basic_event_listeners(self):
         """设置基础事件监听器"""
         try:
@@ -182,9 +313,6 @@ class RealtimeTestRecorder:
             # 监听页面加载
             self.page.on("load", self._on_page_load)
             
-            # 监听控制台消息
-            self.page.on("console", self._on_console)
-            
             # 注入基础事件监听脚本
             await self._inject_basic_event_script()
             
@@ -494,7 +622,9 @@ class RealtimeTestRecorder:
                         timestamp: Date.now()
                     };
                     
-                    console.log('RECORDER_EVENT:' + eventType + ':' + JSON.stringify(eventPayload));
+                    if (window.__recorderChannel) {
+                        window.__recorderChannel.emit(eventType, eventPayload);
+                    }
                     
                 } catch (error) {
                     console.error('RECORDER_DEBUG: 事件记录失败:', error);
@@ -735,38 +865,22 @@ class RealtimeTestRecorder:
         except Exception as e:
             logger.error(f"处理页面加载事件失败: {e}")
     
-    def _on_console(self, msg):
-        """处理控制台消息"""
-        try:
-            text = msg.text
-            
-            # 处理录制器事件
-            if text.startswith('RECORDER_EVENT:'):
-                try:
-                    parts = text.split(':', 2)
-                    if len(parts) >= 3:
-                        event_type = parts[1]
-                        event_data_str = parts[2]
-                        event_data = json.loads(event_data_str)
-                        
-                        # 异步处理事件
-                        if self.loop:
-                            asyncio.run_coroutine_threadsafe(
-                                self._record_browser_action(event_type, event_data),
-                                self.loop
-                            )
-                        
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析事件数据失败: {e}")
-                except Exception as e:
-                    logger.error(f"处理录制器事件失败: {e}")
-            
-            # 处理调试信息
-            elif text.startswith('RECORDER_DEBUG:'):
-                logger.debug(f"录制器调试: {text}")
-                
-        except Exception as e:
-            logger.error(f"处理控制台消息失败: {e}")
+    async def _on_binding_event(self, source: Dict, event_type: str, event_data: Dict):
+        """处理页面通过录制器绑定上报的事件"""
+        if not self.is_recording:
+            return
+        if self.first_event_at is None:
+            self._mark_first_event()
+        await self._record_browser_action(event_type, event_data)
+    
+    def _mark_first_event(self):
+        """记录首个页面事件到达的时间"""
+        self.first_event_at = time.time()
+        if self.start_requested_at is not None and self.on_first_event:
+            try:
+                self.on_first_event((self.first_event_at - self.start_requested_at) * 1000)
+            except Exception as e:
+                logger.error(f"首个事件回调失败: {e}")
     
     async def _record_browser_action(self, event_type: str, event_data: Dict):
         """记录浏览器操作事件"""
@@ -853,12 +967,21 @@ class RealtimeTestRecorder:
                 description=description,
                 element_info=element_info,
                 additional_data=event_data,
-                analyzed_element=analyzed_element
+                analyzed_element=analyzed_element,
+                source_ts=self._get_event_source_ts(event_data)
             )
             
         except Exception as e:
             logger.error(f"记录浏览器操作失败: {e}")
     
+    def _get_event_source_ts(self, event_data: Dict) -> Optional[float]:
+        """获取页面中事件发生的时间（秒），页面脚本中使用Date.now()毫秒时间戳"""
+        try:
+            timestamp = event_data.get('timestamp')
+            return float(timestamp) / 1000 if timestamp else None
+        except (TypeError, ValueError):
+            return None
+    
     def _split_element_description(self, element_desc: str) -> Tuple[str, str]:
         """分离元素描述中的主要描述和技术细节"""
         try:
@@ -1058,21 +1181,13 @@ class RealtimeTestRecorder:
     
     async def _record_action(self, action_type: str, url: str = "", title: str = "", 
                            description: str = "", element_info: Dict = None, 
-                           additional_data: Dict = None, analyzed_element: Dict = None):
+                           additional_data: Dict = None, analyzed_element: Dict = None,
+                           source_ts: Optional[float] = None):
         """记录操作"""
         try:
             if not self.session:
                 return
             
-            # 截图
-            screenshot_path = ""
-            # try:
-            #     screenshot_filename = f"screenshot_{len(self.session.actions) + 1}_{int(time.time())}.png"
-            #     screenshot_path = str(settings.SCREENSHOTS_DIR / screenshot_filename)
-            #     await self.page.screenshot(path=screenshot_path, full_page=True)
-            # except Exception as e:
-            #     logger.warning(f"截图失败: {e}")
-            
             # 创建操作记录
             action_record = ActionRecord(
                 id=str(uuid.uuid4()),
@@ -1083,29 +1198,60 @@ class RealtimeTestRecorder:
                 page_title=title,
                 element_info=element_info or {},
                 description=description,
-                screenshot_path=screenshot_path,
                 additional_data=json.dumps(additional_data or {})
             )
             
             self.session.actions.append(action_record)
             self.action_count += 1
             
-            # 生成Playwright代码
-            playwright_code = code_generator.generate_action_code(action_record)
+            # 追加到会话日志
+            if self.journal:
+                self.journal.append_action(action_record)
+            
+            # 登记截图（后台截图，完成后补填screenshot_path）
+            if self.screenshots and self.page:
+                self.screenshots.request(action_record.id, self.page.url)
             
-            # 添加到消息队列
-            self.message_queue.put(('action_recorded', {
+            # 追加到完整脚本，只推送新增的代码行（前端按code_line_count检测缺口并补齐）
+            code_delta = self.code_builder.add_action(action_record, analyzed_element) if self.code_builder else []
+            
+            # 推送到事件通道
+            self.message_queue.publish('realtime', 'action_recorded', {
                 'action_record': action_record,
-                'playwright_code': playwright_code,
-                'analyzed_element': analyzed_element
-            }))
+                'analyzed_element': analyzed_element,
+                'code_delta': code_delta,
+                'code_line_count': len(self.code_builder.code_lines) if self.code_builder else 0
+            }, source_ts=source_ts, session_id=self.session.id)
             
             logger.info(f"记录操作: {action_type} - {title}")
-            logger.info(f"Playwright代码: {playwright_code}")
+            if code_delta:
+                logger.debug(f"新增Playwright代码: {code_delta}")
             
         except Exception as e:
             logger.error(f"记录操作失败: {e}")
     
+    def _on_screenshot_captured(self, action_ids: List[str], screenshot_path: str):
+        """截图写入后补填操作的截图路径，每张截图推送一条 {action_ids, screenshot_path} 消息"""
+        if not self.session:
+            return
+        
+        remaining = set(action_ids)
+        for action in reversed(self.session.actions):
+            if not remaining:
+                break
+            if action.id not in remaining:
+                continue
+            remaining.discard(action.id)
+            action.screenshot_path = screenshot_path
+            
+            if self.journal:
+                self.journal.update_action(action)
+        
+        self.message_queue.publish('realtime', 'action_screenshot', {
+            'action_ids': action_ids,
+            'screenshot_path': screenshot_path
+        }, session_id=self.session.id)
+    
     def stop_recording(self) -> TestSession:
         """停止录制并保存结果"""
         try:
@@ -1137,20 +1283,7 @@ class RealtimeTestRecorder:
                         self.loop.call_soon_threadsafe(self.loop.stop)
                         time.sleep(1)
             
-            # 更新会话状态
-            self.session.end_time = datetime.now()
-            self.session.status = "completed"
-            
-            # 保存会话数据
-            self._save_session()
-            
-            # 生成完整的Playwright代码
-            self._generate_full_playwright_code()
-            
-            # 通知监听器
-            self._notify_listeners("recording_stopped", self.session)
-            
-            logger.info(f"录制完成: {self.session.name} (总操作数: {len(self.session.actions)})")
+            self._finish_session()
             
             return self.session
             
@@ -1158,24 +1291,39 @@ class RealtimeTestRecorder:
             logger.error(f"停止录制失败: {e}")
             raise Exception(f"停止录制失败: {str(e)}")
     
+    def _finish_session(self):
+        """更新会话状态、保存会话和代码并通知监听器"""
+        self.session.end_time = self.session.end_time or datetime.now()
+        self.session.status = "completed"
+        
+        # 将trace和视频移动到录制目录（需在保存会话之前，会话中记录文件路径）
+        self._save_artifacts()
+        
+        # 保存会话数据
+        self._save_session()
+        
+        # 生成完整的Playwright代码
+        self._generate_full_playwright_code()
+        
+        # 通知监听器
+        self._notify_listeners("recording_stopped", self.session)
+        
+        logger.info(f"录制完成: {self.session.name} (总操作数: {len(self.session.actions)})")
+    
     def _generate_full_playwright_code(self):
-        """生成完整的Playwright代码文件"""
+        """写入完整的Playwright代码文件（代码已在录制过程中增量生成）"""
         try:
             if not self.session or not self.session.actions:
                 return
             
-            # 生成完整代码
-            full_code = code_generator.generate_test_code(
-                self.session.actions, 
-                self.session.name
-            )
-            
-            # 保存代码文件
-            code_filename = f"{self.session.id}_playwright_code.py"
-            code_path = settings.RECORDINGS_DIR / code_filename
+            code_path = settings.RECORDINGS_DIR / f"{self.session.id}_playwright_code.py"
             
-            with open(code_path, 'w', encoding='utf-8') as f:
-                f.write(full_code)
+            if self.code_builder:
+                self.code_builder.flush(code_path)
+            else:
+                full_code = code_generator.generate_test_code(self.session.actions, self.session.name)
+                with open(code_path, 'w', encoding='utf-8') as f:
+                    f.write(full_code)
             
             logger.info(f"Playwright代码已保存: {code_path}")
             
@@ -1185,21 +1333,7 @@ class RealtimeTestRecorder:
     async def _cleanup_async_resources(self):
         """清理异步资源"""
         try:
-            if self.context:
-                try:
-                    # 停止trace
-                    trace_path = self.temp_dir / "trace.zip"
-                    await self.context.tracing.stop(path=str(trace_path))
-                except Exception as e:
-                    logger.error(f"停止trace失败: {e}")
-                
-                try:
-                    # 关闭上下文
-                    await self.context.close()
-                except Exception as e:
-                    logger.error(f"关闭上下文失败: {e}")
-                finally:
-                    self.context = None
+            await self._close_recording_context()
             
             if self.browser:
                 try:
@@ -1223,22 +1357,44 @@ class RealtimeTestRecorder:
             logger.error(f"清理异步资源失败: {e}")
             raise
     
+    def _save_artifacts(self):
+        """将trace和视频从临时目录移动到录制目录，并记录到会话中"""
+        artifacts = [
+            ("trace_file", self.temp_dir / "trace.zip", f"{self.session.id}_trace.zip"),
+            ("video_file", self.video_path, f"{self.session.id}_video.webm")
+        ]
+        for field, source, name in artifacts:
+            if not source or not source.exists():
+                continue
+            try:
+                target = settings.RECORDINGS_DIR / name
+                shutil.move(str(source), str(target))
+                setattr(self.session, field, str(target))
+                logger.info(f"录制文件已保存: {target}")
+            except Exception as e:
+                logger.error(f"保存录制文件失败: {source}, 错误: {e}")
+    
+    def _remove_temp_dir(self):
+        """删除本会话的临时目录"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
     def _save_session(self):
         """保存会话数据到文件"""
         try:
             session_file = settings.RECORDINGS_DIR / f"{self.session.id}_session.json"
-            session_data = self.session.dict()
             
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2, default=str)
+            # 将会话日志压缩为完整的会话文件
+            journal = self.journal or SessionJournal(self.session.id)
+            journal.compact(self.session, session_file)
+            self.journal = None
             
             logger.info(f"会话数据已保存: {session_file}")
             
         except Exception as e:
             logger.error(f"保存会话数据失败: {e}")
     
-    def get_message_queue(self) -> queue.Queue:
-        """获取消息队列"""
+    def get_message_queue(self) -> RecorderEventChannel:
+        """获取消息通道"""
         return self.message_queue
     
     def add_listener(self, listener: Callable):
@@ -1266,9 +1422,7 @@ class RealtimeTestRecorder:
                 self.stop_recording()
             
             # 清理临时文件
-            import shutil
-            if self.temp_dir.exists():
-                shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self._remove_temp_dir()
             
             logger.info("实时录制器资源清理完成")
             
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+录制器页面绑定通道
+通过 context.expose_binding 在页面中暴露专用的事件上报函数，
+页面脚本将事件放入队列，每个动画帧批量上报一次，
+不再依赖 console.log 字符串解析，也不受页面自身控制台输出量的影响
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List
+
+from loguru import logger
+from playwright.async_api import BrowserContext
+
+# 页面中暴露的绑定函数名称
+RECORDER_BINDING_NAME = "__recorderEmit"
+
+# 页面端事件通道脚本（可重复注入）
+RECORDER_CHANNEL_SCRIPT = """
+(function() {
+    if (window.__recorderChannel) {
+        return 'already_injected';
+    }
+
+    const bindingName = '%s';
+    const queue = [];
+    let scheduled = false;
+
+    // 将队列中的事件一次性上报
+    function flush() {
+        scheduled = false;
+        if (!queue.length) {
+            return;
+        }
+
+        const binding = window[bindingName];
+        if (typeof binding !== 'function') {
+            // 绑定尚未就绪，稍后重试
+            scheduled = true;
+            setTimeout(flush, 50);
+            return;
+        }
+
+        const batch = queue.splice(0, queue.length);
+        try {
+            const result = binding(batch);
+            if (result && typeof result.catch === 'function') {
+                result.catch(() => {});
+            }
+        } catch (error) {
+            console.error('RECORDER_DEBUG: 事件上报失败:', error);
+        }
+    }
+
+    // 每个动画帧最多上报一次；后台页面不触发requestAnimationFrame，使用setTimeout兜底
+    function schedule() {
+        if (scheduled) {
+            return;
+        }
+        scheduled = true;
+        if (typeof requestAnimationFrame === 'function' && document.visibilityState === 'visible') {
+            requestAnimationFrame(flush);
+        } else {
+            setTimeout(flush, 16);
+        }
+    }
+
+    window.__recorderChannel = {
+        emit: function(eventType, payload) {
+            queue.push(Object.assign({ eventType: eventType }, payload));
+            schedule();
+        },
+        flush: flush
+    };
+
+    // 页面卸载前立即上报，避免导航导致事件丢失
+    window.addEventListener('pagehide', flush, true);
+    window.addEventListener('beforeunload', flush, true);
+    document.addEventListener('visibilitychange', flush, true);
+
+    return 'channel_injected';
+})();
+""" % RECORDER_BINDING_NAME
+
+
+EventHandler = Callable[[Dict[str, Any], str, Dict[str, Any]], Awaitable[None]]
+
+
+async def install_recorder_binding(context: BrowserContext, on_event: EventHandler):
+    """在浏览器上下文中暴露录制器绑定并注入页面端事件通道
+
+    on_event(source, event_type, event) 对批次中的每个事件调用一次，
+    source 为 Playwright 提供的调用来源（包含 page、frame）
+    """
+
+    async def handle_batch(source: Dict[str, Any], batch: List[Dict[str, Any]]):
+        if not isinstance(batch, list):
+            batch = [batch]
+        for event in batch:
+            try:
+                if not isinstance(event, dict):
+                    continue
+                await on_event(source, event.get('eventType', ''), event)
+            except Exception as e:
+                logger.error(f"处理录制器绑定事件失败: {e}")
+
+    await context.expose_binding(RECORDER_BINDING_NAME, handle_batch)
+    
+    # 新页面通过初始化脚本获得事件通道，已打开的页面直接注入
+    await context.add_init_script(RECORDER_CHANNEL_SCRIPT)
+    for page in context.pages:
+        try:
+            await page.evaluate(RECORDER_CHANNEL_SCRIPT)
+        except Exception as e:
+            logger.debug(f"向已打开页面注入事件通道失败: {e}")
+    
+    logger.debug(f"录制器绑定已暴露: {RECORDER_BINDING_NAME}")
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+多会话录制管理器
+所有实时录制会话共享一个Playwright驱动和一个浏览器进程，
+每个会话是浏览器中的一个独立上下文（BrowserContext），按会话ID管理，
+开始新会话前根据会话数、可用内存和CPU负载进行准入控制
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, List, Optional
+
+from loguru import logger
+from playwright.async_api import async_playwright, Browser
+
+from config.settings import settings
+from core.models import TestSession
+from core.event_channel import LatencyTracker
+from core.realtime_recorder import RealtimeTestRecorder
+from core.warm_pool import WarmContextPool
+
+try:
+    import psutil
+except ImportError:  # psutil为可选依赖
+    psutil = None
+
+
+class AdmissionError(Exception):
+    """录制会话准入被拒绝"""
+
+    def __init__(self, reason: str, status_code: int = 503):
+        super().__init__(reason)
+        self.reason = reason
+        # 429：会话数已达上限；503：系统资源不足
+        self.status_code = status_code
+
+
+class ResourceProbe:
+    """系统资源探测（优先使用psutil，不可用时读取/proc/meminfo和系统负载）"""
+
+    @staticmethod
+    def get_available_memory_mb() -> Optional[float]:
+        """可用内存(MB)，无法获取时返回None"""
+        try:
+            if psutil is not None:
+                return psutil.virtual_memory().available / (1024 * 1024)
+            with open("/proc/meminfo", "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) / 1024
+        except Exception as e:
+            logger.debug(f"获取可用内存失败: {e}")
+        return None
+
+    @staticmethod
+    def get_cpu_load() -> Optional[float]:
+        """CPU负载（1分钟平均负载/CPU核数），无法获取时返回None"""
+        try:
+            cpu_count = os.cpu_count() or 1
+            if hasattr(os, "getloadavg"):
+                return os.getloadavg()[0] / cpu_count
+            if psutil is not None:
+                return psutil.cpu_percent(interval=None) / 100
+        except Exception as e:
+            logger.debug(f"获取CPU负载失败: {e}")
+        return None
+
+
+class RecordingManager:
+    """多会话录制管理器
+
+    管理器拥有一个后台线程和事件循环，共享的Playwright和浏览器在首次开始录制时启动，
+    各会话的录制器都运行在该事件循环中；API层通过 start_session/stop_session 异步调用。
+    """
+
+    def __init__(self):
+        self.max_sessions = settings.MAX_CONCURRENT_SESSIONS
+        self.min_free_memory_mb = settings.MIN_FREE_MEMORY_MB
+        self.session_memory_mb = settings.SESSION_MEMORY_ESTIMATE_MB
+        self.max_cpu_load = settings.MAX_CPU_LOAD
+
+        # 会话ID -> 录制器
+        self.sessions: Dict[str, RealtimeTestRecorder] = {}
+        # 已通过准入、正在启动的会话数
+        self._starting = 0
+        # 已停止录制、正在关闭上下文的会话数（仍占用浏览器资源）
+        self._finalizing = 0
+
+        # 共享的Playwright驱动和浏览器
+        self.playwright = None
+        self.browser: Optional[Browser] = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+
+        # 预热上下文池
+        self.warm_pool = WarmContextPool(
+            size=settings.WARM_POOL_SIZE,
+            idle_timeout=settings.WARM_POOL_IDLE_TIMEOUT,
+            health_interval=settings.WARM_POOL_HEALTH_INTERVAL
+        )
+
+        # 管理器事件循环
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+        # 统计信息
+        self.started_count = 0
+        self.stopped_count = 0
+        self.rejected_count = 0
+        self.browser_launches = 0
+        # 开始录制接口耗时、从请求开始录制到首个页面事件的耗时
+        self.start_latency = LatencyTracker()
+        self.time_to_first_event = LatencyTracker()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动管理器事件循环线程（只启动一次）"""
+        with self._thread_lock:
+            if self.loop is None or self.loop.is_closed():
+                ready = threading.Event()
+
+                def run_loop():
+                    if os.name == 'nt':
+                        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+                    self.loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(self.loop)
+                    self._browser_lock = asyncio.Lock()
+                    ready.set()
+                    try:
+                        self.loop.run_forever()
+                    finally:
+                        self.loop.close()
+
+                self._thread = threading.Thread(target=run_loop, name="recording-manager", daemon=True)
+                self._thread.start()
+                ready.wait()
+                logger.info("录制管理器事件循环已启动")
+            return self.loop
+
+    def _submit(self, coro: Coroutine) -> Future:
+        """在管理器事件循环中执行协程"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def _run(self, coro: Coroutine) -> Any:
+        """从调用方事件循环等待管理器事件循环中的协程"""
+        return await asyncio.wrap_future(self._submit(coro))
+
+    @property
+    def active_count(self) -> int:
+        return len(self.sessions)
+
+    @property
+    def is_recording(self) -> bool:
+        return bool(self.sessions)
+
+    def get_recorder(self, session_id: str) -> Optional[RealtimeTestRecorder]:
+        """获取指定会话的录制器"""
+        return self.sessions.get(session_id)
+
+    def get_latest_recorder(self) -> Optional[RealtimeTestRecorder]:
+        """获取最近开始的录制器（兼容只关注单个会话的接口）"""
+        recorders = list(self.sessions.values())
+        return recorders[-1] if recorders else None
+
+    def get_screenshot_stats(self) -> Dict[str, Any]:
+        """正在录制的会话的截图流水线统计（按会话ID）"""
+        return {
+            session_id: recorder.screenshots.get_stats()
+            for session_id, recorder in list(self.sessions.items())
+            if recorder.screenshots is not None
+        }
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """列出正在录制的会话"""
+        return [
+            {
+                "id": session_id,
+                "name": recorder.session.name if recorder.session else "",
+                "start_time": recorder.session.start_time.isoformat() if recorder.session else None,
+                "action_count": recorder.action_count
+            }
+            for session_id, recorder in list(self.sessions.items())
+        ]
+
+    def check_admission(self):
+        """准入检查：会话数、可用内存、CPU负载，不满足时抛出AdmissionError"""
+        if self.active_count + self._starting + self._finalizing >= self.max_sessions:
+            raise AdmissionError(f"同时录制的会话数已达上限（{self.max_sessions}）", status_code=429)
+
+        available_mb = ResourceProbe.get_available_memory_mb()
+        required_mb = self.min_free_memory_mb + self.session_memory_mb
+        if available_mb is not None and available_mb < required_mb:
+            raise AdmissionError(f"可用内存不足: {available_mb:.0f}MB，需要至少 {required_mb}MB")
+
+        cpu_load = ResourceProbe.get_cpu_load()
+        if cpu_load is not None and cpu_load > self.max_cpu_load:
+            raise AdmissionError(f"CPU负载过高: {cpu_load:.2f}，上限为 {self.max_cpu_load}")
+
+    async def start_session(self, test_name: str, description: str = "") -> str:
+        """开始一个新的录制会话，返回会话ID"""
+        try:
+            self.check_admission()
+        except AdmissionError as e:
+            self.rejected_count += 1
+            logger.warning(f"拒绝开始录制会话: {e.reason}")
+            raise
+
+        requested_at = time.time()
+        self._starting += 1
+        try:
+            session_id = await self._run(self._start_session(test_name, description, requested_at))
+        finally:
+            self._starting -= 1
+
+        self.start_latency.record((time.time() - requested_at) * 1000)
+        self.started_count += 1
+        logger.info(f"录制会话已开始: {session_id}，当前会话数: {self.active_count}")
+        return session_id
+
+    async def _start_session(self, test_name: str, description: str, requested_at: float) -> str:
+        browser = await self._ensure_browser()
+
+        # 优先使用预热上下文，没有可用上下文时冷启动
+        warm = await self.warm_pool.acquire(browser)
+
+        recorder = RealtimeTestRecorder()
+        recorder.initialize()
+        recorder.start_requested_at = requested_at
+        recorder.on_first_event = self.time_to_first_event.record
+        try:
+            session_id = await recorder.start_in_browser(browser, test_name, description, warm=warm)
+        except Exception:
+            if warm:
+                await warm.close()
+            raise
+        self.sessions[session_id] = recorder
+        return session_id
+
+    def warm_up(self):
+        """在后台启动共享浏览器并填充预热上下文池（不等待完成）"""
+        if self.warm_pool.size <= 0:
+            return
+
+        def on_done(future: Future):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"预热录制浏览器失败: {e}")
+
+        self._submit(self._warm_up()).add_done_callback(on_done)
+
+    async def _warm_up(self):
+        # 浏览器启动时会开始填充预热上下文池
+        await self._ensure_browser()
+
+    async def _ensure_browser(self) -> Browser:
+        """启动共享浏览器（已启动且连接正常时直接复用）"""
+        async with self._browser_lock:
+            if self.browser and self.browser.is_connected():
+                return self.browser
+
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+
+            self.browser = await self.playwright.chromium.launch(
+                headless=settings.HEADLESS,
+                args=['--start-maximized']
+            )
+            self.browser_launches += 1
+            logger.info("共享浏览器已启动")
+
+            # 浏览器重新启动后，旧的预热上下文失效，重新填充
+            self.warm_pool.start(self.browser)
+            return self.browser
+
+    async def stop_session(self, session_id: str) -> TestSession:
+        """停止指定的录制会话"""
+        if session_id not in self.sessions:
+            raise KeyError(f"录制会话不存在: {session_id}")
+
+        session = await self._run(self._stop_session(session_id))
+        self.stopped_count += 1
+        logger.info(f"录制会话已停止: {session_id}，当前会话数: {self.active_count}")
+        return session
+
+    async def _stop_session(self, session_id: str) -> TestSession:
+        recorder = self.sessions.pop(session_id)
+        return await recorder.stop_in_browser()
+
+    def detach_session(self, session_id: str) -> RealtimeTestRecorder:
+        """停止会话的录制并从活动会话中移除，立即返回录制器；收尾工作由 finalize_session 完成"""
+        recorder = self.sessions.get(session_id)
+        if recorder is None:
+            raise KeyError(f"录制会话不存在: {session_id}")
+
+        recorder.detach()
+        del self.sessions[session_id]
+        self._finalizing += 1
+        self.stopped_count += 1
+        logger.info(f"录制会话已停止录制: {session_id}，当前会话数: {self.active_count}")
+        return recorder
+
+    async def finalize_session(self, recorder: RealtimeTestRecorder) -> TestSession:
+        """关闭已停止会话的上下文（保存trace和视频），保存会话和代码"""
+        try:
+            return await self._run(recorder.finish_in_browser())
+        finally:
+            self._finalizing -= 1
+
+    async def stop_all(self) -> List[TestSession]:
+        """停止所有录制会话"""
+        sessions = []
+        for session_id in list(self.sessions.keys()):
+            try:
+                sessions.append(await self.stop_session(session_id))
+            except Exception as e:
+                logger.error(f"停止录制会话失败: {session_id}, 错误: {e}")
+        return sessions
+
+    async def _close_browser(self):
+        await self.warm_pool.close()
+
+        # 等待正在进行的浏览器启动（例如后台预热）完成后再关闭
+        async with self._browser_lock:
+            if self.browser:
+                try:
+                    await self.browser.close()
+                except Exception as e:
+                    logger.error(f"关闭共享浏览器失败: {e}")
+                finally:
+                    self.browser = None
+
+            if self.playwright:
+                try:
+                    await self.playwright.stop()
+                except Exception as e:
+                    logger.error(f"停止Playwright失败: {e}")
+                finally:
+                    self.playwright = None
+
+    async def shutdown(self):
+        """停止所有会话并关闭共享浏览器和事件循环"""
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        await self.stop_all()
+        try:
+            await self._run(self._close_browser())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if self._thread:
+                self._thread.join(timeout=5)
+        logger.info("录制管理器已关闭")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取录制管理器统计信息"""
+        available_mb = ResourceProbe.get_available_memory_mb()
+        cpu_load = ResourceProbe.get_cpu_load()
+        return {
+            "active_sessions": self.active_count,
+            "starting_sessions": self._starting,
+            "finalizing_sessions": self._finalizing,
+            "max_sessions": self.max_sessions,
+            "browser_running": bool(self.browser and self.browser.is_connected()),
+            "browser_launches": self.browser_launches,
+            "started": self.started_count,
+            "stopped": self.stopped_count,
+            "rejected": self.rejected_count,
+            "available_memory_mb": round(available_mb, 1) if available_mb is not None else None,
+            "cpu_load": round(cpu_load, 3) if cpu_load is not None else None,
+            "start_latency": self.start_latency.get_stats(),
+            "time_to_first_event": self.time_to_first_event.get_stats(),
+            "warm_pool": self.warm_pool.get_stats(),
+            "sessions": self.list_sessions()
+        }
+
+
+# 全局录制管理器实例
+recording_manager = RecordingManager()
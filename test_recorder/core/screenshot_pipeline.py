@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+后台截图流水线
+录制操作时只登记需要截图的动作，后台任务在页面安静一段时间后截取一张视口JPEG截图，
+同一批连续操作共用这张截图；截图文件在I/O线程池中写入，写入完成后回调录制器补填 screenshot_path。
+每秒截图次数和每个会话的截图总字节数有上限，超出时跳过截图，不影响录制延迟
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+from playwright.async_api import Page
+
+from config.settings import settings
+from utils.io_pool import run_io
+
+
+class ScreenshotPipeline:
+    """单个录制会话的截图流水线（在录制器的事件循环中使用）"""
+
+    def __init__(self, page: Page, session_id: str, on_captured: Callable[[List[str], str], None],
+                 enabled: Optional[bool] = None, quality: Optional[int] = None):
+        self.page = page
+        self.session_id = session_id
+        self.on_captured = on_captured
+        self.enabled = settings.ENABLE_SCREENSHOTS if enabled is None else enabled
+        self.quality = settings.SCREENSHOT_QUALITY if quality is None else quality
+
+        self.coalesce_delay = settings.SCREENSHOT_COALESCE_MS / 1000
+        self.max_coalesce_delay = max(settings.SCREENSHOT_MAX_COALESCE_MS / 1000, self.coalesce_delay)
+        self.min_interval = 1 / settings.SCREENSHOT_MAX_PER_SECOND if settings.SCREENSHOT_MAX_PER_SECOND > 0 else 0.0
+        self.max_session_bytes = settings.SCREENSHOT_MAX_SESSION_BYTES
+
+        # 等待截图的动作ID
+        self._pending: List[str] = []
+        self._first_pending_at = 0.0
+        self._last_request_at = 0.0
+        self._last_capture_at: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # 统计信息
+        self.requested = 0
+        self.captures = 0
+        self.bytes_written = 0
+        self.skipped = 0
+        self.failures = 0
+
+    @property
+    def budget_exhausted(self) -> bool:
+        return self.max_session_bytes > 0 and self.bytes_written >= self.max_session_bytes
+
+    def request(self, action_id: str, url: str = "") -> bool:
+        """登记一个需要截图的动作，立即返回；返回False表示不会为该动作截图"""
+        if not self.enabled or self._closing:
+            return False
+        if self.budget_exhausted or url == "about:blank":
+            self.skipped += 1
+            return False
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if not self._pending:
+            self._first_pending_at = now
+        self._pending.append(action_id)
+        self._last_request_at = now
+        self.requested += 1
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        self._wakeup.set()
+        return True
+
+    def _due_at(self) -> float:
+        """当前这批动作的截图时间：操作停顿后截图，但不超过最长等待，且满足每秒截图次数限制"""
+        due = min(self._last_request_at + self.coalesce_delay, self._first_pending_at + self.max_coalesce_delay)
+        if self._last_capture_at is not None:
+            due = max(due, self._last_capture_at + self.min_interval)
+        return due
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._closing:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            # 等待操作停顿，期间的新操作合并到同一次截图
+            while self._pending and not self._closing:
+                delay = self._due_at() - loop.time()
+                if delay <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    self._wakeup.clear()
+                except asyncio.TimeoutError:
+                    pass
+
+            if self._pending and not self._closing:
+                await self._capture()
+
+    async def _capture(self):
+        """截取一张视口截图，写入文件后回调所有等待的动作"""
+        action_ids, self._pending = self._pending, []
+        self._last_capture_at = asyncio.get_running_loop().time()
+
+        if self.budget_exhausted:
+            self.skipped += len(action_ids)
+            return
+
+        try:
+            data = await self.page.screenshot(
+                type="jpeg",
+                quality=self.quality,
+                full_page=False,
+                timeout=settings.SCREENSHOT_TIMEOUT * 1000
+            )
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"截图失败: {e}")
+            return
+
+        if self.max_session_bytes > 0 and self.bytes_written + len(data) > self.max_session_bytes:
+            logger.warning(f"会话截图已达到 {self.max_session_bytes} 字节上限，后续操作不再截图: {self.session_id}")
+            self.bytes_written = self.max_session_bytes
+            self.skipped += len(action_ids)
+            return
+
+        self.captures += 1
+        self.bytes_written += len(data)
+        path = settings.SCREENSHOTS_DIR / f"screenshot_{self.session_id[:8]}_{self.captures:04d}.jpg"
+        try:
+            await run_io(path.write_bytes, data)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"保存截图失败: {path}, 错误: {e}")
+            return
+
+        try:
+            self.on_captured(action_ids, str(path))
+        except Exception as e:
+            logger.error(f"更新操作截图失败: {e}")
+
+    async def close(self, flush: bool = True):
+        """停止流水线；flush为True时先为等待中的动作截最后一张图（页面关闭前调用）"""
+        if self._task is None:
+            self._closing = True
+            return
+
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await self._task
+        except Exception as e:
+            logger.error(f"截图任务异常结束: {e}")
+        finally:
+            self._task = None
+
+        if flush and self._pending:
+            await self._capture()
+        self.skipped += len(self._pending)
+        self._pending = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取截图统计信息"""
+        return {
+            "enabled": self.enabled,
+            "requested": self.requested,
+            "captures": self.captures,
+            "bytes_written": self.bytes_written,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "pending": len(self._pending)
+        }
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+会话动作日志
+录制过程中把每条ActionRecord以JSON Lines格式追加到 <id>_actions.jsonl，
+停止录制时再一次性压缩为完整的会话文件；进程异常退出后可通过重放日志恢复会话
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from config.settings import settings
+from core.models import TestSession, ActionRecord
+
+
+JOURNAL_SUFFIX = "_actions.jsonl"
+
+
+def write_session_file(session_data: Dict[str, Any], session_file: Path):
+    """原子写入会话文件（先写临时文件再替换，写入中断不会破坏已有文件）"""
+    temp_file = session_file.with_name(session_file.name + ".tmp")
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(session_data, f, ensure_ascii=False, default=str)
+    os.replace(temp_file, session_file)
+
+
+class SessionJournal:
+    """单个会话的追加写日志
+
+    日志第一行为会话头（不含actions），之后每行一条动作记录：
+    {"kind": "session", "session_file": "...", "extra": {...}, "data": {...}}
+    {"kind": "action", "data": {...}, "index": 3}   # index可选，表示插入位置
+    {"kind": "action_update", "data": {...}}
+    {"kind": "action_delete", "id": "..."}
+    """
+
+    def __init__(self, session_id: str, directory: Optional[Path] = None):
+        self.session_id = session_id
+        self.directory = directory or settings.RECORDINGS_DIR
+        self.path = self.directory / f"{session_id}{JOURNAL_SUFFIX}"
+        self._file = None
+        self._lock = threading.Lock()
+        self.action_count = 0
+
+    def open(self, session: TestSession, session_file: Optional[Path] = None, extra: Optional[Dict] = None):
+        """创建日志并写入会话头"""
+        session_file = session_file or self.directory / f"{session.id}_session.json"
+        header = session.dict(exclude={'actions'})
+
+        with self._lock:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._write_line({
+                "kind": "session",
+                "session_file": session_file.name,
+                "extra": extra or {},
+                "data": header
+            })
+
+        logger.debug(f"会话日志已创建: {self.path}")
+
+    def append_action(self, action: ActionRecord, index: Optional[int] = None):
+        """追加一条动作记录（index不为空时表示插入到该位置）"""
+        record = {"kind": "action", "data": action.dict()}
+        if index is not None:
+            record["index"] = index
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_line(record)
+            self.action_count += 1
+
+    def update_action(self, action: ActionRecord):
+        """记录一条动作被修改"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_line({"kind": "action_update", "data": action.dict()})
+
+    def delete_action(self, action_id: str):
+        """记录一条动作被删除"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_line({"kind": "action_delete", "id": action_id})
+
+    def _write_line(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def compact(self, session: TestSession, session_file: Optional[Path] = None, extra: Optional[Dict] = None) -> Path:
+        """把完整会话写入会话文件并删除日志"""
+        session_file = session_file or self.directory / f"{session.id}_session.json"
+        session_data = session.dict()
+        session_data.update(extra or {})
+
+        self.close()
+        write_session_file(session_data, session_file)
+
+        if self.path.exists():
+            self.path.unlink()
+
+        logger.debug(f"会话日志已压缩: {self.path} -> {session_file}")
+        return session_file
+
+    @staticmethod
+    def replay(path: Path) -> Optional[Dict[str, Any]]:
+        """重放日志，返回会话数据（包含actions）以及目标会话文件名"""
+        header = None
+        actions: List[Dict[str, Any]] = []
+
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程中断时最后一行可能不完整
+                    logger.warning(f"会话日志第 {line_number} 行不完整，已忽略: {path}")
+                    continue
+
+                kind = record.get("kind")
+                if kind == "session":
+                    header = record
+                elif kind == "action":
+                    index = record.get("index")
+                    if index is None:
+                        actions.append(record["data"])
+                    else:
+                        actions.insert(index, record["data"])
+                elif kind == "action_update":
+                    for i, action in enumerate(actions):
+                        if action.get("id") == record["data"].get("id"):
+                            actions[i] = record["data"]
+                            break
+                elif kind == "action_delete":
+                    actions = [action for action in actions if action.get("id") != record.get("id")]
+
+        if header is None:
+            return None
+
+        session_data = dict(header["data"])
+        session_data.update(header.get("extra", {}))
+        session_data["actions"] = actions
+        return {"session_file": header.get("session_file"), "data": session_data}
+
+    @classmethod
+    def recover_all(cls, directory: Optional[Path] = None) -> List[str]:
+        """恢复目录中所有未压缩的会话日志，返回恢复的会话ID列表"""
+        directory = directory or settings.RECORDINGS_DIR
+        recovered = []
+
+        for journal_file in directory.glob(f"*{JOURNAL_SUFFIX}"):
+            try:
+                replayed = cls.replay(journal_file)
+                if replayed is None:
+                    logger.warning(f"会话日志缺少会话头，跳过: {journal_file}")
+                    continue
+
+                session_data = replayed["data"]
+                if session_data.get("status") == "recording":
+                    session_data["status"] = "interrupted"
+
+                # 校验数据有效性
+                TestSession(**session_data)
+
+                session_file = directory / (replayed["session_file"] or f"{session_data['id']}_session.json")
+                write_session_file(session_data, session_file)
+                journal_file.unlink()
+
+                recovered.append(session_data["id"])
+                logger.info(f"已从日志恢复会话: {session_data['id']}（{len(session_data['actions'])} 个操作）")
+
+            except Exception as e:
+                logger.error(f"恢复会话日志失败: {journal_file}, 错误: {e}")
+
+        return recovered
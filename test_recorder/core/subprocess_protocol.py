@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+子进程录制器消息协议
+主进程与Playwright工作进程通过stdin/stdout交换长度前缀的JSON消息帧：
+4字节小端长度 + UTF-8编码的JSON。
+
+消息类型：
+- 请求：{"id": 1, "method": "start_recording", "params": {...}}
+- 响应：{"id": 1, "result": ...} 或 {"id": 1, "error": "..."}
+- 事件：{"event": "action_recorded", "params": {...}}（工作进程主动推送）
+"""
+
+import json
+import struct
+import threading
+from typing import Any, BinaryIO, Dict, Optional
+
+HEADER = struct.Struct("<I")
+
+# 单条消息的最大长度，防止读取到损坏的长度前缀时分配过大内存
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """消息帧格式错误"""
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """将消息编码为长度前缀的消息帧"""
+    payload = json.dumps(message, ensure_ascii=False, default=str).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    """读取指定字节数，流在消息开头结束时返回None"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ProtocolError("消息帧不完整，数据流已结束")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """从二进制流读取一条消息（阻塞），流结束时返回None"""
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"消息长度超出限制: {length}")
+
+    payload = _read_exact(stream, length) if length else b""
+    if payload is None:
+        raise ProtocolError("消息帧不完整，数据流已结束")
+    return json.loads(payload.decode("utf-8"))
+
+
+class MessageWriter:
+    """线程安全的消息帧写入器"""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self._lock = threading.Lock()
+        self.sent_count = 0
+        self.sent_bytes = 0
+
+    def send(self, message: Dict[str, Any]):
+        frame = encode_message(message)
+        with self._lock:
+            self.stream.write(frame)
+            self.stream.flush()
+            self.sent_count += 1
+            self.sent_bytes += len(frame)
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Playwright工作进程
+由 SubprocessTestRecorder 以 `python -m core.subprocess_worker` 启动，
+通过stdin接收请求、通过stdout返回响应和推送事件（长度前缀消息帧，见 core.subprocess_protocol），
+会话数据只保存在内存中，停止录制时一次性返回完整快照
+"""
+
+import asyncio
+import json
+import platform
+import sys
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Windows环境下设置事件循环策略
+if platform.system() == "Windows":
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+from playwright.async_api import async_playwright
+
+from core.subprocess_protocol import MessageWriter, read_message
+
+
+# 注入页面的用户交互监听脚本
+INTERACTION_SCRIPT = '''
+(function() {
+    let actionCount = 0;
+
+    function getElementInfo(element) {
+        const rect = element.getBoundingClientRect();
+        const tagName = element.tagName.toLowerCase();
+        const id = element.id || '';
+        const className = element.className || '';
+        const text = element.textContent ? element.textContent.trim().substring(0, 50) : '';
+        const value = element.value || '';
+        const placeholder = element.placeholder || '';
+        const name = element.name || '';
+        const type = element.type || '';
+
+        // 生成选择器
+        let selector = tagName;
+        if (id) selector = `#${id}`;
+        else if (className) selector = `.${className.split(' ')[0]}`;
+        else if (name) selector = `[name="${name}"]`;
+        else if (placeholder) selector = `[placeholder="${placeholder}"]`;
+
+        return {
+            tagName,
+            id,
+            className,
+            text,
+            value,
+            placeholder,
+            name,
+            type,
+            selector,
+            position: { x: rect.left, y: rect.top },
+            size: { width: rect.width, height: rect.height }
+        };
+    }
+
+    function recordAction(action, element, additionalData = {}) {
+        actionCount++;
+        const elementInfo = getElementInfo(element);
+        const actionData = {
+            action,
+            timestamp: Date.now(),
+            actionCount,
+            element: elementInfo,
+            url: window.location.href,
+            title: document.title,
+            ...additionalData
+        };
+
+        // 发送到Python后端
+        console.log('PLAYWRIGHT_ACTION:', JSON.stringify(actionData));
+    }
+
+    // 监听点击事件
+    document.addEventListener('click', function(e) {
+        recordAction('click', e.target);
+    }, true);
+
+    // 监听输入事件
+    document.addEventListener('input', function(e) {
+        if (e.target.value) {
+            recordAction('fill', e.target, { value: e.target.value });
+        }
+    }, true);
+
+    // 监听选择变化
+    document.addEventListener('change', function(e) {
+        if (e.target.tagName.toLowerCase() === 'select') {
+            recordAction('select', e.target, {
+                value: e.target.value,
+                selectedText: e.target.options[e.target.selectedIndex].text
+            });
+        } else if (e.target.type === 'checkbox') {
+            recordAction(e.target.checked ? 'check' : 'uncheck', e.target);
+        } else if (e.target.type === 'radio') {
+            recordAction('check', e.target, { value: e.target.value });
+        }
+    }, true);
+
+    // 监听键盘事件
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'Enter' && e.target.tagName.toLowerCase() === 'input') {
+            recordAction('press', e.target, { key: 'Enter' });
+        }
+    }, true);
+
+    console.log('用户交互监听器已注入');
+})();
+'''
+
+
+class PlaywrightWorker:
+    def __init__(self, writer: MessageWriter):
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.playwright = None
+        self.is_recording = False
+        self.session_data: Optional[Dict[str, Any]] = None
+
+        # 响应和事件都写入stdout
+        self.writer = writer
+
+    async def initialize(self) -> Dict[str, Any]:
+        """初始化Playwright"""
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
+            headless=False,
+            slow_mo=100
+        )
+        self.context = await self.browser.new_context()
+        self.page = await self.context.new_page()
+
+        print("Playwright worker initialized successfully")
+        return {"status": "initialized"}
+
+    def _notify_event(self, event_type: str, data: Any):
+        """推送事件到主进程"""
+        self.writer.send({
+            "event": event_type,
+            "params": {
+                "data": data,
+                "timestamp": datetime.now().isoformat()
+            }
+        })
+
+    async def start_recording(self, test_name: str, description: str = "") -> Dict[str, Any]:
+        """开始录制，返回会话数据"""
+        session_id = str(uuid.uuid4())
+        self.session_data = {
+            "id": session_id,
+            "name": test_name,
+            "description": description,
+            "start_time": datetime.now().isoformat(),
+            "actions": [],
+            "test_steps": [],
+            "trace_file": "",
+            "video_file": "",
+            "browser_type": "chromium",
+            "status": "recording",
+            "tags": []
+        }
+        self.is_recording = True
+
+        # 设置页面事件监听
+        await self._setup_page_listeners()
+
+        return self.session_data
+
+    async def _setup_page_listeners(self):
+        """设置页面事件监听器"""
+        if not self.page:
+            return
+
+        # 监听页面导航
+        async def on_response(response):
+            if response.request.resource_type == "document":
+                action_data = {
+                    "id": str(uuid.uuid4()),
+                    "session_id": self.session_data["id"],
+                    "action_type": "navigation",
+                    "timestamp": datetime.now().isoformat(),
+                    "page_url": response.url,
+                    "page_title": await self.page.title() if self.page else "",
+                    "additional_data": f"页面导航: {response.url}"
+                }
+                self._append_action(action_data)
+
+        # 注册监听器
+        self.page.on("response", on_response)
+
+        # 注入JavaScript监听用户交互
+        await self._inject_interaction_listeners()
+
+    async def _inject_interaction_listeners(self):
+        """注入JavaScript代码监听用户交互"""
+        await self.page.add_init_script(INTERACTION_SCRIPT)
+
+        # 监听控制台消息来捕获用户操作
+        async def handle_console_message(message):
+            if message.text.startswith('PLAYWRIGHT_ACTION:'):
+                try:
+                    action_json = message.text.replace('PLAYWRIGHT_ACTION:', '')
+                    action_data = json.loads(action_json)
+                    await self._record_page_action(action_data)
+                except Exception as e:
+                    print(f"处理页面操作失败: {e}")
+
+        self.page.on("console", handle_console_message)
+
+    async def _record_page_action(self, action_data: Dict[str, Any]):
+        """记录来自页面的用户操作"""
+        try:
+            action_record = {
+                "id": str(uuid.uuid4()),
+                "session_id": self.session_data["id"],
+                "action_type": action_data['action'],
+                "timestamp": datetime.fromtimestamp(action_data['timestamp'] / 1000).isoformat(),
+                "element_info": action_data['element'],
+                "page_url": action_data['url'],
+                "page_title": action_data['title'],
+                "additional_data": action_data.get('value', '') or json.dumps(action_data.get('additionalData', {}))
+            }
+
+            if self._append_action(action_record):
+                print(f"记录操作: {action_data['action']} on {action_data['element']['tagName']}")
+
+        except Exception as e:
+            print(f"记录操作失败: {e}")
+
+    def _append_action(self, action: Dict[str, Any]) -> bool:
+        """追加操作到内存中的会话并推送事件（不再重写会话文件）"""
+        if not (self.is_recording and self.session_data):
+            return False
+        self.session_data["actions"].append(action)
+        self._notify_event("action_recorded", action)
+        return True
+
+    async def stop_recording(self) -> Optional[Dict[str, Any]]:
+        """停止录制，返回完整的会话快照"""
+        if self.session_data:
+            self.session_data["end_time"] = datetime.now().isoformat()
+            self.session_data["status"] = "completed"
+        self.is_recording = False
+        return self.session_data
+
+    async def navigate_to(self, url: str) -> Dict[str, Any]:
+        """导航到URL"""
+        await self.page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        title = await self.page.title()
+
+        # 记录导航操作
+        if self.is_recording and self.session_data:
+            self._append_action({
+                "id": str(uuid.uuid4()),
+                "session_id": self.session_data["id"],
+                "action_type": "goto",
+                "timestamp": datetime.now().isoformat(),
+                "page_url": url,
+                "page_title": title,
+                "additional_data": f"导航到: {url}"
+            })
+
+        return {"url": url, "title": title}
+
+    async def ping(self) -> Dict[str, Any]:
+        return {"is_recording": self.is_recording}
+
+    async def handle_request(self, message: Dict[str, Any]):
+        """执行请求并返回响应（响应的id与请求一致）"""
+        handlers = {
+            "initialize": self.initialize,
+            "start_recording": self.start_recording,
+            "stop_recording": self.stop_recording,
+            "navigate": self.navigate_to,
+            "ping": self.ping
+        }
+        request_id = message.get("id")
+        method = message.get("method")
+
+        try:
+            handler = handlers.get(method)
+            if handler is None:
+                raise ValueError(f"未知的请求: {method}")
+            result = await handler(**(message.get("params") or {}))
+            self.writer.send({"id": request_id, "result": result})
+        except Exception as e:
+            self.writer.send({"id": request_id, "error": str(e)})
+
+    async def serve(self):
+        """读取并依次处理请求，直到收到shutdown或stdin关闭"""
+        loop = asyncio.get_running_loop()
+        requests: asyncio.Queue = asyncio.Queue()
+
+        # 在线程中阻塞读取stdin（Windows的匿名管道不支持异步读取）
+        def read_requests():
+            try:
+                while True:
+                    message = read_message(sys.stdin.buffer)
+                    loop.call_soon_threadsafe(requests.put_nowait, message)
+                    if message is None:
+                        return
+            except Exception as e:
+                print(f"读取请求失败: {e}")
+                loop.call_soon_threadsafe(requests.put_nowait, None)
+
+        threading.Thread(target=read_requests, daemon=True).start()
+
+        while True:
+            message = await requests.get()
+            if message is None:
+                break
+            if message.get("method") == "shutdown":
+                self.writer.send({"id": message.get("id"), "result": {"status": "shutdown"}})
+                break
+            await self.handle_request(message)
+
+    async def cleanup(self):
+        """清理资源"""
+        try:
+            if self.context:
+                await self.context.close()
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+        except Exception as e:
+            print(f"Cleanup error: {e}")
+
+
+async def run(writer: MessageWriter):
+    worker = PlaywrightWorker(writer)
+    try:
+        await worker.serve()
+    finally:
+        await worker.cleanup()
+
+
+def main():
+    writer = MessageWriter(sys.stdout.buffer)
+    # stdout只用于消息帧，print输出改到stderr
+    sys.stdout = sys.stderr
+    asyncio.run(run(writer))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+预热浏览器上下文池
+在共享浏览器中预先创建K个空白录制上下文（已暴露录制器绑定并打开空白页），
+开始录制时直接取出使用，后台补充；空闲过久或健康检查失败的上下文会被回收重建。
+视频录制从创建上下文时就开始，无法推迟到取出时，因此预热上下文不录制视频，
+否则视频开头会包含整个空闲时间的空白页，且池中无人使用的上下文也在持续写视频；
+使用预热上下文的会话只保存trace（会话的video_file为空）
+"""
+
+import asyncio
+import shutil
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from loguru import logger
+from playwright.async_api import Browser, BrowserContext, Page
+
+from core.recorder_binding import install_recorder_binding
+
+
+def build_context_options(temp_dir: Path, record_video: bool = True) -> Dict[str, Any]:
+    """录制上下文的创建参数（record_video为True时视频录制到临时目录）"""
+    options: Dict[str, Any] = {
+        "viewport": None  # 使用全屏
+    }
+    if record_video:
+        options["record_video_dir"] = str(temp_dir / "videos")
+        options["record_video_size"] = {"width": 1280, "height": 720}
+    return options
+
+
+class WarmContext:
+    """预热的录制上下文
+
+    录制器绑定在创建时已暴露，事件转发给取出该上下文的录制器（attach之前的事件被忽略）。
+    取出后临时目录归录制器所有：会话结束时trace移动到录制目录，临时目录随后删除；
+    未取出的上下文在关闭时删除临时目录
+    """
+
+    def __init__(self, browser: Browser, context: BrowserContext, page: Optional[Page], temp_dir: Path):
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.temp_dir = temp_dir
+        self.created_at = time.time()
+        self._handler: Optional[Callable[..., Awaitable[None]]] = None
+
+    async def dispatch(self, source: Dict, event_type: str, event_data: Dict):
+        if self._handler is not None:
+            await self._handler(source, event_type, event_data)
+
+    def attach(self, handler: Callable[..., Awaitable[None]]):
+        """将页面事件转发给录制器"""
+        self._handler = handler
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    async def is_healthy(self, timeout: float = 5.0) -> bool:
+        """健康检查：浏览器连接正常、页面未关闭且能执行脚本"""
+        try:
+            if not self.browser.is_connected() or self.page.is_closed():
+                return False
+            await asyncio.wait_for(self.page.evaluate("1"), timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        try:
+            await self.context.close()
+        except Exception as e:
+            logger.debug(f"关闭预热上下文失败: {e}")
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class WarmContextPool:
+    """预热上下文池（运行在录制管理器的事件循环中）"""
+
+    def __init__(self, size: int, idle_timeout: float, health_interval: float):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+
+        self._ready: Deque[WarmContext] = deque()
+        self._browser: Optional[Browser] = None
+        self._creating = 0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._maintenance_task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.created_count = 0
+        self.recycled_count = 0
+        self.unhealthy_count = 0
+        self.failed_count = 0
+
+    def start(self, browser: Browser):
+        """开始维护预热上下文（填充并定期检查）"""
+        self._browser = browser
+        if self.size <= 0:
+            return
+        self.schedule_refill(browser)
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def acquire(self, browser: Browser) -> Optional[WarmContext]:
+        """取出一个健康的预热上下文，没有可用上下文时返回None（调用方走冷启动）"""
+        while self._ready:
+            warm = self._ready.popleft()
+            if warm.browser is not browser or not await warm.is_healthy():
+                self.unhealthy_count += 1
+                asyncio.create_task(warm.close())
+                continue
+            self.hits += 1
+            self.schedule_refill(browser)
+            return warm
+
+        self.misses += 1
+        self.schedule_refill(browser)
+        return None
+
+    def schedule_refill(self, browser: Browser):
+        """在后台补充预热上下文"""
+        self._browser = browser
+        if self.size <= 0:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self):
+        while self._browser and self._browser.is_connected() and len(self._ready) < self.size:
+            browser = self._browser
+            self._creating += 1
+            try:
+                warm = await self._create(browser)
+            except Exception as e:
+                self.failed_count += 1
+                logger.error(f"创建预热上下文失败: {e}")
+                return
+            finally:
+                self._creating -= 1
+
+            if browser is self._browser:
+                self._ready.append(warm)
+            else:
+                await warm.close()
+
+    async def _create(self, browser: Browser) -> WarmContext:
+        temp_dir = Path(tempfile.mkdtemp(prefix="realtime_recorder_"))
+        # 不录制视频：视频从创建上下文时开始，会把空闲等待的时间录进会话视频
+        context = await browser.new_context(**build_context_options(temp_dir, record_video=False))
+        try:
+            warm = WarmContext(browser, context, None, temp_dir)
+            await install_recorder_binding(context, warm.dispatch)
+            warm.page = await context.new_page()
+            await warm.page.goto("about:blank")
+        except Exception:
+            await context.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        self.created_count += 1
+        logger.debug(f"预热上下文已创建，当前可用: {len(self._ready) + 1}")
+        return warm
+
+    async def _maintenance_loop(self):
+        """定期回收空闲过久的上下文并做健康检查"""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._check_contexts()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"预热上下文检查失败: {e}")
+
+    async def _check_contexts(self):
+        kept: Deque[WarmContext] = deque()
+        while self._ready:
+            warm = self._ready.popleft()
+            if warm.age > self.idle_timeout:
+                # 空闲过久（页面状态可能已过期），回收后重建
+                self.recycled_count += 1
+                await warm.close()
+            elif not await warm.is_healthy():
+                self.unhealthy_count += 1
+                await warm.close()
+            else:
+                kept.append(warm)
+        self._ready.extend(kept)
+
+        if self._browser:
+            self.schedule_refill(self._browser)
+
+    async def close(self):
+        """关闭所有预热上下文并停止后台任务"""
+        for task in (self._refill_task, self._maintenance_task):
+            if task and not task.done():
+                task.cancel()
+        self._refill_task = self._maintenance_task = None
+        self._browser = None
+
+        while self._ready:
+            await self._ready.popleft().close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取预热池统计信息"""
+        acquires = self.hits + self.misses
+        return {
+            "size": self.size,
+            "ready": len(self._ready),
+            "creating": self._creating,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / acquires, 4) if acquires else 0.0,
+            "created": self.created_count,
+            "recycled": self.recycled_count,
+            "unhealthy": self.unhealthy_count,
+            "failed": self.failed_count,
+            "idle_timeout": self.idle_timeout
+        }
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import json
-import time
 import threading
 import subprocess
 import sys
@@ -12,9 +11,11 @@ import tempfile
 import os
 
 from loguru import logger
+from watchdog.observers import Observer
 
 from config.settings import settings
 from core.models import TestSession, ActionRecord
+from core.codegen_parser import CodegenTailParser, CodeFileWatcher, StatementChange
 
 
 class WindowsTestRecorder:
@@ -30,12 +31,21 @@ class WindowsTestRecorder:
         
         # 浏览器进程
         self.browser_process: Optional[subprocess.Popen] = None
-        self.recording_thread: Optional[threading.Thread] = None
         
         # 临时文件用于通信
         self.temp_dir = Path(tempfile.mkdtemp(prefix="windows_recorder_"))
         self.actions_file = self.temp_dir / "actions.json"
         self.status_file = self.temp_dir / "status.json"
+        self.code_file_path = self.temp_dir / "generated_code.py"
+        
+        # 代码文件监控和增量解析（文件事件驱动，空闲时不占用CPU）
+        self.file_observer: Optional[Observer] = None
+        self.code_parser = CodegenTailParser()
+        self._code_lock = threading.Lock()
+        
+        # 语句ID顺序（与codegen输出中的操作语句一致）及其对应的操作
+        self._statement_ids: List[str] = []
+        self._statement_actions: Dict[str, ActionRecord] = {}
         
     def initialize(self):
         """初始化录制器"""
@@ -87,19 +97,23 @@ class WindowsTestRecorder:
                 actions=[]
             )
             
+            self.code_parser.reset()
+            self._statement_ids = []
+            self._statement_actions = {}
+            
+            # 先开始监控代码文件，避免漏掉codegen的第一次写入
+            self._start_file_monitoring()
+            
             # 启动浏览器进程
-            self._start_browser_process()
+            try:
+                self._start_browser_process()
+            except Exception:
+                self._stop_file_monitoring()
+                raise
             
             self.is_recording = True
             self.action_count = 0
             
-            # 启动录制监控线程
-            self.recording_thread = threading.Thread(
-                target=self._recording_monitor,
-                daemon=True
-            )
-            self.recording_thread.start()
-            
             self._update_status("recording", f"Recording: {test_name}")
             
             logger.info(f"开始录制测试用例: {test_name} (ID: {session_id})")
@@ -117,7 +131,7 @@ class WindowsTestRecorder:
             cmd = [
                 sys.executable, "-m", "playwright", "codegen",
                 "--target", "python-async",
-                "--output", str(self.temp_dir / "generated_code.py"),
+                "--output", str(self.code_file_path),
                 "about:blank"
             ]
             
@@ -137,195 +151,251 @@ class WindowsTestRecorder:
             logger.error(f"启动浏览器进程失败: {e}")
             raise
     
-    def _recording_monitor(self):
-        """录制监控线程"""
-        logger.info("录制监控线程启动")
-        
-        last_check_time = time.time()
-        action_counter = 0
-        last_code_content = ""
-        
-        while self.is_recording:
+    def _start_file_monitoring(self):
+        """启动代码文件监控"""
+        self.file_observer = Observer()
+        self.file_observer.schedule(
+            CodeFileWatcher(self.code_file_path, self._on_code_file_changed),
+            str(self.temp_dir),
+            recursive=False
+        )
+        self.file_observer.start()
+        logger.info("代码文件监控已启动")
+    
+    def _stop_file_monitoring(self):
+        """停止代码文件监控"""
+        if self.file_observer:
+            self.file_observer.stop()
+            self.file_observer.join(timeout=5)
+            self.file_observer = None
+    
+    def _on_code_file_changed(self):
+        """代码文件变化处理：只解析变化的语句，按顺序发出新增/修改/删除"""
+        with self._code_lock:
             try:
-                # 检查生成的代码文件
-                code_file = self.temp_dir / "generated_code.py"
-                if code_file.exists():
-                    # 读取生成的代码
-                    with open(code_file, 'r', encoding='utf-8') as f:
-                        code_content = f.read()
-                    
-                    # 只有当代码内容发生变化时才解析
-                    if code_content != last_code_content:
-                        last_code_content = code_content
-                        
-                        # 解析代码中的操作
-                        actions = self._parse_generated_code(code_content)
-                        
-                        # 添加新的操作
-                        current_action_count = len(self.session.actions)
-                        for i, action in enumerate(actions):
-                            if i >= current_action_count:  # 只处理新的操作
-                                action_counter += 1
-                                action_record = ActionRecord(
-                                    id=str(uuid.uuid4()),
-                                    session_id=self.session.id,
-                                    action_type=action.get('type', 'unknown'),
-                                    timestamp=datetime.now(),
-                                    page_url=action.get('url', ''),
-                                    page_title=action.get('title', ''),
-                                    element_info=action.get('element', {}),
-                                    description=action.get('description', ''),
-                                    additional_data=json.dumps(action.get('data', {}))
-                                )
-                                
-                                self.session.actions.append(action_record)
-                                
-                                # 通知监听器
-                                logger.info(f"新操作记录: {action.get('type', 'unknown')}")
-                                self._notify_listeners('action_recorded', action_record)
-                
-                time.sleep(0.5)  # 每500ms检查一次
+                if not self.session or not self.code_file_path.exists():
+                    return
                 
+                for change in self.code_parser.read_file(self.code_file_path):
+                    self._apply_statement_change(change)
+                    
             except Exception as e:
-                logger.error(f"录制监控错误: {e}")
-                time.sleep(1)
+                logger.error(f"处理代码文件变化失败: {e}")
+    
+    def _apply_statement_change(self, change: StatementChange):
+        """把语句变化应用到会话操作（语句ID即操作ID）"""
+        if change.kind == 'insert':
+            self._statement_ids.insert(change.index, change.statement_id)
+            action = self._parse_code_line(change.code_line, self._current_url(change.index))
+            if action:
+                self._insert_action(change.index, self._build_action_record(change.statement_id, action))
         
-        logger.info("录制监控线程结束")
+        elif change.kind == 'update':
+            action = self._parse_code_line(change.code_line, self._current_url(change.index))
+            existing = self._statement_actions.get(change.statement_id)
+            if action and existing:
+                action_record = self._build_action_record(change.statement_id, action, existing.timestamp)
+                self.session.actions[self.session.actions.index(existing)] = action_record
+                self._statement_actions[change.statement_id] = action_record
+                logger.info(f"操作已更新: {action.get('type', 'unknown')}")
+                self._notify_listeners('action_updated', action_record)
+            elif action:
+                self._insert_action(change.index, self._build_action_record(change.statement_id, action))
+            elif existing:
+                self._remove_action(change.statement_id)
+        
+        elif change.kind == 'delete':
+            del self._statement_ids[change.index]
+            self._remove_action(change.statement_id)
+    
+    def _current_url(self, index: int) -> str:
+        """语句所在位置的当前页面（之前最近一次导航的URL）"""
+        for i in range(index - 1, -1, -1):
+            action = self._statement_actions.get(self._statement_ids[i])
+            if action and action.action_type == 'goto':
+                return action.page_url
+        return "about:blank"
+    
+    def _build_action_record(self, statement_id: str, action: Dict, timestamp: Optional[datetime] = None) -> ActionRecord:
+        return ActionRecord(
+            id=statement_id,
+            session_id=self.session.id,
+            action_type=action.get('type', 'unknown'),
+            timestamp=timestamp or datetime.now(),
+            page_url=action.get('url', ''),
+            page_title=action.get('title', ''),
+            element_info=action.get('element', {}),
+            description=action.get('description', ''),
+            additional_data=json.dumps(action.get('data', {}))
+        )
+    
+    def _insert_action(self, index: int, action_record: ActionRecord):
+        """按语句顺序插入操作（新语句通常在末尾，直接追加）"""
+        position = len(self.session.actions)
+        for i in range(index + 1, len(self._statement_ids)):
+            following = self._statement_actions.get(self._statement_ids[i])
+            if following:
+                position = self.session.actions.index(following)
+                break
+        
+        self.session.actions.insert(position, action_record)
+        self._statement_actions[action_record.id] = action_record
+        self.action_count += 1
+        
+        logger.info(f"新操作记录: {action_record.action_type}")
+        self._notify_listeners('action_recorded', action_record)
+    
+    def _remove_action(self, statement_id: str):
+        action_record = self._statement_actions.pop(statement_id, None)
+        if not action_record:
+            return
+        self.session.actions.remove(action_record)
+        self.action_count -= 1
+        
+        logger.info(f"操作已删除: {action_record.action_type}")
+        self._notify_listeners('action_deleted', action_record)
     
     def _parse_generated_code(self, code_content: str) -> List[Dict]:
         """解析Playwright生成的代码"""
         actions = []
+        current_url = "about:blank"
         
+        for line in code_content.split('\n'):
+            action = self._parse_code_line(line, current_url)
+            if action:
+                actions.append(action)
+                if action['type'] == 'goto':
+                    current_url = action['url']
+        
+        return actions
+    
+    def _parse_code_line(self, line: str, current_url: str) -> Optional[Dict]:
+        """解析一行Playwright生成的代码，不是可识别的操作时返回None"""
         try:
-            lines = code_content.split('\n')
-            current_url = "about:blank"
-            
-            for line_num, line in enumerate(lines):
-                line = line.strip()
-                
-                # 解析不同类型的操作
-                if 'page.goto(' in line:
-                    url = self._extract_string_from_line(line)
-                    current_url = url
-                    actions.append({
-                        'type': 'goto',
-                        'url': url,
-                        'title': f'导航到: {url}',
-                        'description': f'打开网页: {url}',
-                        'element': {'type': 'navigation', 'url': url},
-                        'data': {'url': url, 'action': 'navigate'}
-                    })
-                
-                elif 'page.click(' in line:
-                    selector = self._extract_string_from_line(line)
-                    # 尝试提取更友好的元素描述
+            line = line.strip()
+            
+            # 解析不同类型的操作
+            if 'page.goto(' in line:
+                url = self._extract_string_from_line(line)
+                return {
+                    'type': 'goto',
+                    'url': url,
+                    'title': f'导航到: {url}',
+                    'description': f'打开网页: {url}',
+                    'element': {'type': 'navigation', 'url': url},
+                    'data': {'url': url, 'action': 'navigate'}
+                }
+            
+            elif 'page.click(' in line:
+                selector = self._extract_string_from_line(line)
+                # 尝试提取更友好的元素描述
+                element_desc = self._get_element_description(selector)
+                return {
+                    'type': 'click',
+                    'url': current_url,
+                    'title': f'点击: {element_desc}',
+                    'description': f'点击元素: {selector}',
+                    'element': {'selector': selector, 'type': 'click', 'description': element_desc},
+                    'data': {'selector': selector, 'action': 'click', 'element_type': 'button/link'}
+                }
+            
+            elif 'page.fill(' in line:
+                parts = line.split(',', 1)
+                if len(parts) >= 2:
+                    selector = self._extract_string_from_line(parts[0])
+                    value = self._extract_string_from_line(parts[1])
                     element_desc = self._get_element_description(selector)
-                    actions.append({
-                        'type': 'click',
+                    return {
+                        'type': 'fill',
                         'url': current_url,
-                        'title': f'点击: {element_desc}',
-                        'description': f'点击元素: {selector}',
-                        'element': {'selector': selector, 'type': 'click', 'description': element_desc},
-                        'data': {'selector': selector, 'action': 'click', 'element_type': 'button/link'}
-                    })
-                
-                elif 'page.fill(' in line:
-                    parts = line.split(',', 1)
-                    if len(parts) >= 2:
-                        selector = self._extract_string_from_line(parts[0])
-                        value = self._extract_string_from_line(parts[1])
-                        element_desc = self._get_element_description(selector)
-                        actions.append({
-                            'type': 'fill',
-                            'url': current_url,
-                            'title': f'输入文本: {value[:20]}{"..." if len(value) > 20 else ""}',
-                            'description': f'在 {element_desc} 中输入: {value}',
-                            'element': {'selector': selector, 'type': 'input', 'description': element_desc},
-                            'data': {'selector': selector, 'value': value, 'action': 'input'}
-                        })
-                
-                elif 'page.press(' in line:
-                    parts = line.split(',', 1)
-                    if len(parts) >= 2:
-                        selector = self._extract_string_from_line(parts[0])
-                        key = self._extract_string_from_line(parts[1])
-                        element_desc = self._get_element_description(selector)
-                        actions.append({
-                            'type': 'press',
-                            'url': current_url,
-                            'title': f'按键: {key}',
-                            'description': f'在 {element_desc} 中按下 {key} 键',
-                            'element': {'selector': selector, 'type': 'keypress', 'description': element_desc},
-                            'data': {'selector': selector, 'key': key, 'action': 'keypress'}
-                        })
-                
-                elif 'page.select_option(' in line:
-                    parts = line.split(',', 1)
-                    if len(parts) >= 2:
-                        selector = self._extract_string_from_line(parts[0])
-                        value = self._extract_string_from_line(parts[1])
-                        element_desc = self._get_element_description(selector)
-                        actions.append({
-                            'type': 'select',
-                            'url': current_url,
-                            'title': f'选择选项: {value}',
-                            'description': f'在 {element_desc} 中选择: {value}',
-                            'element': {'selector': selector, 'type': 'select', 'description': element_desc},
-                            'data': {'selector': selector, 'value': value, 'action': 'select'}
-                        })
-                
-                elif 'page.check(' in line:
-                    selector = self._extract_string_from_line(line)
-                    element_desc = self._get_element_description(selector)
-                    actions.append({
-                        'type': 'check',
-                        'url': current_url,
-                        'title': f'勾选: {element_desc}',
-                        'description': f'勾选复选框: {selector}',
-                        'element': {'selector': selector, 'type': 'checkbox', 'description': element_desc},
-                        'data': {'selector': selector, 'action': 'check'}
-                    })
-                
-                elif 'page.uncheck(' in line:
-                    selector = self._extract_string_from_line(line)
+                        'title': f'输入文本: {value[:20]}{"..." if len(value) > 20 else ""}',
+                        'description': f'在 {element_desc} 中输入: {value}',
+                        'element': {'selector': selector, 'type': 'input', 'description': element_desc},
+                        'data': {'selector': selector, 'value': value, 'action': 'input'}
+                    }
+            
+            elif 'page.press(' in line:
+                parts = line.split(',', 1)
+                if len(parts) >= 2:
+                    selector = self._extract_string_from_line(parts[0])
+                    key = self._extract_string_from_line(parts[1])
                     element_desc = self._get_element_description(selector)
-                    actions.append({
-                        'type': 'uncheck',
+                    return {
+                        'type': 'press',
                         'url': current_url,
-                        'title': f'取消勾选: {element_desc}',
-                        'description': f'取消勾选复选框: {selector}',
-                        'element': {'selector': selector, 'type': 'checkbox', 'description': element_desc},
-                        'data': {'selector': selector, 'action': 'uncheck'}
-                    })
-                
-                elif 'page.hover(' in line:
-                    selector = self._extract_string_from_line(line)
+                        'title': f'按键: {key}',
+                        'description': f'在 {element_desc} 中按下 {key} 键',
+                        'element': {'selector': selector, 'type': 'keypress', 'description': element_desc},
+                        'data': {'selector': selector, 'key': key, 'action': 'keypress'}
+                    }
+            
+            elif 'page.select_option(' in line:
+                parts = line.split(',', 1)
+                if len(parts) >= 2:
+                    selector = self._extract_string_from_line(parts[0])
+                    value = self._extract_string_from_line(parts[1])
                     element_desc = self._get_element_description(selector)
-                    actions.append({
-                        'type': 'hover',
+                    return {
+                        'type': 'select',
                         'url': current_url,
-                        'title': f'悬停: {element_desc}',
-                        'description': f'鼠标悬停在: {selector}',
-                        'element': {'selector': selector, 'type': 'hover', 'description': element_desc},
-                        'data': {'selector': selector, 'action': 'hover'}
-                    })
-                
-                elif 'page.wait_for_selector(' in line:
-                    selector = self._extract_string_from_line(line)
-                    element_desc = self._get_element_description(selector)
-                    actions.append({
-                        'type': 'wait',
-                        'url': current_url,
-                        'title': f'等待元素: {element_desc}',
-                        'description': f'等待元素出现: {selector}',
-                        'element': {'selector': selector, 'type': 'wait', 'description': element_desc},
-                        'data': {'selector': selector, 'action': 'wait'}
-                    })
+                        'title': f'选择选项: {value}',
+                        'description': f'在 {element_desc} 中选择: {value}',
+                        'element': {'selector': selector, 'type': 'select', 'description': element_desc},
+                        'data': {'selector': selector, 'value': value, 'action': 'select'}
+                    }
+            
+            elif 'page.check(' in line:
+                selector = self._extract_string_from_line(line)
+                element_desc = self._get_element_description(selector)
+                return {
+                    'type': 'check',
+                    'url': current_url,
+                    'title': f'勾选: {element_desc}',
+                    'description': f'勾选复选框: {selector}',
+                    'element': {'selector': selector, 'type': 'checkbox', 'description': element_desc},
+                    'data': {'selector': selector, 'action': 'check'}
+                }
+            
+            elif 'page.uncheck(' in line:
+                selector = self._extract_string_from_line(line)
+                element_desc = self._get_element_description(selector)
+                return {
+                    'type': 'uncheck',
+                    'url': current_url,
+                    'title': f'取消勾选: {element_desc}',
+                    'description': f'取消勾选复选框: {selector}',
+                    'element': {'selector': selector, 'type': 'checkbox', 'description': element_desc},
+                    'data': {'selector': selector, 'action': 'uncheck'}
+                }
+            
+            elif 'page.hover(' in line:
+                selector = self._extract_string_from_line(line)
+                element_desc = self._get_element_description(selector)
+                return {
+                    'type': 'hover',
+                    'url': current_url,
+                    'title': f'悬停: {element_desc}',
+                    'description': f'鼠标悬停在: {selector}',
+                    'element': {'selector': selector, 'type': 'hover', 'description': element_desc},
+                    'data': {'selector': selector, 'action': 'hover'}
+                }
+            
+            elif 'page.wait_for_selector(' in line:
+                selector = self._extract_string_from_line(line)
+                element_desc = self._get_element_description(selector)
+                return {
+                    'type': 'wait',
+                    'url': current_url,
+                    'title': f'等待元素: {element_desc}',
+                    'description': f'等待元素出现: {selector}',
+                    'element': {'selector': selector, 'type': 'wait', 'description': element_desc},
+                    'data': {'selector': selector, 'action': 'wait'}
+                }
         
         except Exception as e:
             logger.error(f"解析代码失败: {e}")
         
-        return actions
+        return None
     
     def _get_element_description(self, selector: str) -> str:
         """根据选择器生成友好的元素描述"""
@@ -418,10 +488,9 @@ class WindowsTestRecorder:
                 finally:
                     self.browser_process = None
             
-            # 等待录制线程结束
-            if self.recording_thread and self.recording_thread.is_alive():
-                logger.info("等待录制监控线程结束...")
-                self.recording_thread.join(timeout=5)
+            # 停止文件监控，并补读一次codegen退出前的最后写入
+            self._stop_file_monitoring()
+            self._on_code_file_changed()
             
             # 更新会话状态
             self.session.end_time = datetime.now()
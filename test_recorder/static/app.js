@@ -6,6 +6,9 @@ let currentSessionId = null;
 let recordingTimer = null;
 let actionCount = 0;
 let realtimeCodeLines = [];
+// 每个会话已显示的完整脚本代码行数（实时录制器只推送新增代码行）
+let codeLineCounts = {};
+let codeResyncing = {};
 let fullPlaywrightCode = '';
 let currentRecorderType = 'realtime';
 
@@ -79,6 +82,20 @@ function handleWebSocketMessage(data) {
                 console.debug('收到心跳响应');
                 break;
                 
+            case 'actions_batch':
+                console.log(`收到批量操作记录: ${data.count} 条`);
+                (data.actions || []).forEach(action => {
+                    if (action) {
+                        handleActionRecorded(action);
+                    }
+                });
+                break;
+                
+            case 'batch':
+                // 服务端合并的积压消息
+                (data.messages || []).forEach(handleWebSocketMessage);
+                break;
+                
             case 'recording_started':
                 console.log('录制已开始:', data);
                 currentSessionId = data.session_id;
@@ -93,6 +110,27 @@ function handleWebSocketMessage(data) {
                 handleRecordingStopped(data);
                 break;
                 
+            case 'job_progress':
+                // 停止录制等后台任务的进度
+                handleJobProgress(data.data || {});
+                break;
+                
+            case 'action_updated':
+                if (data.action) {
+                    data.action.recorder_type = data.recorder_type;
+                    handleActionUpdated(data.action);
+                }
+                break;
+                
+            case 'action_deleted':
+                handleActionDeleted((data.data || {}).action_id);
+                break;
+                
+            case 'action_screenshot':
+                // 后台截图完成，补上这批操作的截图
+                handleActionScreenshot(data);
+                break;
+                
             case 'action_recorded':
                 console.log('收到操作记录:', data);
                 const recorderInfo = data.recorder_type ? ` (${data.recorder_type})` : '';
@@ -125,6 +163,7 @@ function handleRecordingStarted(data) {
         recordingStartTime = new Date();
         actionCount = 0;
         realtimeCodeLines = [];
+        codeLineCounts = {};
         
         updateUI();
         startRecordingTimer();
@@ -171,6 +210,21 @@ function handleRecordingStopped(data) {
     }
 }
 
+// 处理后台任务进度
+function handleJobProgress(job) {
+    console.log(`后台任务 ${job.kind}: ${job.status} ${job.progress}% ${job.stage || ''}`);
+    if (job.kind !== 'stop_recording') {
+        return;
+    }
+    
+    if (job.status === 'completed') {
+        showNotification(`录制数据已保存，共 ${job.result ? job.result.action_count : 0} 个操作`, 'success');
+        loadSessions();
+    } else if (job.status === 'failed') {
+        showNotification(`录制后台处理失败: ${job.error}`, 'danger');
+    }
+}
+
 // 处理操作记录
 function handleActionRecorded(action) {
     try {
@@ -194,7 +248,9 @@ function handleActionRecorded(action) {
         addActionToRealtime(action);
         
         // 添加代码行到实时代码显示
-        if (action.playwright_code) {
+        if (Array.isArray(action.code_delta)) {
+            applyCodeDelta(action);
+        } else if (action.playwright_code) {
             console.log('添加Playwright代码行:', action.playwright_code);
             addCodeLineToRealtime(action.playwright_code, action);
         } else {
@@ -210,6 +266,154 @@ function handleActionRecorded(action) {
     }
 }
 
+// 追加实时录制器推送的新增代码行，行数出现缺口（例如积压消息被丢弃）时从服务端补齐
+function applyCodeDelta(action) {
+    const sessionId = action.session_id || currentSessionId;
+    if (codeResyncing[sessionId]) {
+        // 补齐请求会返回这些代码行
+        return;
+    }
+    
+    const known = codeLineCounts[sessionId] || 0;
+    const start = action.code_line_count - action.code_delta.length;
+    if (start > known) {
+        console.warn(`代码行缺口: 已显示 ${known} 行，本次从第 ${start} 行开始，正在补齐`);
+        resyncCodeLines(sessionId);
+        return;
+    }
+    
+    // 跳过已经显示过的代码行
+    action.code_delta.slice(known - start).forEach(code => addCodeLineToRealtime(code, action));
+    codeLineCounts[sessionId] = Math.max(known, action.code_line_count);
+}
+
+// 从服务端获取已显示行之后的代码行
+async function resyncCodeLines(sessionId) {
+    codeResyncing[sessionId] = true;
+    try {
+        const since = codeLineCounts[sessionId] || 0;
+        const response = await fetch(`/api/recording/enhanced-code/${sessionId}?since=${since}`);
+        const data = await response.json();
+        if (data.success && Array.isArray(data.code_delta)) {
+            data.code_delta.forEach(code => addCodeLineToRealtime(code, {description: '已从服务端补齐'}));
+            codeLineCounts[sessionId] = since + data.code_delta.length;
+        }
+    } catch (error) {
+        console.error('补齐代码行失败:', error);
+    } finally {
+        codeResyncing[sessionId] = false;
+    }
+}
+
+// 截图地址（截图接口按文件名在截图目录中查找）
+function screenshotUrl(screenshotPath) {
+    return `/api/screenshot/${encodeURIComponent(screenshotPath.split(/[\\/]/).pop())}`;
+}
+
+// 按操作ID查找实时显示中的元素
+function findRealtimeAction(actionId) {
+    const container = document.getElementById('realtime-actions');
+    return container ? container.querySelector(`[data-action-id="${CSS.escape(actionId)}"]`) : null;
+}
+
+// 处理后台截图完成：一张截图对应一批操作
+function handleActionScreenshot(data) {
+    const screenshotPath = data.screenshot_path;
+    if (!screenshotPath) {
+        return;
+    }
+    (data.action_ids || []).forEach(actionId => {
+        const actionDiv = findRealtimeAction(actionId);
+        if (!actionDiv || actionDiv.querySelector('.screenshot-preview')) {
+            return;
+        }
+        const img = document.createElement('img');
+        img.src = screenshotUrl(screenshotPath);
+        img.className = 'screenshot-preview mt-2';
+        img.style.maxWidth = '200px';
+        img.addEventListener('click', () => showScreenshot(screenshotPath));
+        actionDiv.querySelector('.flex-grow-1').appendChild(img);
+    });
+}
+
+// 生成实时显示中一个操作的内容
+function renderActionContent(action, counter) {
+    // 新增：录制器类型标识
+    const recorderBadge = action.recorder_type ? 
+        `<span class="badge bg-info me-2">${action.recorder_type === 'inspector' ? 'Inspector' : '实时'}</span>` : '';
+    
+    const screenshot = action.screenshot_path ? 
+        `<img src="${screenshotUrl(action.screenshot_path)}" class="screenshot-preview mt-2" style="max-width: 200px;" onclick="showScreenshot('${action.screenshot_path}')">` : '';
+    
+    const elementInfo = formatElementInfo(action.element_info, action.analyzed_element);
+    
+    return `
+        <div class="d-flex align-items-start">
+            <span class="action-counter">${counter}</span>
+            <div class="flex-grow-1">
+                <div class="d-flex align-items-center mb-1">
+                    ${recorderBadge}
+                    <span class="badge ${getActionBadgeColor(action.action_type)} action-type-badge me-2">
+                        ${action.action_type || '未知操作'}
+                    </span>
+                    <small class="text-muted">${new Date(action.timestamp).toLocaleTimeString()}</small>
+                </div>
+                <div class="fw-bold">${escapeHtml(action.description || '无描述')}</div>
+                <div class="element-info">${elementInfo}</div>
+                ${screenshot}
+            </div>
+        </div>
+    `;
+}
+
+// 处理被改写的操作（Inspector合并连续的fill等，ID不变）：按ID替换显示的操作和代码行
+function handleActionUpdated(action) {
+    const actionDiv = findRealtimeAction(action.id);
+    if (!actionDiv) {
+        handleActionRecorded(action);
+        return;
+    }
+    const counter = actionDiv.querySelector('.action-counter');
+    actionDiv.innerHTML = renderActionContent(action, counter ? counter.textContent : '');
+    
+    if (action.playwright_code) {
+        realtimeCodeLines.forEach(item => {
+            if (item.action && item.action.id === action.id) {
+                item.code = action.playwright_code;
+                item.action = action;
+            }
+        });
+        const codeDiv = findRealtimeCodeLine(action.id);
+        if (codeDiv) {
+            codeDiv.innerHTML = renderCodeLineContent(action.playwright_code, action, codeDiv.dataset.step);
+        }
+    }
+}
+
+// 处理被删除的操作（Inspector删除了已录制的语句）
+function handleActionDeleted(actionId) {
+    if (!actionId) {
+        return;
+    }
+    const actionDiv = findRealtimeAction(actionId);
+    if (actionDiv) {
+        actionDiv.remove();
+        actionCount = Math.max(0, actionCount - 1);
+        updateActionCount();
+    }
+    realtimeCodeLines = realtimeCodeLines.filter(item => !(item.action && item.action.id === actionId));
+    const codeDiv = findRealtimeCodeLine(actionId);
+    if (codeDiv) {
+        codeDiv.remove();
+    }
+}
+
+// 按操作ID查找实时代码显示中的代码行
+function findRealtimeCodeLine(actionId) {
+    const container = document.getElementById('realtime-code-lines');
+    return container ? container.querySelector(`[data-action-id="${CSS.escape(actionId)}"]`) : null;
+}
+
 // 添加操作到实时显示
 function addActionToRealtime(action) {
     try {
@@ -221,33 +425,11 @@ function addActionToRealtime(action) {
         
         const actionDiv = document.createElement('div');
         actionDiv.className = 'action-item p-3 mb-2 border rounded';
+        if (action.id) {
+            actionDiv.dataset.actionId = action.id;
+        }
         
-        // 新增：录制器类型标识
-        const recorderBadge = action.recorder_type ? 
-            `<span class="badge bg-info me-2">${action.recorder_type === 'inspector' ? 'Inspector' : '实时'}</span>` : '';
-        
-        const screenshot = action.screenshot_path ? 
-            `<img src="${action.screenshot_path}" class="screenshot-preview mt-2" style="max-width: 200px;" onclick="showScreenshot('${action.screenshot_path}')">` : '';
-        
-        const elementInfo = formatElementInfo(action.element_info, action.analyzed_element);
-        
-        actionDiv.innerHTML = `
-            <div class="d-flex align-items-start">
-                <span class="action-counter">${actionCount}</span>
-                <div class="flex-grow-1">
-                    <div class="d-flex align-items-center mb-1">
-                        ${recorderBadge}
-                        <span class="badge ${getActionBadgeColor(action.action_type)} action-type-badge me-2">
-                            ${action.action_type || '未知操作'}
-                        </span>
-                        <small class="text-muted">${new Date(action.timestamp).toLocaleTimeString()}</small>
-                    </div>
-                    <div class="fw-bold">${escapeHtml(action.description || '无描述')}</div>
-                    <div class="element-info">${elementInfo}</div>
-                    ${screenshot}
-                </div>
-            </div>
-        `;
+        actionDiv.innerHTML = renderActionContent(action, actionCount);
         
         // 添加高亮效果
         actionDiv.classList.add('highlight-code');
@@ -268,6 +450,24 @@ function addActionToRealtime(action) {
     }
 }
 
+// 生成实时代码显示中一行代码的内容
+function renderCodeLineContent(code, action, step) {
+    // 安全地获取数据
+    const actionType = action.action_type || 'unknown';
+    const description = action.description || '';
+    
+    return `
+        <div class="d-flex justify-content-between align-items-center mb-1">
+            <small class="text-muted">步骤 ${step}: ${actionType}</small>
+            <button class="btn btn-sm btn-outline-primary" onclick="copyCodeLine('${escapeHtml(code)}')">
+                📋 复制
+            </button>
+        </div>
+        <pre class="playwright-code mb-0">${escapeHtml(code)}</pre>
+        <small class="text-muted d-block mt-1">${escapeHtml(description)}</small>
+    `;
+}
+
 // 添加代码行到实时代码显示
 function addCodeLineToRealtime(code, action) {
     try {
@@ -292,21 +492,12 @@ function addCodeLineToRealtime(code, action) {
         
         const codeDiv = document.createElement('div');
         codeDiv.className = 'playwright-code-container mb-2 highlight-code';
-        
-        // 安全地获取数据
-        const actionType = action.action_type || 'unknown';
-        const description = action.description || '';
-        
-        codeDiv.innerHTML = `
-            <div class="d-flex justify-content-between align-items-center mb-1">
-                <small class="text-muted">步骤 ${realtimeCodeLines.length}: ${actionType}</small>
-                <button class="btn btn-sm btn-outline-primary" onclick="copyCodeLine('${escapeHtml(code)}')">
-                    📋 复制
-                </button>
-            </div>
-            <pre class="playwright-code mb-0">${escapeHtml(code)}</pre>
-            <small class="text-muted d-block mt-1">${escapeHtml(description)}</small>
-        `;
+        codeDiv.dataset.step = realtimeCodeLines.length;
+        if (action.id && action.playwright_code === code) {
+            // Inspector的每个操作对应一行代码，改写或删除操作时按ID找到这一行
+            codeDiv.dataset.actionId = action.id;
+        }
+        codeDiv.innerHTML = renderCodeLineContent(code, action, realtimeCodeLines.length);
         
         container.appendChild(codeDiv);
         console.log('代码行已添加到DOM');
@@ -601,14 +792,26 @@ async function exportTestCase() {
     }
 }
 
-// 加载会话列表
-async function loadSessions() {
+// 会话列表分页
+const SESSIONS_PAGE_SIZE = 50;
+let loadedSessions = [];
+let sessionsNextCursor = null;
+
+// 加载会话列表（append为true时加载下一页）
+async function loadSessions(append = false) {
     try {
-        const response = await fetch('/api/sessions');
+        const params = new URLSearchParams({ limit: SESSIONS_PAGE_SIZE });
+        if (append && sessionsNextCursor) {
+            params.set('cursor', sessionsNextCursor);
+        }
+        
+        const response = await fetch(`/api/sessions?${params.toString()}`);
         const result = await response.json();
         
         if (result.success) {
-            displaySessions(result.sessions);
+            loadedSessions = append ? loadedSessions.concat(result.sessions) : result.sessions;
+            sessionsNextCursor = result.next_cursor;
+            displaySessions(loadedSessions);
         } else {
             console.error('加载会话失败:', result.error);
         }
@@ -641,7 +844,9 @@ function displaySessions(sessions) {
                 </div>
             </div>
         </div>
-    `).join('');
+    `).join('') + (sessionsNextCursor ? `
+        <button class="btn btn-sm btn-outline-secondary w-100" onclick="loadSessions(true)">加载更多</button>
+    ` : '');
 }
 
 // 显示测试用例
@@ -770,7 +975,7 @@ function clearCodeDisplay() {
 function showScreenshot(screenshotPath) {
     const modal = new bootstrap.Modal(document.getElementById('screenshotModal'));
     const img = document.getElementById('modal-screenshot');
-    img.src = `/api/screenshot/${encodeURIComponent(screenshotPath)}`;
+    img.src = screenshotUrl(screenshotPath);
     modal.show();
 }
 
@@ -6,6 +6,11 @@ class TestRecorderApp {
         this.selectedSessionId = null;
         this.isRecording = false;
         this.actionCount = 0;
+        // 完整脚本的代码行（实时录制器只推送新增代码行）
+        this.codeLines = [];
+        // 每行代码对应的操作ID（Inspector的操作被改写或删除时按ID更新代码行）
+        this.codeLineActionIds = [];
+        this.codeResyncing = false;
         
         this.init();
     }
@@ -125,6 +130,25 @@ class TestRecorderApp {
             case 'action_recorded':
                 this.handleActionRecorded(message.action);
                 break;
+            case 'action_updated':
+                // 被改写的操作（Inspector合并连续的fill等，ID不变）
+                this.handleActionUpdated(message.action);
+                break;
+            case 'action_deleted':
+                this.handleActionDeleted((message.data || {}).action_id);
+                break;
+            case 'action_screenshot':
+                // 后台截图完成，补上这批操作的截图
+                this.handleActionScreenshot(message);
+                break;
+            case 'actions_batch':
+                // 一次推送的多个操作记录
+                (message.actions || []).forEach(action => this.handleActionRecorded(action));
+                break;
+            case 'batch':
+                // 服务端合并的积压消息
+                (message.messages || []).forEach(m => this.handleWebSocketMessage(m));
+                break;
             case 'pong':
                 // 心跳响应
                 break;
@@ -244,7 +268,7 @@ class TestRecorderApp {
     
     async loadSessions() {
         try {
-            const response = await fetch('/api/sessions');
+            const response = await fetch('/api/sessions?limit=50');
             const result = await response.json();
             
             this.renderSessionsList(result.sessions);
@@ -375,6 +399,8 @@ class TestRecorderApp {
             
             // 重置计数器
             this.actionCount = 0;
+            this.codeLines = [];
+            this.codeLineActionIds = [];
             document.getElementById('action-count').textContent = '0';
             
         } else {
@@ -426,12 +452,94 @@ class TestRecorderApp {
         this.actionCount++;
         this.addActionToList(action);
         this.updateLatestScreenshot(action);
+        if (Array.isArray(action.code_delta)) {
+            this.applyCodeDelta(action);
+        } else if (action.playwright_code) {
+            this.appendCodeLines([action.playwright_code], action.id);
+        }
         
         // 更新计数显示
         document.getElementById('action-count').textContent = `操作数量: ${this.actionCount}`;
         document.getElementById('live-action-count').textContent = this.actionCount;
     }
     
+    applyCodeDelta(action) {
+        if (this.codeResyncing) {
+            // 补齐请求会返回这些代码行
+            return;
+        }
+        const start = action.code_line_count - action.code_delta.length;
+        if (start > this.codeLines.length) {
+            // 行数出现缺口（例如积压消息被丢弃），从服务端补齐
+            this.resyncCodeLines(action.session_id || this.currentSessionId);
+            return;
+        }
+        this.appendCodeLines(action.code_delta.slice(this.codeLines.length - start));
+    }
+    
+    async resyncCodeLines(sessionId) {
+        this.codeResyncing = true;
+        try {
+            const response = await fetch(`/api/recording/enhanced-code/${sessionId}?since=${this.codeLines.length}`);
+            const result = await response.json();
+            if (result.success && Array.isArray(result.code_delta)) {
+                this.appendCodeLines(result.code_delta);
+            }
+        } catch (error) {
+            console.error('补齐代码行失败:', error);
+        } finally {
+            this.codeResyncing = false;
+        }
+    }
+    
+    appendCodeLines(lines, actionId = null) {
+        if (!lines.length) return;
+        this.codeLines.push(...lines);
+        this.codeLineActionIds.push(...lines.map(() => actionId));
+        this.renderCodeLines();
+    }
+    
+    renderCodeLines() {
+        const container = document.getElementById('realtime-code-lines');
+        if (container) {
+            container.textContent = this.codeLines.join('\n');
+        }
+    }
+    
+    handleActionUpdated(action) {
+        if (!action) return;
+        const actionElement = this.findActionElement(action.id);
+        if (!actionElement) {
+            this.handleActionRecorded(action);
+            return;
+        }
+        actionElement.replaceWith(this.createActionElement(action));
+        
+        const index = this.codeLineActionIds.indexOf(action.id);
+        if (index !== -1 && action.playwright_code) {
+            this.codeLines[index] = action.playwright_code;
+            this.renderCodeLines();
+        }
+    }
+    
+    handleActionDeleted(actionId) {
+        if (!actionId) return;
+        const actionElement = this.findActionElement(actionId);
+        if (actionElement) {
+            actionElement.remove();
+            this.actionCount = Math.max(0, this.actionCount - 1);
+            document.getElementById('action-count').textContent = `操作数量: ${this.actionCount}`;
+            document.getElementById('live-action-count').textContent = this.actionCount;
+        }
+        
+        const index = this.codeLineActionIds.indexOf(actionId);
+        if (index !== -1) {
+            this.codeLines.splice(index, 1);
+            this.codeLineActionIds.splice(index, 1);
+            this.renderCodeLines();
+        }
+    }
+    
     addActionToList(action) {
         const actionsList = document.getElementById('realtime-actions');
         
@@ -440,8 +548,19 @@ class TestRecorderApp {
             actionsList.innerHTML = '';
         }
         
+        const actionElement = this.createActionElement(action);
+        actionsList.appendChild(actionElement);
+        
+        // 滚动到最新操作
+        actionsList.scrollTop = actionsList.scrollHeight;
+    }
+    
+    createActionElement(action) {
         const actionElement = document.createElement('div');
         actionElement.className = 'list-group-item list-group-item-action';
+        if (action.id) {
+            actionElement.dataset.actionId = action.id;
+        }
         
         const time = new Date(action.timestamp).toLocaleTimeString();
         
@@ -473,16 +592,14 @@ class TestRecorderApp {
         
         // 点击查看截图
         if (action.screenshot_path) {
+            actionElement.dataset.screenshotPath = action.screenshot_path;
             actionElement.style.cursor = 'pointer';
             actionElement.addEventListener('click', () => {
                 this.showScreenshot(action.screenshot_path);
             });
         }
         
-        actionsList.appendChild(actionElement);
-        
-        // 滚动到最新操作
-        actionsList.scrollTop = actionsList.scrollHeight;
+        return actionElement;
     }
     
     getActionIcon(actionType) {
@@ -562,11 +679,35 @@ class TestRecorderApp {
         return `${elementInfo.tagName || '未知'} 元素`;
     }
     
+    findActionElement(actionId) {
+        return document.getElementById('realtime-actions')
+            .querySelector(`[data-action-id="${CSS.escape(actionId)}"]`);
+    }
+    
+    handleActionScreenshot(message) {
+        const screenshotPath = message.screenshot_path;
+        if (!screenshotPath) return;
+        
+        (message.action_ids || []).forEach(actionId => {
+            const actionElement = this.findActionElement(actionId);
+            if (!actionElement || actionElement.dataset.screenshotPath) return;
+            
+            actionElement.dataset.screenshotPath = screenshotPath;
+            const badges = actionElement.querySelector(':scope > .d-flex > .d-flex.align-items-center:last-child');
+            if (badges) {
+                badges.insertAdjacentHTML('afterbegin', '<i class="bi bi-camera text-primary me-2"></i>');
+            }
+            actionElement.style.cursor = 'pointer';
+            actionElement.addEventListener('click', () => this.showScreenshot(screenshotPath));
+        });
+        this.updateLatestScreenshot({screenshot_path: screenshotPath});
+    }
+    
     updateLatestScreenshot(action) {
         if (action.screenshot_path) {
             const screenshotContainer = document.getElementById('latest-screenshot');
             screenshotContainer.innerHTML = `
-                <img src="/api/screenshot/${encodeURIComponent(action.screenshot_path)}" 
+                <img src="${this.screenshotUrl(action.screenshot_path)}" 
                      class="img-fluid screenshot-thumbnail" 
                      alt="最新截图"
                      onclick="app.showScreenshot('${action.screenshot_path}')">
@@ -577,10 +718,15 @@ class TestRecorderApp {
     showScreenshot(screenshotPath) {
         const modal = new bootstrap.Modal(document.getElementById('screenshotModal'));
         const img = document.getElementById('modal-screenshot');
-        img.src = `/api/screenshot/${encodeURIComponent(screenshotPath)}`;
+        img.src = this.screenshotUrl(screenshotPath);
         modal.show();
     }
     
+    screenshotUrl(screenshotPath) {
+        // 截图接口按文件名在截图目录中查找
+        return `/api/screenshot/${encodeURIComponent(screenshotPath.split(/[\\/]/).pop())}`;
+    }
+    
     renderSessionsList(sessions) {
         const sessionsList = document.getElementById('sessions-list');
         
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+流式Word文档写入器
+python-docx 在内存中维护整个文档树，内容越多占用越大。这里直接按顺序生成 WordprocessingML：
+正文逐段写入临时文件，图片在遇到时立即写入压缩包，关闭时再把正文和样式、关系等部件打包成 .docx，
+内存占用与文档长度无关
+"""
+
+import os
+import re
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# 每像素对应的EMU（按96 DPI）
+EMU_PER_PIXEL = 9525
+# 图片的最大显示宽度（EMU，约15厘米）
+MAX_PICTURE_WIDTH_EMU = 5400000
+
+# XML 1.0 不允许的控制字符
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_DOCUMENT_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture"><w:body>'
+)
+
+_DOCUMENT_FOOTER = (
+    '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+    '<w:pgMar w:top="1440" w:right="1247" w:bottom="1440" w:left="1247" w:header="851" w:footer="992" w:gutter="0"/>'
+    '</w:sectPr></w:body></w:document>'
+)
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="jpeg" ContentType="image/jpeg"/>'
+    '<Default Extension="png" ContentType="image/png"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '</Types>'
+)
+
+_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '</Relationships>'
+)
+
+_BORDER = '<w:{0} w:val="single" w:sz="4" w:space="0" w:color="808080"/>'
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:docDefaults><w:rPrDefault><w:rPr>'
+    '<w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="宋体" w:cs="Times New Roman"/>'
+    '<w:sz w:val="21"/><w:szCs w:val="21"/><w:lang w:val="en-US" w:eastAsia="zh-CN"/>'
+    '</w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="120" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+    '<w:next w:val="Normal"/><w:qFormat/><w:pPr><w:jc w:val="center"/><w:spacing w:after="240"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="36"/><w:szCs w:val="36"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/>'
+    '<w:next w:val="Normal"/><w:qFormat/><w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120"/>'
+    '<w:outlineLvl w:val="0"/></w:pPr><w:rPr><w:b/><w:sz w:val="30"/><w:szCs w:val="30"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/>'
+    '<w:next w:val="Normal"/><w:qFormat/><w:pPr><w:keepNext/><w:spacing w:before="200" w:after="100"/>'
+    '<w:outlineLvl w:val="1"/></w:pPr><w:rPr><w:b/><w:sz w:val="26"/><w:szCs w:val="26"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:customStyle="1" w:styleId="Code"><w:name w:val="Code"/><w:basedOn w:val="Normal"/>'
+    '<w:pPr><w:spacing w:after="0" w:line="240" w:lineRule="auto"/></w:pPr>'
+    '<w:rPr><w:rFonts w:ascii="Consolas" w:hAnsi="Consolas"/><w:sz w:val="18"/><w:szCs w:val="18"/></w:rPr></w:style>'
+    '<w:style w:type="table" w:default="1" w:styleId="TableNormal"><w:name w:val="Normal Table"/>'
+    '<w:tblPr><w:tblInd w:w="0" w:type="dxa"/><w:tblCellMar><w:top w:w="0" w:type="dxa"/>'
+    '<w:left w:w="108" w:type="dxa"/><w:bottom w:w="0" w:type="dxa"/><w:right w:w="108" w:type="dxa"/>'
+    '</w:tblCellMar></w:tblPr></w:style>'
+    '<w:style w:type="table" w:styleId="TableGrid"><w:name w:val="Table Grid"/><w:basedOn w:val="TableNormal"/>'
+    '<w:tblPr><w:tblBorders>'
+    + "".join(_BORDER.format(side) for side in ("top", "left", "bottom", "right", "insideH", "insideV")) +
+    '</w:tblBorders></w:tblPr></w:style>'
+    '</w:styles>'
+)
+
+
+def _text(value) -> str:
+    """转义为XML文本并去除非法字符"""
+    return escape(_INVALID_XML_CHARS.sub("", "" if value is None else str(value)))
+
+
+def _runs(text, bold: bool = False) -> str:
+    """文本转换为run，换行转换为<w:br/>"""
+    properties = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    lines = ("" if text is None else str(text)).split("\n")
+    parts = []
+    for index, line in enumerate(lines):
+        if index:
+            parts.append("<w:br/>")
+        parts.append(f'<w:t xml:space="preserve">{_text(line)}</w:t>')
+    return f"<w:r>{properties}{''.join(parts)}</w:r>"
+
+
+def _paragraph(text, style: Optional[str] = None, bold: bool = False) -> str:
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{properties}{_runs(text, bold)}</w:p>"
+
+
+class StreamingDocxWriter:
+    """按顺序写入段落、表格和图片的 .docx 写入器
+
+    用法：
+        with StreamingDocxWriter(path) as doc:
+            doc.add_heading("标题", 0)
+            doc.start_table(["列1", "列2"], [2000, 6000])
+            doc.add_row(["a", "b"])
+            doc.end_table()
+    """
+
+    def __init__(self, path: Path, title: str = "", author: str = ""):
+        self.path = Path(path)
+        self.title = title
+        self.author = author
+        self._zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+        fd, body_path = tempfile.mkstemp(prefix="docx_body_", suffix=".xml", dir=str(self.path.parent))
+        self._body_path = Path(body_path)
+        self._body = os.fdopen(fd, "w", encoding="utf-8")
+        self._body.write(_DOCUMENT_HEADER)
+        self._images: List[Tuple[str, str]] = []  # [(关系ID, 压缩包内路径)]
+        self._image_ids: Dict[str, str] = {}  # 图片文件 -> 关系ID，同一文件只写入一次
+        self._picture_count = 0
+        self._table_widths: Optional[Sequence[int]] = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_heading(self, text: str, level: int = 1):
+        """添加标题，level为0时使用文档标题样式"""
+        self._body.write(_paragraph(text, "Title" if level == 0 else f"Heading{min(level, 2)}"))
+
+    def add_paragraph(self, text: str = "", bold: bool = False, style: Optional[str] = None):
+        self._body.write(_paragraph(text, style, bold))
+
+    def add_code(self, code: str):
+        """添加代码块（逐行写入，每行一个段落）"""
+        for line in code.splitlines():
+            self._body.write(_paragraph(line, "Code"))
+        self._body.write(_paragraph(""))
+
+    def start_table(self, headers: Sequence[str], widths: Sequence[int]):
+        """开始表格，widths为各列宽度（缇，1厘米约567缇），表头行在分页时重复"""
+        self._table_widths = widths
+        grid = "".join(f'<w:gridCol w:w="{width}"/>' for width in widths)
+        self._body.write(
+            '<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:w="0" w:type="auto"/>'
+            f'<w:tblLayout w:type="fixed"/></w:tblPr><w:tblGrid>{grid}</w:tblGrid>'
+        )
+        if headers:
+            self._write_row(headers, bold=True, header=True)
+
+    def add_row(self, cells: Sequence, bold_first: bool = False):
+        """添加表格行，bold_first为True时第一列加粗（键值表）"""
+        self._write_row(cells, bold_first=bold_first)
+
+    def end_table(self):
+        self._body.write("</w:tbl>")
+        self._table_widths = None
+
+    def _write_row(self, cells: Sequence, bold: bool = False, header: bool = False, bold_first: bool = False):
+        row_properties = "<w:trPr><w:tblHeader/></w:trPr>" if header else ""
+        parts = [f"<w:tr>{row_properties}"]
+        for index, (cell, width) in enumerate(zip(cells, self._table_widths)):
+            cell_bold = bold or (bold_first and index == 0)
+            parts.append(
+                f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>'
+                f"<w:p>{_runs(cell, cell_bold)}</w:p></w:tc>"
+            )
+        parts.append("</w:tr>")
+        self._body.write("".join(parts))
+
+    def add_picture(self, image_path: Path, width_px: int, height_px: int):
+        """添加图片段落，图片文件在首次引用时立即写入压缩包"""
+        self._picture_count += 1
+        index = self._picture_count
+        extension = "png" if Path(image_path).suffix.lower() == ".png" else "jpeg"
+        relationship_id = self._image_ids.get(str(image_path))
+        if relationship_id is None:
+            relationship_id = f"rIdImg{len(self._images) + 1}"
+            target = f"media/image{len(self._images) + 1}.{extension}"
+            # 图片本身已压缩，直接存储
+            self._zip.write(image_path, f"word/{target}", compress_type=zipfile.ZIP_STORED)
+            self._images.append((relationship_id, target))
+            self._image_ids[str(image_path)] = relationship_id
+
+        width = width_px * EMU_PER_PIXEL
+        height = height_px * EMU_PER_PIXEL
+        if width > MAX_PICTURE_WIDTH_EMU:
+            height = height * MAX_PICTURE_WIDTH_EMU // width
+            width = MAX_PICTURE_WIDTH_EMU
+
+        self._body.write(
+            '<w:p><w:r><w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0">'
+            f'<wp:extent cx="{width}" cy="{height}"/><wp:docPr id="{index}" name="Picture {index}"/>'
+            '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<pic:pic><pic:nvPicPr><pic:cNvPr id="{index}" name="image{index}.{extension}"/><pic:cNvPicPr/></pic:nvPicPr>'
+            f'<pic:blipFill><a:blip r:embed="{relationship_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+            f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{width}" cy="{height}"/></a:xfrm>'
+            '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr>'
+            '</pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>'
+        )
+
+    def close(self):
+        """写入剩余部件并生成 .docx 文件"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._body.write(_DOCUMENT_FOOTER)
+            self._body.close()
+            self._zip.write(self._body_path, "word/document.xml")
+            self._zip.writestr("word/styles.xml", _STYLES)
+            self._zip.writestr("word/_rels/document.xml.rels", self._document_rels())
+            self._zip.writestr("docProps/core.xml", self._core_properties())
+            self._zip.writestr("_rels/.rels", _PACKAGE_RELS)
+            self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        finally:
+            self._zip.close()
+            self._body_path.unlink(missing_ok=True)
+
+    def abort(self):
+        """放弃写入，删除未完成的文件"""
+        if self._closed:
+            return
+        self._closed = True
+        self._body.close()
+        self._zip.close()
+        self._body_path.unlink(missing_ok=True)
+        self.path.unlink(missing_ok=True)
+
+    def _document_rels(self) -> str:
+        relationships = [
+            '<Relationship Id="rIdStyles" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        ]
+        relationships += [
+            f'<Relationship Id="{relationship_id}" '
+            f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="{target}"/>'
+            for relationship_id, target in self._images
+        ]
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(relationships) + "</Relationships>"
+        )
+
+    def _core_properties(self) -> str:
+        created = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+            f"<dc:title>{_text(self.title)}</dc:title><dc:creator>{_text(self.author)}</dc:creator>"
+            f'<dcterms:created xsi:type="dcterms:W3CDTF">{created}</dcterms:created>'
+            "</cp:coreProperties>"
+        )
@@ -3,15 +3,65 @@
 """
 导出处理器
 负责将测试用例导出为不同格式
+
+所有格式都按顺序流式写入，内存占用与操作数量无关：
+- Excel 使用 openpyxl 的只写工作簿，行数据直接写入临时文件
+- Word 使用 StreamingDocxWriter 逐段生成文档
+- JSON 逐条序列化操作和步骤
+截图在写到对应步骤时才读取并缩小，多个测试用例导出为一个zip压缩包
 """
 
 import json
-from pathlib import Path
-from typing import Dict, Any, Optional
+import math
+import os
+import re
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path, PureWindowsPath
+from typing import Dict, Any, Optional, Iterable, Tuple, TextIO
 from datetime import datetime
 
 from loguru import logger
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.drawing.image import Image as ExcelImage
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from PIL import Image
+from pydantic import BaseModel
+
+from config.settings import settings
+from core.ai_generator import ai_generator
 from core.models import TestSession, TestCase
+from utils.docx_writer import StreamingDocxWriter
+from utils.io_pool import run_io
+
+# Excel单元格最多32767个字符
+EXCEL_CELL_MAX_LENGTH = 32767
+# Excel默认行高约20像素，用于计算截图占用的行数
+EXCEL_ROW_HEIGHT_PX = 20
+# Excel单元格样式名（每个工作簿注册一次，单元格按名称引用，避免逐个单元格创建和比较样式对象）
+EXCEL_TEXT_STYLE = "导出_文本"
+EXCEL_LABEL_STYLE = "导出_标签"
+EXCEL_HEADER_STYLE = "导出_表头"
+
+
+@dataclass
+class ExportOptions:
+    """导出选项"""
+    include_screenshots: bool = True
+    author: str = ""
+    version: str = "1.0"
+    remarks: str = ""
+    cross_window_info: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class ScreenshotCache:
+    """单次导出中已缩小的截图（同一截图只处理一次，缩略图保存在临时目录中）"""
+    temp_dir: Path
+    thumbnails: Dict[str, Optional[Tuple[Path, int, int]]] = field(default_factory=dict)
 
 
 class ExportHandler:
@@ -19,6 +69,7 @@ class ExportHandler:
     
     def __init__(self):
         self.supported_formats = ["json", "excel", "word"]
+        self.extensions = {"json": ".json", "excel": ".xlsx", "word": ".docx"}
     
     async def export_session(
         self, 
@@ -49,17 +100,12 @@ class ExportHandler:
         output_path: Optional[Path] = None,
         **kwargs
     ) -> Dict[str, Any]:
-        """导出为JSON格式"""
+        """导出为JSON格式（逐条写入操作记录）"""
         try:
             if not output_path:
                 output_path = Path(f"export_session_{session.id}.json")
             
-            # 转换会话数据为字典
-            session_data = session.dict()
-            
-            # 写入JSON文件
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2, default=str)
+            await run_io(self._write_session_json, session, output_path)
             
             logger.info(f"JSON导出成功: {output_path}")
             return {
@@ -81,17 +127,18 @@ class ExportHandler:
     ) -> Dict[str, Any]:
         """导出为Excel格式"""
         try:
-            # 这里应该实现Excel导出逻辑
-            # 暂时返回成功状态
             if not output_path:
                 output_path = Path(f"export_session_{session.id}.xlsx")
             
-            logger.info(f"Excel导出功能待实现: {output_path}")
+            test_case = self._session_test_case(session)
+            await run_io(self.export_test_case, test_case, "excel", output_path=output_path, **kwargs)
+            
+            logger.info(f"Excel导出成功: {output_path}")
             return {
                 "success": True,
                 "format": "excel",
                 "file_path": str(output_path),
-                "message": "Excel导出功能待实现"
+                "file_size": output_path.stat().st_size
             }
             
         except Exception as e:
@@ -106,24 +153,393 @@ class ExportHandler:
     ) -> Dict[str, Any]:
         """导出为Word格式"""
         try:
-            # 这里应该实现Word导出逻辑
-            # 暂时返回成功状态
             if not output_path:
                 output_path = Path(f"export_session_{session.id}.docx")
             
-            logger.info(f"Word导出功能待实现: {output_path}")
+            test_case = self._session_test_case(session)
+            await run_io(self.export_test_case, test_case, "word", output_path=output_path, **kwargs)
+            
+            logger.info(f"Word导出成功: {output_path}")
             return {
                 "success": True,
                 "format": "word",
                 "file_path": str(output_path),
-                "message": "Word导出功能待实现"
+                "file_size": output_path.stat().st_size
             }
             
         except Exception as e:
             logger.error(f"Word导出失败: {e}")
             return {"success": False, "error": str(e)}
+    
+    @staticmethod
+    def _session_test_case(session: TestSession) -> TestCase:
+        return ai_generator.generate_test_case(session)
+    
+    def export_test_case(
+        self,
+        test_case: TestCase,
+        format: str = "excel",
+        output_path: Optional[Path] = None,
+        screenshots: Optional[ScreenshotCache] = None,
+        **kwargs
+    ) -> Path:
+        """导出单个测试用例，返回导出文件路径（同步执行，在I/O线程池中调用）
+        
+        kwargs: include_screenshots, author, version, remarks, cross_window_info
+        """
+        if format not in self.supported_formats:
+            raise ValueError(f"不支持的导出格式: {format}")
+        
+        options = ExportOptions(**kwargs)
+        if not output_path:
+            output_path = settings.EXPORTS_DIR / self._export_filename(test_case, format)
+        output_path = Path(output_path)
+        
+        if screenshots is None:
+            with tempfile.TemporaryDirectory(prefix="export_screenshots_") as temp_dir:
+                self._write_test_case(test_case, format, output_path, options, ScreenshotCache(Path(temp_dir)))
+        else:
+            self._write_test_case(test_case, format, output_path, options, screenshots)
+        
+        logger.info(f"测试用例导出成功: {output_path}")
+        return output_path
+    
+    def export_test_cases(
+        self,
+        test_cases: Iterable[TestCase],
+        format: str = "excel",
+        output_path: Optional[Path] = None,
+        **kwargs
+    ) -> Path:
+        """导出多个测试用例到一个zip压缩包，返回压缩包路径
+        
+        test_cases 可以是生成器：每个测试用例写入临时文件、加入压缩包后立即删除，同一时间只处理一个测试用例
+        """
+        if format not in self.supported_formats:
+            raise ValueError(f"不支持的导出格式: {format}")
+        
+        if not output_path:
+            output_path = settings.EXPORTS_DIR / f"test_cases_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        output_path = Path(output_path)
+        temp_archive = output_path.with_name(f"{output_path.name}.tmp")
+        
+        exported = 0
+        failed = []
+        names = set()
+        # xlsx/docx本身已压缩，直接存储
+        compress_type = zipfile.ZIP_DEFLATED if format == "json" else zipfile.ZIP_STORED
+        
+        try:
+            with tempfile.TemporaryDirectory(prefix="export_") as temp_dir, \
+                    zipfile.ZipFile(temp_archive, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                temp_dir = Path(temp_dir)
+                for test_case in test_cases:
+                    name = self._unique_name(self._export_filename(test_case, format, timestamp=False), names)
+                    file_path = temp_dir / name
+                    try:
+                        with tempfile.TemporaryDirectory(dir=temp_dir) as screenshot_dir:
+                            self.export_test_case(
+                                test_case, format, output_path=file_path,
+                                screenshots=ScreenshotCache(Path(screenshot_dir)), **kwargs
+                            )
+                        archive.write(file_path, name, compress_type=compress_type)
+                        exported += 1
+                    except Exception as e:
+                        logger.error(f"导出测试用例失败: {test_case.id}, 错误: {e}")
+                        failed.append(test_case.id)
+                    finally:
+                        file_path.unlink(missing_ok=True)
+                
+                if failed:
+                    archive.writestr("导出失败.txt", "\n".join(failed))
+            
+            os.replace(temp_archive, output_path)
+        except Exception:
+            temp_archive.unlink(missing_ok=True)
+            raise
+        
+        logger.info(f"批量导出完成: {output_path}，成功 {exported} 个，失败 {len(failed)} 个")
+        return output_path
+    
+    def _write_test_case(self, test_case: TestCase, format: str, output_path: Path,
+                         options: ExportOptions, screenshots: ScreenshotCache):
+        if format == "json":
+            self._write_test_case_json(test_case, output_path, options)
+        elif format == "excel":
+            self._write_excel(test_case, output_path, options, screenshots)
+        else:
+            self._write_word(test_case, output_path, options, screenshots)
+    
+    def _export_filename(self, test_case: TestCase, format: str, timestamp: bool = True) -> str:
+        """导出文件名：<用例编号>_<用例名称>[_时间戳].<扩展名>"""
+        name = re.sub(r'[\\/:*?"<>|\s]+', "_", test_case.name or "").strip("_")[:50]
+        stem = f"{test_case.id}_{name}" if name else test_case.id
+        if timestamp:
+            stem = f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return stem + self.extensions[format]
+    
+    @staticmethod
+    def _unique_name(name: str, names: set) -> str:
+        """压缩包内文件名去重"""
+        stem, suffix = os.path.splitext(name)
+        candidate = name
+        index = 2
+        while candidate in names:
+            candidate = f"{stem}_{index}{suffix}"
+            index += 1
+        names.add(candidate)
+        return candidate
+    
+    # ---------------- 基本信息 ----------------
+    
+    def _basic_info(self, test_case: TestCase, options: ExportOptions) -> Tuple[Tuple[str, Any], ...]:
+        preconditions = "\n".join(f"{index}. {item}" for index, item in enumerate(test_case.preconditions, 1))
+        return (
+            ("用例编号", test_case.id),
+            ("用例名称", test_case.name),
+            ("所属模块", test_case.module),
+            ("测试类别", test_case.category),
+            ("优先级", test_case.priority),
+            ("用例描述", test_case.description),
+            ("前置条件", preconditions),
+            ("步骤数", len(test_case.test_steps)),
+            ("创建者", test_case.created_by),
+            ("创建时间", test_case.created_time.strftime("%Y-%m-%d %H:%M:%S") if test_case.created_time else ""),
+            ("执行时长(秒)", round(test_case.execution_time, 2) if test_case.execution_time else ""),
+            ("作者", options.author),
+            ("版本", options.version),
+            ("备注", options.remarks),
+            ("导出时间", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+    
+    @staticmethod
+    def _cross_window_sections(info: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+        """跨窗口信息中的各部分（统计、分析报告、增强代码）"""
+        if not info:
+            return ()
+        sections = []
+        if info.get("statistics"):
+            sections.append(("统计", json.dumps(info["statistics"], ensure_ascii=False, indent=2, default=str)))
+        if info.get("analysis_report"):
+            sections.append(("分析报告", str(info["analysis_report"])))
+        if info.get("enhanced_code"):
+            sections.append(("增强代码", str(info["enhanced_code"])))
+        return tuple(sections)
+    
+    # ---------------- 截图 ----------------
+    
+    @staticmethod
+    def _resolve_screenshot(screenshot_path: str) -> Optional[Path]:
+        """查找截图文件（会话中可能记录的是其他机器上的绝对路径，按文件名在截图目录中查找）"""
+        if not screenshot_path:
+            return None
+        path = Path(screenshot_path)
+        if path.is_file():
+            return path
+        candidate = settings.SCREENSHOTS_DIR / PureWindowsPath(screenshot_path).name
+        return candidate if candidate.is_file() else None
+    
+    def _screenshot_thumbnail(self, screenshot_path: str, cache: ScreenshotCache) -> Optional[Tuple[Path, int, int]]:
+        """读取截图并缩小为JPEG缩略图，返回(缩略图路径, 宽, 高)；截图不存在或无法读取时返回None"""
+        if screenshot_path in cache.thumbnails:
+            return cache.thumbnails[screenshot_path]
+        
+        thumbnail = None
+        source = self._resolve_screenshot(screenshot_path)
+        if source:
+            try:
+                max_width = settings.EXPORT_SCREENSHOT_MAX_WIDTH
+                with Image.open(source) as image:
+                    # JPEG按缩小后的尺寸解码，避免先解码完整大图
+                    image.draft("RGB", (max_width, max_width))
+                    image.thumbnail((max_width, max_width * 4))
+                    image = image.convert("RGB")
+                target = cache.temp_dir / f"screenshot_{len(cache.thumbnails) + 1}.jpg"
+                image.save(target, "JPEG", quality=settings.EXPORT_SCREENSHOT_QUALITY, optimize=True)
+                thumbnail = (target, image.width, image.height)
+            except Exception as e:
+                logger.warning(f"读取截图失败: {source}, 错误: {e}")
+        
+        cache.thumbnails[screenshot_path] = thumbnail
+        return thumbnail
+    
+    # ---------------- Excel ----------------
+    
+    @staticmethod
+    def _excel_value(value: Any) -> Any:
+        """去除Excel不允许的字符并截断超长文本"""
+        if isinstance(value, str):
+            return ILLEGAL_CHARACTERS_RE.sub("", value)[:EXCEL_CELL_MAX_LENGTH]
+        return value
+    
+    @staticmethod
+    def _add_excel_styles(workbook: Workbook):
+        alignment = Alignment(wrap_text=True, vertical="top")
+        workbook.add_named_style(NamedStyle(name=EXCEL_TEXT_STYLE, alignment=alignment))
+        workbook.add_named_style(NamedStyle(name=EXCEL_LABEL_STYLE, font=Font(bold=True), alignment=alignment))
+        workbook.add_named_style(NamedStyle(
+            name=EXCEL_HEADER_STYLE,
+            font=Font(bold=True),
+            fill=PatternFill("solid", fgColor="DDEBF7"),
+            alignment=alignment
+        ))
+    
+    def _excel_row(self, worksheet, values, styles):
+        """写入一行，styles为每列的样式名（或所有列共用一个样式名）"""
+        if isinstance(styles, str):
+            styles = [styles] * len(values)
+        cells = []
+        for value, style in zip(values, styles):
+            cell = WriteOnlyCell(worksheet, value=self._excel_value(value))
+            cell.style = style
+            cells.append(cell)
+        worksheet.append(cells)
+    
+    def _write_excel(self, test_case: TestCase, output_path: Path, options: ExportOptions, screenshots: ScreenshotCache):
+        """写入Excel：用例信息、测试步骤、截图、跨窗口信息各占一个工作表"""
+        workbook = Workbook(write_only=True)
+        self._add_excel_styles(workbook)
+        
+        info_sheet = workbook.create_sheet("测试用例")
+        info_sheet.column_dimensions["A"].width = 16
+        info_sheet.column_dimensions["B"].width = 80
+        for row in self._basic_info(test_case, options):
+            self._excel_row(info_sheet, row, (EXCEL_LABEL_STYLE, EXCEL_TEXT_STYLE))
+        
+        steps_sheet = workbook.create_sheet("测试步骤")
+        for column, width in zip("ABCDEFG", (8, 12, 50, 50, 30, 10, 24)):
+            steps_sheet.column_dimensions[column].width = width
+        self._excel_row(steps_sheet, ("步骤", "操作", "步骤描述", "预期结果", "实际结果", "状态", "截图"), EXCEL_HEADER_STYLE)
+        
+        screenshot_sheet = None
+        screenshot_row = 1
+        screenshot_rows: Dict[str, int] = {}  # 截图 -> 截图表中的行号，同一截图只嵌入一次
+        if options.include_screenshots:
+            screenshot_sheet = workbook.create_sheet("截图")
+            screenshot_sheet.column_dimensions["A"].width = 40
+        
+        for step in test_case.test_steps:
+            thumbnail = None
+            if screenshot_sheet is not None and step.screenshot_path and step.screenshot_path not in screenshot_rows:
+                thumbnail = self._screenshot_thumbnail(step.screenshot_path, screenshots)
+            
+            if thumbnail:
+                # 截图表中：标题行 + 图片（锚定在标题下一行，按图片高度预留空行）
+                path, width, height = thumbnail
+                screenshot_rows[step.screenshot_path] = screenshot_row
+                screenshot_sheet.append([self._excel_value(f"步骤 {step.step_number}：{step.description}")])
+                screenshot_sheet.add_image(ExcelImage(str(path)), f"A{screenshot_row + 1}")
+                reserved_rows = math.ceil(height / EXCEL_ROW_HEIGHT_PX) + 1
+                for _ in range(reserved_rows):
+                    screenshot_sheet.append([])
+                screenshot_row += reserved_rows + 1
+            
+            row = screenshot_rows.get(step.screenshot_path) if step.screenshot_path else None
+            self._excel_row(steps_sheet, (
+                step.step_number, step.action, step.description, step.expected_result,
+                step.actual_result or "", step.status, f"见截图页第{row}行" if row else ""
+            ), EXCEL_TEXT_STYLE)
+        
+        sections = self._cross_window_sections(options.cross_window_info)
+        if sections:
+            cross_window_sheet = workbook.create_sheet("跨窗口信息")
+            cross_window_sheet.column_dimensions["A"].width = 12
+            cross_window_sheet.column_dimensions["B"].width = 120
+            for title, content in sections:
+                self._excel_row(cross_window_sheet, (title, content), (EXCEL_LABEL_STYLE, EXCEL_TEXT_STYLE))
+        
+        # 截图在保存时才从缩略图文件中读取
+        workbook.save(output_path)
+    
+    # ---------------- Word ----------------
+    
+    def _write_word(self, test_case: TestCase, output_path: Path, options: ExportOptions, screenshots: ScreenshotCache):
+        """写入Word：基本信息表、前置条件、测试步骤表、步骤截图、跨窗口信息"""
+        with StreamingDocxWriter(output_path, title=test_case.name, author=options.author) as doc:
+            doc.add_heading(test_case.name, 0)
+            
+            doc.add_heading("基本信息", 1)
+            doc.start_table([], [2200, 7200])
+            for label, value in self._basic_info(test_case, options):
+                if label in ("前置条件", "用例描述"):
+                    continue
+                doc.add_row([label, value], bold_first=True)
+            doc.end_table()
+            
+            doc.add_heading("用例描述", 1)
+            doc.add_paragraph(test_case.description)
+            
+            doc.add_heading("前置条件", 1)
+            for index, precondition in enumerate(test_case.preconditions, 1):
+                doc.add_paragraph(f"{index}. {precondition}")
+            
+            doc.add_heading("测试步骤", 1)
+            doc.start_table(["步骤", "步骤描述", "预期结果", "状态"], [800, 4000, 3600, 1000])
+            for step in test_case.test_steps:
+                doc.add_row([step.step_number, step.description, step.expected_result, step.status])
+            doc.end_table()
+            
+            if options.include_screenshots:
+                has_heading = False
+                for step in test_case.test_steps:
+                    thumbnail = self._screenshot_thumbnail(step.screenshot_path, screenshots) if step.screenshot_path else None
+                    if not thumbnail:
+                        continue
+                    if not has_heading:
+                        doc.add_heading("步骤截图", 1)
+                        has_heading = True
+                    doc.add_paragraph(f"步骤 {step.step_number}：{step.description}", bold=True)
+                    doc.add_picture(*thumbnail)
+            
+            sections = self._cross_window_sections(options.cross_window_info)
+            if sections:
+                doc.add_heading("跨窗口信息", 1)
+                for title, content in sections:
+                    doc.add_heading(title, 2)
+                    doc.add_code(content)
+    
+    # ---------------- JSON ----------------
+    
+    def _write_test_case_json(self, test_case: TestCase, output_path: Path, options: ExportOptions):
+        export_info = {
+            "export_time": datetime.now().isoformat(),
+            "format": "JSON",
+            "author": options.author,
+            "version": options.version,
+            "remarks": options.remarks
+        }
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write('{\n  "export_info": ')
+            f.write(json.dumps(export_info, ensure_ascii=False))
+            if options.cross_window_info:
+                f.write(',\n  "cross_window_info": ')
+                f.write(json.dumps(options.cross_window_info, ensure_ascii=False, default=str))
+            f.write(',\n  "test_case": ')
+            self._write_json_object(f, test_case, ("test_steps",), indent="  ")
+            f.write("\n}\n")
+    
+    def _write_session_json(self, session: TestSession, output_path: Path):
+        with open(output_path, "w", encoding="utf-8") as f:
+            self._write_json_object(f, session, ("actions", "test_steps"), indent="")
+            f.write("\n")
+    
+    @staticmethod
+    def _write_json_object(f: TextIO, model: BaseModel, list_fields: Tuple[str, ...], indent: str):
+        """流式写入模型：普通字段一次写入，列表字段逐项序列化，每项一行"""
+        fields = model.model_dump(mode="json", exclude=set(list_fields))
+        inner = indent + "  "
+        parts = [f"\n{inner}{json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}"
+                 for key, value in fields.items()]
+        f.write("{" + ",".join(parts))
+        
+        for name in list_fields:
+            f.write(f",\n{inner}{json.dumps(name)}: [")
+            for index, item in enumerate(getattr(model, name)):
+                f.write(f"{',' if index else ''}\n{inner}  {item.model_dump_json()}")
+            f.write(f"\n{inner}]")
+        
+        f.write(f"\n{indent}}}")
 
 
 # 创建导出处理器实例
 export_handler = ExportHandler()
-
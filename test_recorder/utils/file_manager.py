@@ -1,20 +1,28 @@
 import json
 import asyncio
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 from pathlib import Path
 from datetime import datetime
 
 from loguru import logger
 from config.settings import settings
 from core.models import TestSession, TestCase
+from core.session_journal import SessionJournal, write_session_file
+from utils.session_index import SessionIndex
+from utils.session_cache import SessionCache
+from utils.io_pool import run_io
 
 
 class FileManager:
     """文件管理器类"""
     
     def __init__(self):
-        self.sessions_cache = {}
+        self.sessions_cache = SessionCache(
+            max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+            max_bytes=settings.SESSION_CACHE_MAX_BYTES
+        )
         self.test_cases_cache = {}
+        self.session_index = SessionIndex()
     
     async def initialize(self):
         """初始化文件管理器"""
@@ -23,45 +31,69 @@ class FileManager:
         # 确保目录存在
         settings.create_directories()
         
-        # 预加载现有会话
-        await self._load_existing_sessions()
+        # 恢复异常退出时未压缩的会话日志
+        recovered = await run_io(SessionJournal.recover_all)
+        if recovered:
+            logger.info(f"从会话日志恢复了 {len(recovered)} 个会话")
+        
+        # 与会话目录对账，更新会话索引（会话按需加载，不再预加载全部文件）
+        await run_io(self.session_index.reconcile)
         
         logger.info("文件管理器初始化完成")
     
-    async def _load_existing_sessions(self):
-        """加载现有的会话文件"""
+    async def _load_existing_sessions(self) -> List[TestSession]:
+        """加载现有的会话文件（在I/O线程池中执行）"""
+        return await run_io(self._load_existing_sessions_sync)
+    
+    def _load_existing_sessions_sync(self) -> List[TestSession]:
+        """加载现有的会话文件（文件未变化的会话直接使用缓存）"""
+        sessions = []
         try:
             session_files = list(settings.RECORDINGS_DIR.glob("*_session.json"))
             
             for session_file in session_files:
                 try:
-                    with open(session_file, 'r', encoding='utf-8') as f:
-                        session_data = json.load(f)
-                    
-                    session = TestSession(**session_data)
-                    self.sessions_cache[session.id] = session
-                    
+                    sessions.append(self._load_session_file(session_file, self._session_id_from_file(session_file)))
                 except Exception as e:
                     logger.warning(f"加载会话文件失败: {session_file}, 错误: {e}")
             
-            logger.info(f"加载了 {len(self.sessions_cache)} 个现有会话")
+            logger.info(f"加载了 {len(sessions)} 个现有会话")
             
         except Exception as e:
             logger.error(f"加载现有会话失败: {e}")
+        
+        return sessions
+    
+    @staticmethod
+    def _session_id_from_file(session_file: Path) -> str:
+        """从会话文件名获取会话ID（<id>_session.json 或 <id>_inspector_session.json）"""
+        name = session_file.name[:-len("_session.json")]
+        if name.endswith("_inspector"):
+            name = name[:-len("_inspector")]
+        return name
+    
+    def _load_session_file(self, session_file: Path, session_id: str) -> TestSession:
+        """读取会话文件，按mtime/size校验缓存，文件未变化时不重复解析"""
+        stat = session_file.stat()
+        
+        cached = self.sessions_cache.get(session_id, stat.st_mtime, stat.st_size)
+        if cached is not None:
+            return cached
+        
+        with open(session_file, 'r', encoding='utf-8') as f:
+            session_data = json.load(f)
+        
+        session = TestSession(**session_data)
+        self.sessions_cache.put(session_id, session, stat.st_mtime, stat.st_size)
+        return session
     
     async def save_session(self, session: TestSession) -> bool:
         """保存会话数据"""
         try:
             session_file = settings.RECORDINGS_DIR / f"{session.id}_session.json"
             
-            # 转换为字典并处理datetime序列化
-            session_dict = session.dict()
-            
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_dict, f, ensure_ascii=False, indent=2, default=str)
-            
-            # 更新缓存
-            self.sessions_cache[session.id] = session
+            # 转换为字典并原子写入
+            await run_io(self._save_session_sync, session, session_file)
             
             logger.info(f"会话保存成功: {session.id}")
             return True
@@ -70,41 +102,77 @@ class FileManager:
             logger.error(f"保存会话失败: {e}")
             return False
     
+    def _save_session_sync(self, session: TestSession, session_file: Path):
+        write_session_file(session.dict(), session_file)
+        self.session_index.upsert_session(session, session_file)
+        
+        # 更新缓存
+        stat = session_file.stat()
+        self.sessions_cache.put(session.id, session, stat.st_mtime, stat.st_size)
+    
     async def get_session(self, session_id: str) -> Optional[TestSession]:
         """获取指定会话"""
         try:
-            # 先从缓存查找
-            if session_id in self.sessions_cache:
-                return self.sessions_cache[session_id]
-            
-            # 从文件加载
-            session_file = settings.RECORDINGS_DIR / f"{session_id}_session.json"
-            if not session_file.exists():
-                return None
-            
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-            
-            session = TestSession(**session_data)
-            
-            # 缓存结果
-            self.sessions_cache[session_id] = session
-            
-            return session
+            return await run_io(self._get_session_sync, session_id)
             
         except Exception as e:
             logger.error(f"获取会话失败: {session_id}, 错误: {e}")
             return None
     
+    def _get_session_sync(self, session_id: str) -> Optional[TestSession]:
+        session_file = self._get_session_file(session_id)
+        if not session_file:
+            self.sessions_cache.invalidate(session_id)
+            return None
+        
+        # 文件未变化时直接返回缓存
+        return self._load_session_file(session_file, session_id)
+    
+    def _get_session_file(self, session_id: str) -> Optional[Path]:
+        """查找会话文件（实时录制器和Inspector录制器的文件名不同）"""
+        summary = self.session_index.get_session_summary(session_id)
+        candidates = [summary["session_file"]] if summary and summary.get("session_file") else []
+        candidates += [f"{session_id}_session.json", f"{session_id}_inspector_session.json"]
+        
+        for filename in candidates:
+            session_file = settings.RECORDINGS_DIR / filename
+            if session_file.exists():
+                return session_file
+        return None
+    
+    async def sync_session(self, session_id: str) -> bool:
+        """录制器写入会话文件后，同步更新会话索引和缓存"""
+        try:
+            session_file = await run_io(self._get_session_file, session_id)
+            if not session_file:
+                logger.warning(f"同步会话索引失败，会话文件不存在: {session_id}")
+                return False
+            
+            await run_io(self.session_index.upsert_from_file, session_file)
+            self.sessions_cache.invalidate(session_id)
+            return True
+            
+        except Exception as e:
+            logger.error(f"同步会话索引失败: {session_id}, 错误: {e}")
+            return False
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取会话缓存统计信息"""
+        return self.sessions_cache.get_stats()
+    
+    async def list_session_summaries(self, **query) -> Dict[str, Any]:
+        """从会话索引分页查询会话摘要（按开始时间倒序）"""
+        return await run_io(self.session_index.query_sessions, **query)
+    
     async def get_all_sessions(self) -> List[TestSession]:
         """获取所有会话"""
         try:
-            # 重新扫描文件以确保数据最新
-            await self._load_existing_sessions()
+            # 重新扫描文件，未变化的文件直接使用缓存
+            sessions = await self._load_existing_sessions()
             
             # 按创建时间倒序排列
             sessions = sorted(
-                self.sessions_cache.values(),
+                sessions,
                 key=lambda x: x.start_time,
                 reverse=True
             )
@@ -122,25 +190,10 @@ class FileManager:
             if not session:
                 return False
             
-            # 删除会话文件
-            session_file = settings.RECORDINGS_DIR / f"{session_id}_session.json"
-            if session_file.exists():
-                session_file.unlink()
-            
-            # 删除追踪文件
-            if session.trace_file and Path(session.trace_file).exists():
-                Path(session.trace_file).unlink()
-            
-            # 删除视频文件
-            if session.video_file and Path(session.video_file).exists():
-                Path(session.video_file).unlink()
-            
-            # 删除相关截图
-            await self._delete_session_screenshots(session)
+            await run_io(self._delete_session_files, session)
             
             # 从缓存移除
-            if session_id in self.sessions_cache:
-                del self.sessions_cache[session_id]
+            self.sessions_cache.invalidate(session_id)
             
             logger.info(f"会话删除成功: {session_id}")
             return True
@@ -149,7 +202,33 @@ class FileManager:
             logger.error(f"删除会话失败: {session_id}, 错误: {e}")
             return False
     
-    async def _delete_session_screenshots(self, session: TestSession):
+    def _delete_session_files(self, session: TestSession):
+        """删除会话文件、索引及相关文件"""
+        # 删除会话文件
+        session_file = self._get_session_file(session.id)
+        if session_file:
+            session_file.unlink()
+        
+        # 从会话索引移除
+        self.session_index.delete_session(session.id)
+        
+        # 删除会话日志
+        journal_file = SessionJournal(session.id).path
+        if journal_file.exists():
+            journal_file.unlink()
+        
+        # 删除追踪文件
+        if session.trace_file and Path(session.trace_file).exists():
+            Path(session.trace_file).unlink()
+        
+        # 删除视频文件
+        if session.video_file and Path(session.video_file).exists():
+            Path(session.video_file).unlink()
+        
+        # 删除相关截图
+        self._delete_session_screenshots(session)
+    
+    def _delete_session_screenshots(self, session: TestSession):
         """删除会话相关的截图文件"""
         try:
             for action in session.actions:
@@ -166,9 +245,7 @@ class FileManager:
             
             # 转换为字典
             test_case_dict = test_case.dict()
-            
-            with open(test_case_file, 'w', encoding='utf-8') as f:
-                json.dump(test_case_dict, f, ensure_ascii=False, indent=2, default=str)
+            await run_io(self._write_json_file, test_case_dict, test_case_file)
             
             # 更新缓存
             self.test_cases_cache[test_case.id] = test_case
@@ -178,4 +255,60 @@ class FileManager:
             
         except Exception as e:
             logger.error(f"保存测试用例失败: {e}")
-            return False 
\ No newline at end of file
+            return False 
+    
+    async def get_test_case(self, session_id: str) -> Optional[TestCase]:
+        """获取会话对应的测试用例（测试用例ID为 TC_<会话ID前8位>）"""
+        try:
+            test_case_id = f"TC_{session_id[:8]}"
+            if test_case_id in self.test_cases_cache:
+                return self.test_cases_cache[test_case_id]
+            
+            test_case_file = settings.RECORDINGS_DIR / f"testcase_{test_case_id}.json"
+            test_case_data = await run_io(self._read_json_file, test_case_file)
+            if test_case_data is None:
+                return None
+            
+            test_case = TestCase(**test_case_data)
+            self.test_cases_cache[test_case_id] = test_case
+            return test_case
+            
+        except Exception as e:
+            logger.error(f"获取测试用例失败: {session_id}, 错误: {e}")
+            return None
+    
+    def iter_test_cases_sync(
+        self, session_ids: Iterable[str], generate: Callable[[TestSession], TestCase]
+    ) -> Iterator[TestCase]:
+        """逐个读取会话的测试用例，未保存测试用例的会话调用generate生成
+        
+        同步生成器，在I/O线程中迭代；读到的测试用例不放入缓存，同一时间只持有一个测试用例
+        """
+        for session_id in session_ids:
+            try:
+                test_case_data = self._read_json_file(settings.RECORDINGS_DIR / f"testcase_TC_{session_id[:8]}.json")
+                if test_case_data is not None:
+                    test_case = TestCase(**test_case_data)
+                else:
+                    session = self._get_session_sync(session_id)
+                    if not session:
+                        logger.warning(f"会话不存在，跳过: {session_id}")
+                        continue
+                    test_case = generate(session)
+            except Exception as e:
+                logger.error(f"读取测试用例失败: {session_id}, 错误: {e}")
+                continue
+            
+            yield test_case
+    
+    @staticmethod
+    def _write_json_file(data: Any, path: Path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    
+    @staticmethod
+    def _read_json_file(path: Path) -> Optional[Any]:
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
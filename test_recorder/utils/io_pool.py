@@ -0,0 +1,91 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+from config.settings import settings
+
+
+class IOPool:
+    """有界文件I/O线程池
+
+    会话、测试用例、报告等文件读写通过该线程池执行，避免阻塞事件循环；
+    等待网络的阻塞任务（如AI生成测试用例）使用单独的实例，不占用文件I/O线程
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "file-io"):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_in_flight = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix)
+        return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在I/O线程池中执行阻塞函数"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.submitted += 1
+            in_flight = self.submitted - self.completed - self.failed
+            if in_flight > self.max_in_flight:
+                self.max_in_flight = in_flight
+
+        try:
+            result = await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取线程池统计信息"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.submitted - self.completed - self.failed,
+                "max_in_flight": self.max_in_flight
+            }
+
+    def shutdown(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            logger.info(f"线程池已关闭: {self.thread_name_prefix}")
+
+
+def read_text_file(path: Path) -> Optional[str]:
+    """读取文本文件，文件不存在时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# 全局文件I/O线程池实例
+io_pool = IOPool(max_workers=settings.IO_THREAD_POOL_SIZE)
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """在全局I/O线程池中执行阻塞函数"""
+    return await io_pool.run(func, *args, **kwargs)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+后台任务管理
+停止录制后的收尾工作（保存trace和视频、保存会话、生成代码和测试用例）作为后台任务在FastAPI事件循环中执行，
+接口立即返回任务ID；任务进度通过事件通道推送到WebSocket，也可以通过 GET /api/jobs/{id} 查询
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from config.settings import settings
+from core.event_channel import recorder_event_channel
+
+
+@dataclass
+class Job:
+    """后台任务"""
+    id: str
+    kind: str
+    # 任务所属的录制会话（进度只推送给订阅该会话的客户端），None表示全局任务
+    session_id: Optional[str] = None
+    status: str = "pending"  # pending, running, completed, failed
+    progress: int = 0  # 0-100
+    stage: str = ""
+    result: Any = None
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def update(self, progress: int, stage: str):
+        """更新任务进度并推送"""
+        self.progress = max(self.progress, min(progress, 100))
+        self.stage = stage
+        self._publish()
+
+    def _publish(self):
+        recorder_event_channel.publish('job', 'job_progress', self.to_dict(), session_id=self.session_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "session_id": self.session_id,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None
+        }
+
+
+class JobManager:
+    """后台任务管理器
+
+    任务在调用 submit() 的事件循环中以asyncio任务执行；只保留最近 max_history 个已完成的任务
+    """
+
+    def __init__(self, max_history: int = 200):
+        self.max_history = max_history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, kind: str, func: Callable[[Job], Awaitable[Any]], session_id: Optional[str] = None) -> Job:
+        """提交后台任务，立即返回任务；func(job) 的返回值作为任务结果"""
+        job = Job(id=str(uuid.uuid4()), kind=kind, session_id=session_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._prune()
+
+        self._tasks[job.id] = asyncio.get_running_loop().create_task(self._run(job, func))
+        logger.info(f"后台任务已提交: {kind} ({job.id})")
+        return job
+
+    async def _run(self, job: Job, func: Callable[[Job], Awaitable[Any]]):
+        job.status = "running"
+        job.started_at = time.time()
+        job.update(0, "开始")
+        try:
+            job.result = await func(job)
+            job.status = "completed"
+            job.progress = 100
+            job.stage = "完成"
+            with self._lock:
+                self.completed += 1
+            logger.info(f"后台任务完成: {job.kind} ({job.id})，耗时 {time.time() - job.started_at:.2f}s")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            with self._lock:
+                self.failed += 1
+            logger.error(f"后台任务失败: {job.kind} ({job.id})，错误: {e}")
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.id, None)
+            job._publish()
+
+    def _prune(self):
+        """超过历史上限时删除最早完成的任务（未完成的任务保留）"""
+        excess = len(self._jobs) - self.max_history
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """获取任务"""
+        return self._jobs.get(job_id)
+
+    def list_jobs(self, session_id: Optional[str] = None) -> List[Job]:
+        """列出任务（新任务在前）"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in reversed(jobs) if session_id is None or job.session_id == session_id]
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """等待任务完成，返回任务"""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        return self.get(job_id)
+
+    async def wait_all(self, timeout: Optional[float] = None):
+        """等待所有未完成的任务（关闭服务前调用）"""
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取任务统计信息"""
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": len(self._tasks),
+            "history": len(self._jobs)
+        }
+
+
+# 全局后台任务管理器
+job_manager = JobManager(max_history=settings.JOB_HISTORY_SIZE)
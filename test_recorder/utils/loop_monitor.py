@@ -0,0 +1,68 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from loguru import logger
+
+
+class LoopLagMonitor:
+    """事件循环延迟监控
+
+    周期性地休眠固定间隔，实际唤醒时间与预期的差值即为事件循环被阻塞的时长
+    """
+
+    def __init__(self, interval: float = 0.1, window_size: int = 600, warn_threshold_ms: float = 200.0):
+        self.interval = interval
+        self.warn_threshold_ms = warn_threshold_ms
+        self._samples: Deque[float] = deque(maxlen=window_size)
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag_ms = 0.0
+        self.slow_count = 0
+
+    def start(self):
+        """启动监控任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("事件循环延迟监控已启动")
+
+    async def stop(self):
+        """停止监控任务"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self._samples.append(lag_ms)
+
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            if lag_ms >= self.warn_threshold_ms:
+                self.slow_count += 1
+                logger.warning(f"事件循环阻塞 {lag_ms:.1f}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取事件循环延迟统计信息"""
+        samples = sorted(self._samples)
+        if not samples:
+            return {"samples": 0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": round(self.max_lag_ms, 2), "slow_count": self.slow_count}
+
+        return {
+            "samples": len(samples),
+            "avg_ms": round(sum(samples) / len(samples), 2),
+            "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * (len(samples) - 1)))], 2),
+            "max_ms": round(self.max_lag_ms, 2),
+            "slow_count": self.slow_count
+        }
+
+
+# 全局事件循环延迟监控实例
+loop_lag_monitor = LoopLagMonitor()
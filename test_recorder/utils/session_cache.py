@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from core.models import TestSession
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目（记录加载时会话文件的mtime/size用于校验）"""
+    session: TestSession
+    mtime: float
+    size: int
+
+
+class SessionCache:
+    """有界LRU会话缓存
+
+    同时限制条目数和字节数（以会话文件大小估算），
+    读取时校验文件mtime/size，文件未变化时直接返回缓存，避免重复解析
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, session_id: str, mtime: Optional[float] = None, size: Optional[int] = None) -> Optional[TestSession]:
+        """获取缓存的会话；传入mtime/size时校验文件是否变化"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if mtime is not None and (entry.mtime != mtime or entry.size != size):
+                # 文件已变化，丢弃过期条目
+                self._remove(session_id)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return entry.session
+
+    def put(self, session_id: str, session: TestSession, mtime: float, size: int):
+        """写入缓存并按LRU淘汰超出限制的条目"""
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+
+            # 单个会话超过字节上限时不缓存
+            if size > self.max_bytes:
+                return
+
+            self._entries[session_id] = CacheEntry(session=session, mtime=mtime, size=size)
+            self.total_bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        """移除指定会话的缓存"""
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+                self.invalidations += 1
+
+    def _remove(self, session_id: str):
+        entry = self._entries.pop(session_id)
+        self.total_bytes -= entry.size
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,314 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from config.settings import settings
+from core.models import TestSession
+
+
+SESSION_FILE_SUFFIX = "_session.json"
+
+# 会话列表默认返回的摘要字段
+SUMMARY_FIELDS = [
+    "id", "name", "description", "start_time", "end_time",
+    "status", "action_count", "tags", "recording_method"
+]
+
+# 会话列表允许投影的字段
+SESSION_FIELDS = SUMMARY_FIELDS + [
+    "browser_type", "session_file", "trace_file", "video_file",
+    "file_mtime", "file_size", "indexed_at"
+]
+
+
+class SessionIndex:
+    """会话索引（SQLite）
+
+    维护一张会话目录表，会话列表只查询该表，不再读取每个会话文件
+    """
+
+    def __init__(self, database_url: str = None):
+        self.database_url = database_url or settings.DATABASE_URL
+        self.db_path = self._parse_database_url(self.database_url)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_database_url(database_url: str) -> str:
+        """解析sqlite:///路径格式的数据库地址"""
+        prefix = "sqlite:///"
+        if not database_url.startswith(prefix):
+            raise ValueError(f"不支持的数据库地址: {database_url}")
+        return database_url[len(prefix):]
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+        return self._conn
+
+    def _create_tables(self):
+        """创建会话目录表"""
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                start_time TEXT NOT NULL DEFAULT '',
+                end_time TEXT,
+                status TEXT,
+                action_count INTEGER DEFAULT 0,
+                tags TEXT,
+                browser_type TEXT,
+                recording_method TEXT,
+                session_file TEXT,
+                trace_file TEXT,
+                video_file TEXT,
+                file_mtime REAL,
+                file_size INTEGER,
+                indexed_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON sessions (start_time, id);
+            CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions (status);
+            CREATE INDEX IF NOT EXISTS idx_sessions_name ON sessions (name);
+
+            CREATE TABLE IF NOT EXISTS session_tags (
+                session_id TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (session_id, tag)
+            );
+            CREATE INDEX IF NOT EXISTS idx_session_tags_tag ON session_tags (tag);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _format_time(value: Any) -> Optional[str]:
+        """统一时间格式为ISO字符串，保证按字符串排序即按时间排序"""
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return datetime.fromisoformat(str(value)).isoformat()
+
+    @staticmethod
+    def _end_bound(value: Any) -> tuple:
+        """解析结束时间过滤条件，返回 (运算符, 边界)
+
+        只有日期（如 2026-10-18）时包含当天全部会话，使用次日零点作为开区间上界
+        """
+        text = str(value)
+        if not isinstance(value, datetime) and len(text) == 10:
+            day = datetime.fromisoformat(text)
+            return "<", (day + timedelta(days=1)).isoformat()
+        return "<=", SessionIndex._format_time(value)
+
+    def _build_row(self, session_data: Dict[str, Any], session_file: Path) -> Dict[str, Any]:
+        stat = session_file.stat()
+        return {
+            "id": session_data["id"],
+            "name": session_data.get("name", ""),
+            "description": session_data.get("description") or "",
+            "start_time": self._format_time(session_data.get("start_time")) or "",
+            "end_time": self._format_time(session_data.get("end_time")),
+            "status": session_data.get("status", ""),
+            "action_count": len(session_data.get("actions") or []),
+            "tags": json.dumps(session_data.get("tags") or [], ensure_ascii=False),
+            "browser_type": session_data.get("browser_type", ""),
+            "recording_method": session_data.get("recording_method", "realtime"),
+            "session_file": session_file.name,
+            "trace_file": session_data.get("trace_file") or "",
+            "video_file": session_data.get("video_file") or "",
+            "file_mtime": stat.st_mtime,
+            "file_size": stat.st_size,
+            "indexed_at": datetime.now().isoformat()
+        }
+
+    def _upsert_row(self, row: Dict[str, Any]):
+        conn = self._get_connection()
+        columns = ", ".join(row.keys())
+        placeholders = ", ".join(f":{key}" for key in row.keys())
+        conn.execute(f"INSERT OR REPLACE INTO sessions ({columns}) VALUES ({placeholders})", row)
+        conn.execute("DELETE FROM session_tags WHERE session_id = ?", (row["id"],))
+        conn.executemany(
+            "INSERT OR IGNORE INTO session_tags (session_id, tag) VALUES (?, ?)",
+            [(row["id"], tag) for tag in json.loads(row["tags"])]
+        )
+
+    def upsert_session(self, session: TestSession, session_file: Path, extra: Optional[Dict[str, Any]] = None):
+        """根据会话对象更新索引（会话文件写入之后调用）"""
+        session_data = session.dict()
+        session_data.update(extra or {})
+        with self._lock:
+            self._upsert_row(self._build_row(session_data, session_file))
+            self._get_connection().commit()
+
+    def upsert_from_file(self, session_file: Path) -> Optional[str]:
+        """读取会话文件并更新索引，返回会话ID"""
+        with open(session_file, 'r', encoding='utf-8') as f:
+            session_data = json.load(f)
+        with self._lock:
+            self._upsert_row(self._build_row(session_data, session_file))
+            self._get_connection().commit()
+        return session_data.get("id")
+
+    def delete_session(self, session_id: str):
+        """从索引中删除会话"""
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            conn.execute("DELETE FROM session_tags WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+    def reconcile(self, directory: Optional[Path] = None) -> Dict[str, int]:
+        """与会话目录对账：只重新解析新增或变化（mtime/size）的文件，并移除已不存在的会话"""
+        directory = directory or settings.RECORDINGS_DIR
+        stats = {"scanned": 0, "updated": 0, "removed": 0, "failed": 0}
+
+        with self._lock:
+            conn = self._get_connection()
+            known = {
+                row["session_file"]: (row["id"], row["file_mtime"], row["file_size"])
+                for row in conn.execute("SELECT id, session_file, file_mtime, file_size FROM sessions")
+            }
+
+        seen_files = set()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(SESSION_FILE_SUFFIX) or not entry.is_file():
+                    continue
+                stats["scanned"] += 1
+                seen_files.add(entry.name)
+
+                stat = entry.stat()
+                indexed = known.get(entry.name)
+                if indexed and indexed[1] == stat.st_mtime and indexed[2] == stat.st_size:
+                    continue
+
+                try:
+                    self.upsert_from_file(Path(entry.path))
+                    stats["updated"] += 1
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.warning(f"索引会话文件失败: {entry.path}, 错误: {e}")
+
+        with self._lock:
+            conn = self._get_connection()
+            for session_file, (session_id, _, _) in known.items():
+                if session_file not in seen_files:
+                    conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                    conn.execute("DELETE FROM session_tags WHERE session_id = ?", (session_id,))
+                    stats["removed"] += 1
+            conn.commit()
+
+        logger.info(f"会话索引对账完成: {stats}")
+        return stats
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        if "tags" in data:
+            data["tags"] = json.loads(data["tags"]) if data["tags"] else []
+        return data
+
+    @staticmethod
+    def encode_cursor(start_time: Optional[str], session_id: str) -> str:
+        """编码分页游标（上一页最后一条记录的排序键）"""
+        raw = json.dumps([start_time or "", session_id]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        """解码分页游标"""
+        try:
+            start_time, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return start_time, session_id
+        except Exception:
+            raise ValueError(f"无效的分页游标: {cursor}")
+
+    def query_sessions(self, limit: int = 50, cursor: Optional[str] = None,
+                       fields: Optional[List[str]] = None, tag: Optional[str] = None,
+                       status: Optional[str] = None, start_from: Optional[str] = None,
+                       start_to: Optional[str] = None, name_prefix: Optional[str] = None) -> Dict[str, Any]:
+        """分页查询会话摘要
+
+        按开始时间倒序，使用 (start_time, id) 键集分页，返回 {"sessions", "next_cursor"}
+        """
+        fields = fields or SUMMARY_FIELDS
+        unknown = [field for field in fields if field not in SESSION_FIELDS]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+
+        # 排序和游标需要id和start_time
+        select_fields = list(dict.fromkeys(fields + ["id", "start_time"]))
+
+        conditions = []
+        params: List[Any] = []
+
+        if cursor:
+            cursor_start, cursor_id = self.decode_cursor(cursor)
+            conditions.append("(start_time < ? OR (start_time = ? AND id < ?))")
+            params += [cursor_start, cursor_start, cursor_id]
+        if tag:
+            conditions.append("id IN (SELECT session_id FROM session_tags WHERE tag = ?)")
+            params.append(tag)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if start_from:
+            conditions.append("start_time >= ?")
+            params.append(self._format_time(start_from))
+        if start_to:
+            # 没有开始时间的会话存为''，按时间范围过滤时排除
+            operator, bound = self._end_bound(start_to)
+            conditions.append(f"start_time > '' AND start_time {operator} ?")
+            params.append(bound)
+        if name_prefix:
+            escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("name LIKE ? ESCAPE '\\'")
+            params.append(escaped + "%")
+
+        sql = f"SELECT {', '.join(select_fields)} FROM sessions"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY start_time DESC, id DESC LIMIT ?"
+        # 多取一条用于判断是否还有下一页
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._get_connection().execute(sql, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = self.encode_cursor(rows[-1]["start_time"], rows[-1]["id"]) if has_more and rows else None
+
+        sessions = []
+        for row in rows:
+            data = self._row_to_dict(row)
+            sessions.append({field: data.get(field) for field in fields})
+
+        return {"sessions": sessions, "next_cursor": next_cursor}
+
+    def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """获取单个会话摘要"""
+        with self._lock:
+            row = self._get_connection().execute(
+                "SELECT * FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
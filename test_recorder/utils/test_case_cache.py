@@ -0,0 +1,102 @@
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from core.models import TestCase
+
+
+class TestCaseCache:
+    """测试用例磁盘缓存
+
+    每个键对应一个 <key>.json 文件，键由调用方根据会话内容哈希和生成器版本计算，
+    内容变化即换键，因此条目不需要失效校验。写入时先写临时文件再替换，并发写入同一个键不会产生半个文件
+    """
+
+    def __init__(self, cache_dir: Path, enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[TestCase]:
+        """读取缓存的测试用例，不存在或损坏时返回None"""
+        if not self.enabled:
+            return None
+
+        try:
+            data = self._path(key).read_bytes()
+            test_case = TestCase.model_validate_json(data)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"读取测试用例缓存失败: {key}, 错误: {e}")
+            with self._lock:
+                self.misses += 1
+                self.errors += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return test_case
+
+    def put(self, key: str, test_case: TestCase):
+        """写入缓存（写入失败只记录日志）"""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        temp_file = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_file.write_text(test_case.model_dump_json(), encoding='utf-8')
+            os.replace(temp_file, path)
+            with self._lock:
+                self.writes += 1
+        except Exception as e:
+            logger.warning(f"写入测试用例缓存失败: {key}, 错误: {e}")
+            with self._lock:
+                self.errors += 1
+            try:
+                temp_file.unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> int:
+        """删除所有缓存文件，返回删除的数量"""
+        removed = 0
+        if not self.cache_dir.exists():
+            return removed
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                path.unlink()
+                removed += 1
+            except OSError as e:
+                logger.warning(f"删除测试用例缓存失败: {path}, 错误: {e}")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "cache_dir": str(self.cache_dir),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }